@@ -0,0 +1,370 @@
+"""
+Batch-Captioning für Shila-Vision (ohne GUI)
+Taggt Bilder aus Dateien, Ordnern oder Glob-Mustern und schreibt Caption-Dateien
+im kohya-Format (bild.png -> bild.txt) mit denselben Regeln wie die GUI.
+
+Verwendung:
+    python caption_images.py datensatz/
+    python caption_images.py "datensatz/**/*.png" --threshold 0.35 --exclude "monochrome, greyscale"
+    python caption_images.py datensatz/ --workers 4 --threads 4 --batch-size 32
+    python caption_images.py datensatz/ --export tags.parquet --export-probabilities --no-captions
+    python caption_images.py datensatz/ --manifest shila_manifest.sqlite
+    python caption_images.py eingang/ --watch --export eingang.jsonl
+"""
+
+import os
+import sys
+import signal
+import time
+import argparse
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from utils.exporters import EXPORTERS, create_exporter
+from utils.file_handler import FileHandler
+from utils.folder_watcher import Debouncer, create_watcher
+from utils.tag_formatting import DEFAULT_EXCLUDE, MAX_TAGS, format_caption, parse_tag_list, process_tags
+
+# Fortschritt alle N Bilder ausgeben
+PROGRESS_INTERVAL = 500
+
+# Maximale Wartezeit pro Durchlauf im Watch-Modus (Sekunden)
+WATCH_TICK = 0.2
+
+
+def load_tag_names() -> List[str]:
+    """Tag-Namen nach Output-Index aus Modeltagger/selected_tags.csv (ohne das Modell zu laden)."""
+    from tagger.local_model_loader import LocalWD14ModelLoader
+    from tagger.postprocessing import TagPostprocessor
+    return TagPostprocessor(LocalWD14ModelLoader().load_tags()).tag_names.tolist()
+
+
+def manifest_identity(args) -> Tuple[str, str]:
+    """Modell-Identität und Options-Version für das Manifest."""
+    from tagger.local_model_loader import LocalWD14ModelLoader
+    from tagger.manifest import options_version
+    from utils.image_processing import PREPROCESS_VERSION
+
+    model_id = LocalWD14ModelLoader(precision=args.precision).get_model_id()
+    options = {
+        'threshold': args.threshold,
+        'exclude': sorted(parse_tag_list(args.exclude)),
+        'use_spaces': not args.keep_underscores,
+        'sort_alphabetical': args.sort_alphabetical,
+        'max_tags': args.max_tags,
+        'caption_extension': args.caption_extension,
+        'captions': not args.no_captions,
+        'preprocess_version': PREPROCESS_VERSION,
+    }
+    return model_id, options_version(options)
+
+
+def select_with_manifest(args, manifest, image_paths: List[str], model_id: str, options: str) -> List[str]:
+    """
+    Wählt neue und geänderte Bilder über das Manifest aus und entfernt Einträge gelöschter Bilder.
+
+    Unveränderte Bilder, deren Caption-Datei fehlt, werden ebenfalls neu getaggt.
+    """
+    seen = set()
+    todo = set(manifest.changed(image_paths, model_id, options, seen))
+    deleted = manifest.prune(seen)
+    stats = manifest.stats
+    print(f"📋 Manifest: {stats['new']} neu, {stats['changed']} geändert, "
+          f"{stats['unchanged']} unverändert, {deleted} gelöscht")
+    return [
+        p for p in image_paths
+        if p in todo or (not args.no_captions
+                         and not FileHandler.caption_path(p, args.caption_extension).exists())
+    ]
+
+
+def create_tagger(args):
+    """Lädt den WD14Tagger mit den Optionen der Kommandozeile (ein Prozess)."""
+    from tagger.session_config import SessionConfig
+    from tagger.wd14_tagger import WD14Tagger
+
+    overrides = {'intra_op_num_threads': args.threads} if args.threads else {}
+    result_cache = None
+    if args.result_cache:
+        from tagger.result_cache import ResultCache
+        result_cache = ResultCache(args.result_cache)
+    tensor_cache = None
+    if args.tensor_cache:
+        from tagger.tensor_cache import TensorShardCache
+        tensor_cache = TensorShardCache(args.tensor_cache)
+
+    return WD14Tagger(
+        threshold=args.threshold,
+        session_config=SessionConfig.load(**overrides),
+        precision=args.precision,
+        result_cache=result_cache,
+        tensor_cache=tensor_cache,
+    )
+
+
+def tag_stream(args, image_paths: List[str], tagger=None) -> Iterator[Tuple[str, list, dict, object]]:
+    """
+    Taggt die Bilder als Stream (Multi-Prozess-Engine oder Pipeline in einem Prozess).
+
+    Args:
+        args: Kommandozeilen-Optionen
+        image_paths: Bildpfade
+        tagger: Bereits geladener WD14Tagger (Standard: wird bei Bedarf geladen)
+
+    Yields:
+        Tuple von (Bildpfad, Tag-Liste, Rating-Tags, Wahrscheinlichkeiten oder None)
+    """
+    with_probabilities = bool(args.export and args.export_probabilities)
+    if args.workers > 1:
+        from tagger.parallel_engine import MultiProcessTagger
+        if args.result_cache:
+            print("ℹ️  --result-cache wird mit --workers > 1 nicht verwendet")
+        with MultiProcessTagger(
+            workers=args.workers,
+            threads_per_worker=args.threads,
+            batch_size=args.batch_size,
+            threshold=args.threshold,
+            precision=args.precision,
+            pin_cpus=args.pin_cpus,
+            tensor_cache_dir=args.tensor_cache,
+        ) as engine:
+            for result in engine.tag_paths(image_paths, with_probabilities=with_probabilities):
+                yield result if with_probabilities else result + (None,)
+        return
+
+    if not image_paths:
+        return
+    if tagger is None:
+        tagger = create_tagger(args)
+    for result in tagger.iter_tag_images(image_paths, batch_size=args.batch_size,
+                                         decode_workers=args.decode_workers,
+                                         with_probabilities=with_probabilities):
+        yield result if with_probabilities else result + (None,)
+
+
+def write_results(args, results: Iterable[tuple], total: int, exporter=None, manifest=None,
+                  identity: Optional[Tuple[str, str]] = None) -> Tuple[int, int]:
+    """
+    Schreibt Caption-Dateien, Export und Manifest für einen Strom von Ergebnissen.
+
+    Args:
+        args: Kommandozeilen-Optionen
+        results: Tuple von (Bildpfad, Tag-Liste, Rating-Tags, Wahrscheinlichkeiten)
+        total: Anzahl erwarteter Ergebnisse (für die Fortschrittsanzeige)
+        exporter: Sammel-Export (optional)
+        manifest: Datensatz-Manifest (optional, mit identity)
+        identity: Modell-Identität und Options-Version für das Manifest
+
+    Returns:
+        Tuple von (getaggt, fehlgeschlagen)
+    """
+    exclude = parse_tag_list(args.exclude)
+    written = 0
+    failed = 0
+    start = time.perf_counter()
+    for image_path, tag_results, rating_tags, probabilities in results:
+        # Nicht ladbare Bilder liefern weder Tags noch Rating-Tags
+        if not tag_results and not rating_tags:
+            failed += 1
+            continue
+        if exporter is not None:
+            exporter.write(image_path, tag_results, rating_tags, probabilities)
+        if not args.no_captions:
+            tags = process_tags(
+                tag_results,
+                exclude=exclude,
+                use_spaces=not args.keep_underscores,
+                sort_alphabetical=args.sort_alphabetical,
+                max_tags=args.max_tags,
+            )
+            FileHandler.save_caption(image_path, format_caption(tags), args.caption_extension)
+        if manifest is not None:
+            manifest.record(image_path, *identity)
+        written += 1
+        if (written + failed) % PROGRESS_INTERVAL == 0:
+            elapsed = time.perf_counter() - start
+            print(f"   {written + failed}/{total} Bilder "
+                  f"({(written + failed) / elapsed:.1f} Bilder/s)")
+    return written, failed
+
+
+def open_watcher(args):
+    """Startet die Überwachung der Ordner unter den Quellen (vor dem ersten Durchlauf, damit nichts verloren geht)."""
+    directories = [source for source in args.sources if os.path.isdir(source)]
+    if not directories:
+        raise ValueError("--watch benötigt mindestens einen Ordner als Quelle")
+    return create_watcher(directories, recursive=not args.no_recursive,
+                          poll_interval=args.poll_interval, use_inotify=not args.poll)
+
+
+def watch(args, tagger, watcher, exporter=None, manifest=None, identity: Optional[Tuple[str, str]] = None):
+    """
+    Taggt neue bzw. geänderte Bilder aus den überwachten Ordnern, bis Strg+C gedrückt wird.
+
+    Gemeldete Dateien warten, bis sie fertig geschrieben sind (--debounce), und werden
+    dann zu Micro-Batches zusammengefasst: ein Batch startet, sobald batch_size Bilder
+    bereit sind oder das erste bereite Bild --batch-wait Sekunden gewartet hat.
+    """
+    debouncer = Debouncer(args.debounce)
+
+    # Als Dienst gestoppt (SIGTERM) wie Strg+C behandeln, damit Export und Manifest geschlossen werden
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, stop)
+    batch: Dict[str, None] = {}  # Bereite Bilder in Ankunftsreihenfolge (ohne Duplikate)
+    batch_started = 0.0
+    print(f"\n👀 Überwache {len(watcher.directories)} Ordner ({type(watcher).__name__}) - Strg+C beendet")
+    try:
+        while True:
+            debouncer.add(watcher.poll(WATCH_TICK))
+            ready = debouncer.ready()
+            if manifest is not None and ready:
+                ready = list(manifest.changed(ready, *identity))
+            if ready and not batch:
+                batch_started = time.monotonic()
+            batch.update(dict.fromkeys(ready))
+            if not batch or (len(batch) < args.batch_size
+                             and time.monotonic() - batch_started < args.batch_wait):
+                continue
+
+            image_paths = list(batch)
+            batch.clear()
+            start = time.perf_counter()
+            written, failed = write_results(args, tag_stream(args, image_paths, tagger), len(image_paths),
+                                            exporter, manifest, identity)
+            # Ergebnisse sofort dauerhaft machen
+            if exporter is not None:
+                exporter.flush()
+            if manifest is not None:
+                manifest.flush()
+            print(f"   {time.strftime('%H:%M:%S')} {written} Bilder getaggt, {failed} fehlgeschlagen "
+                  f"({time.perf_counter() - start:.2f} s)")
+    except KeyboardInterrupt:
+        print("\n⏹️  Überwachung beendet")
+
+
+def main():
+    """Hauptfunktion."""
+    parser = argparse.ArgumentParser(description="Taggt Bilder ohne GUI und schreibt Caption-Dateien")
+    parser.add_argument("sources", nargs="+", help="Bilddateien, Ordner oder Glob-Muster")
+    parser.add_argument("--threshold", type=float, default=0.20, help="Schwellenwert für Tag-Konfidenz")
+    parser.add_argument("--exclude", default=", ".join(DEFAULT_EXCLUDE),
+                        help="Auszuschließende Tags (kommagetrennt, \"\" = keine)")
+    parser.add_argument("--keep-underscores", action="store_true",
+                        help="Unterstriche nicht durch Leerzeichen ersetzen")
+    parser.add_argument("--sort-alphabetical", action="store_true",
+                        help="Alphabetisch statt nach Konfidenz sortieren")
+    parser.add_argument("--max-tags", type=int, default=MAX_TAGS, help="Maximale Anzahl Tags pro Caption")
+    parser.add_argument("--caption-extension", default=".txt", help="Dateiendung der Caption-Dateien")
+    parser.add_argument("--overwrite", action="store_true", help="Vorhandene Caption-Dateien überschreiben")
+    parser.add_argument("--no-captions", action="store_true", help="Keine Caption-Dateien schreiben (nur --export)")
+    parser.add_argument("--export", help="Alle Ergebnisse in eine Datei exportieren (.jsonl, .csv, .parquet, .sqlite, .npz)")
+    parser.add_argument("--export-format", choices=sorted(EXPORTERS), help="Export-Format (Standard: aus der Dateiendung)")
+    parser.add_argument("--export-probabilities", action="store_true",
+                        help="Vollständige Wahrscheinlichkeitsvektoren mit exportieren")
+    parser.add_argument("--no-recursive", action="store_true", help="Ordner ohne Unterordner durchsuchen")
+    parser.add_argument("--batch-size", type=int, default=16, help="Bilder pro Inference-Aufruf")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker-Prozesse (je ein Modell; 1 = Pipeline in einem Prozess)")
+    parser.add_argument("--threads", type=int, default=0,
+                        help="ONNX Runtime Threads (pro Worker; 0 = automatisch)")
+    parser.add_argument("--decode-workers", type=int, default=4,
+                        help="Decode-Threads der Pipeline (nur mit --workers 1)")
+    parser.add_argument("--pin-cpus", action="store_true", help="Worker an feste Kerne binden (nur Linux)")
+    parser.add_argument("--precision", choices=["fp32", "int8"], default="fp32", help="Modell-Variante")
+    parser.add_argument("--result-cache", help="SQLite-Ergebnis-Cache (nur mit --workers 1)")
+    parser.add_argument("--tensor-cache", help="Tensor-Cache aus prepare_tensors.py")
+    parser.add_argument("--manifest",
+                        help="Manifest-Datenbank: nur neue und geänderte Bilder taggen (ersetzt die Caption-Prüfung)")
+    parser.add_argument("--watch", action="store_true",
+                        help="Nach dem Durchlauf die Ordner überwachen und neue Bilder laufend taggen")
+    parser.add_argument("--debounce", type=float, default=1.0,
+                        help="Sekunden ohne Änderung, bevor eine neue Datei gelesen wird")
+    parser.add_argument("--batch-wait", type=float, default=0.5,
+                        help="Sekunden, die auf weitere Bilder für einen Micro-Batch gewartet wird")
+    parser.add_argument("--poll", action="store_true", help="Polling statt inotify (z.B. für Netzlaufwerke)")
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="Sekunden zwischen zwei Polling-Durchläufen")
+    args = parser.parse_args()
+    if args.no_captions and not args.export:
+        parser.error("--no-captions benötigt --export")
+
+    print("=" * 60)
+    print("🚀 Shila-Vision - Batch-Captioning")
+    print("=" * 60)
+
+    manifest = None
+    exporter = None
+    identity = None
+    watcher = None
+    try:
+        if args.watch:
+            watcher = open_watcher(args)
+        image_paths = FileHandler.collect_image_files(args.sources, recursive=not args.no_recursive)
+        total = len(image_paths)
+        if args.manifest:
+            from tagger.manifest import DatasetManifest
+            manifest = DatasetManifest(args.manifest)
+            identity = manifest_identity(args)
+            image_paths = select_with_manifest(args, manifest, image_paths, *identity)
+        elif not args.overwrite and not args.no_captions:
+            image_paths = [
+                p for p in image_paths
+                if not FileHandler.caption_path(p, args.caption_extension).exists()
+            ]
+        if len(image_paths) < total:
+            print(f"📷 {total} Bilder gefunden, {len(image_paths)} zu taggen")
+        else:
+            print(f"📷 {total} Bilder gefunden")
+        if not image_paths and not args.watch:
+            return
+
+        # Export enthält die Modell-Tags über dem Schwellenwert (ohne Caption-Formatierung)
+        if args.export:
+            exporter = create_exporter(
+                args.export,
+                args.export_format,
+                tag_names=load_tag_names() if args.export_probabilities else None,
+                include_probabilities=args.export_probabilities,
+            )
+
+        # Im Watch-Modus bleibt ein Modell für alle Durchläufe geladen
+        tagger = None
+        if args.watch:
+            if args.workers > 1:
+                print("ℹ️  --watch verwendet einen Prozess (--workers wird ignoriert)")
+                args.workers = 1
+            tagger = create_tagger(args)
+
+        start = time.perf_counter()
+        try:
+            written, failed = write_results(args, tag_stream(args, image_paths, tagger), len(image_paths),
+                                            exporter, manifest, identity)
+            elapsed = time.perf_counter() - start
+            if image_paths:
+                print(f"\n✅ {written} Bilder getaggt, {failed} fehlgeschlagen ({elapsed:.1f} s)")
+            if args.watch:
+                watch(args, tagger, watcher, exporter, manifest, identity)
+        finally:
+            if exporter is not None:
+                exporter.close()
+
+        if exporter is not None:
+            print(f"📦 {exporter.written} Ergebnisse exportiert: {exporter.path}")
+        if failed and not args.watch:
+            sys.exit(1)
+    except KeyboardInterrupt:
+        print("\n\n❌ Abgebrochen vom Benutzer.")
+        sys.exit(1)
+    except Exception as e:
+        print(f"\n❌ Fehler: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+    finally:
+        if watcher is not None:
+            watcher.close()
+        if manifest is not None:
+            manifest.close()
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,7 @@ from PySide6.QtWidgets import (
     QVBoxLayout, QHBoxLayout, QScrollArea, QFrame
 )
 from PySide6.QtCore import Qt, Signal, QTimer, QPropertyAnimation, QEasingCurve
-from PySide6.QtGui import QPixmap, QDragEnterEvent, QDropEvent, QPainter, QColor, QLinearGradient
+from PySide6.QtGui import QPixmap, QImage, QDragEnterEvent, QDropEvent, QPainter, QColor, QLinearGradient
 from pathlib import Path
 
 
@@ -260,6 +260,20 @@ class ImagePreview(QLabel):
                 self.setText("Bild konnte nicht geladen werden")
         except Exception as e:
             self.setText(f"Fehler: {str(e)}")
+    
+    def set_image_array(self, rgb_array):
+        """Setzt das anzuzeigende Bild aus einem bereits dekodierten RGB-Array (H, W, 3, uint8)."""
+        try:
+            height, width = rgb_array.shape[:2]
+            image = QImage(rgb_array.tobytes(), width, height, 3 * width, QImage.Format_RGB888)
+            scaled_pixmap = QPixmap.fromImage(image).scaled(
+                300, 300,
+                Qt.KeepAspectRatio,
+                Qt.SmoothTransformation
+            )
+            self.setPixmap(scaled_pixmap)
+        except Exception as e:
+            self.setText(f"Fehler: {str(e)}")
 
 
 class TagDisplay(QTextEdit):
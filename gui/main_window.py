@@ -1,37 +1,208 @@
 """Hauptfenster der Shila-Vision Anwendung."""
 
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Callable, Optional, TYPE_CHECKING
 from PySide6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QSplitter,
     QFileDialog, QMessageBox, QApplication, QLabel, QDoubleSpinBox,
-    QCheckBox, QLineEdit
+    QCheckBox, QLineEdit, QComboBox
 )
 from PySide6.QtCore import Qt, QThread, Signal, QObject, QTimer
 import time
 from PySide6.QtGui import QClipboard
 
 from gui.components import DragDropArea, ImagePreview, TagDisplay, ActionButtons, AnimatedProgressBar
-from tagger.wd14_tagger import WD14Tagger
 from utils.file_handler import FileHandler
+from utils.startup_profiler import startup_profiler
+from utils.tag_formatting import KAOMOJIS, DEFAULT_EXCLUDE, parse_tag_list, process_tags
+
+# Der Tagger (numpy, PIL, ONNX Runtime) wird erst in setup_tagger importiert,
+# damit das Fenster ohne diese Imports erscheint
+if TYPE_CHECKING:
+    from tagger.wd14_tagger import WD14Tagger
+    from utils.image_context import ImageContext
+
+
+def create_tagger1(threshold: float) -> "WD14Tagger":
+    """Erstellt Tagger 1: Standard WD14 (lokales Modell oder wdtagger Standard)."""
+    from tagger.wd14_tagger import WD14Tagger
+    return WD14Tagger(threshold=threshold, use_local=True)
+
+
+def create_tagger2(threshold: float, tagger1: "WD14Tagger") -> "WD14Tagger":
+    """Erstellt Tagger 2: SwinV2-Variante (falls verfügbar, sonst auch Standard)."""
+    from tagger.wd14_tagger import WD14Tagger
+    try:
+        # Versuche SwinV2-Modell zu verwenden (falls wdtagger verfügbar)
+        from wdtagger import Tagger as WDTaggerClass
+        tagger2 = WD14Tagger(threshold=threshold, use_local=False)
+        # Falls lokales Modell verwendet wurde, versuche trotzdem einen zweiten Tagger
+        if tagger1.local_loader is not None:
+            # Erstelle zweiten Tagger mit wdtagger (SwinV2)
+            tagger2.wdtagger = WDTaggerClass(model_repo="SmilingWolf/wd-swinv2-tagger-v3")
+            tagger2.local_loader = None
+        return tagger2
+    except:
+        # Fallback: Denselben Tagger zweimal verwenden (besser als nichts).
+        # Das lokale Modell muss dafür nicht ein zweites Mal geladen werden.
+        if tagger1.local_loader is not None:
+            return tagger1
+        return WD14Tagger(threshold=threshold, use_local=True)
+
+
+class ModelLoader(QObject):
+    """Lädt Tagger 1 im Hintergrund, damit das Fenster sofort bedienbar ist."""
+    
+    loaded = Signal(object)  # WD14Tagger
+    error = Signal(str)  # error_message
+    
+    def __init__(self, threshold: float):
+        super().__init__()
+        self.threshold = threshold
+    
+    def run(self):
+        """Lädt das Modell (läuft im Loader-Thread)."""
+        try:
+            with startup_profiler.span('model_load'):
+                tagger = create_tagger1(self.threshold)
+            self.loaded.emit(tagger)
+        except Exception as e:
+            self.error.emit(str(e))
+
+
+class ImageContextLoader(QObject):
+    """Liest, hasht und dekodiert abgelegte Bilder im Hintergrund (nicht im UI-Thread)."""
+    
+    loaded = Signal(object)  # ImageContext
+    error = Signal(str, str)  # image_path, error_message
+    
+    def load(self, image_path: str):
+        """Lädt ein Bild (läuft im Bild-Thread, Anfragen werden der Reihe nach bearbeitet)."""
+        from utils.image_context import ImageContext
+        context = ImageContext(image_path)
+        if not context.load():
+            self.error.emit(image_path, context.error or "")
+            return
+        context.rgb  # Array für die Vorschau ebenfalls hier erzeugen
+        self.loaded.emit(context)
+
+
+class CascadePolicy:
+    """
+    Entscheidet im Kaskaden-Modus, ob Tagger 2 nach Tagger 1 noch laufen soll.
+    
+    Tagger 2 läuft, wenn der Score von Tagger 1 (evaluate_tags) unter der
+    Konfidenz-Schwelle liegt oder wenn er voraussichtlich noch ins Zeitbudget passt.
+    """
+    
+    def __init__(self, confidence: float = 0.40, latency_budget: float = 0.0):
+        """
+        Initialisiert die Kaskade.
+        
+        Args:
+            confidence: Ab diesem Score genügt Tagger 1
+            latency_budget: Zeitbudget pro Bild in Sekunden (0 = aus)
+        """
+        self.confidence = confidence
+        self.latency_budget = latency_budget
+        self.tagger2_seconds: Optional[float] = None  # Gleitender Mittelwert der Tagger-2-Inference
+    
+    def observe_tagger2(self, seconds: float):
+        """Merkt sich die Inference-Zeit von Tagger 2 (für das Zeitbudget)."""
+        if self.tagger2_seconds is None:
+            self.tagger2_seconds = seconds
+        else:
+            self.tagger2_seconds = 0.7 * self.tagger2_seconds + 0.3 * seconds
+    
+    def tagger2_reason(self, score: float, elapsed: float) -> Optional[str]:
+        """
+        Prüft ob Tagger 2 laufen soll.
+        
+        Args:
+            score: evaluate_tags-Score von Tagger 1
+            elapsed: Bisherige Zeit für dieses Bild in Sekunden
+            
+        Returns:
+            Grund für Tagger 2 oder None wenn Tagger 1 genügt
+        """
+        if score < self.confidence:
+            return f"Score {score:.2f} unter {self.confidence:.2f}"
+        # Ohne Messwert (Tagger 2 noch nie gelaufen, evtl. nicht geladen) wird das Budget nicht verplant
+        if (self.latency_budget > 0 and self.tagger2_seconds is not None
+                and elapsed + self.tagger2_seconds <= self.latency_budget):
+            return "im Zeitbudget"
+        return None
+
+
+class TaggingCancelled(Exception):
+    """Der Worker wurde abgebrochen (neues Bild oder Fenster geschlossen)."""
 
 
 class TaggingWorker(QObject):
-    """Worker-Thread für asynchrones Tagging."""
+    """
+    Worker-Thread für asynchrones Tagging.
+    
+    Wird nicht hart beendet (ein im Session-Pool oder im wdtagger-Lock
+    gestoppter Thread würde jedes weitere Tagging blockieren), sondern über
+    cancel() kooperativ abgebrochen: der Worker endet nach dem laufenden
+    Inference-Aufruf, done beendet dann seinen Thread.
+    """
     
-    finished = Signal(str, list, str)  # image_path, tags, tagger_name
+    finished = Signal(str, list, str, dict)  # image_path, tags, tagger_name, rating_tags
+    partial_results = Signal(str, list, str, dict)  # wie finished, vorläufig (nur Tagger 1)
+    raw_results = Signal(str, dict)  # image_path, alle Tags beider Tagger (für Threshold-Änderungen)
     error = Signal(str, str)  # image_path, error_message
     progress = Signal(str, int)  # status message, progress (0-100)
+    done = Signal()  # run() beendet (auch bei Abbruch oder Fehler)
+    
+    TAGGER1_NAME = "Tagger 1 (WD14)"
+    TAGGER2_NAME = "Tagger 2 (WD14-SwinV2)"
     
-    def __init__(self, tagger1: WD14Tagger, tagger2: WD14Tagger, image_path: str):
+    # Modi: Thinking (gestaffelte Analyse, Tagger nacheinander) oder Durchsatz (parallel, ohne Pausen)
+    MODE_THINKING = "thinking"
+    MODE_THROUGHPUT = "throughput"
+    MODE_CASCADE = "cascade"  # Tagger 2 nur wenn Tagger 1 unsicher ist (CascadePolicy)
+    MODES = {
+        MODE_THINKING: "Thinking",
+        MODE_THROUGHPUT: "Durchsatz",
+        MODE_CASCADE: "Kaskade",
+    }
+    
+    def __init__(self, tagger1: "WD14Tagger", tagger2_provider: Callable[[], "WD14Tagger"],
+                 image_context: "ImageContext", threshold: float = 0.20, mode: str = MODE_THINKING,
+                 cascade: Optional[CascadePolicy] = None):
         super().__init__()
+        self.mode = mode
+        self.cascade = cascade or CascadePolicy()
         self.tagger1 = tagger1
-        self.tagger2 = tagger2
-        self.image_path = image_path
+        self.tagger2_provider = tagger2_provider  # Lädt Tagger 2 beim ersten Aufruf
+        self.image_context = image_context  # Einmal dekodiert, von allen Schritten geteilt
+        self.image_path = image_context.image_path
+        self.threshold = threshold
+        self._cancelled = threading.Event()
+    
+    def cancel(self):
+        """Bricht das Tagging beim nächsten Zwischenschritt ab (thread-sicher)."""
+        self._cancelled.set()
     
-    def analyze_image_preview(self, image_path: str) -> dict:
-        """Analysiert das Bild intensiv für bessere Erkenntnisse (Thinking Mode)."""
-        from PIL import Image
+    def _check_cancelled(self):
+        if self._cancelled.is_set():
+            raise TaggingCancelled()
+    
+    def _pause(self, seconds: float):
+        """Pause zwischen den Analyse-Phasen, die ein Abbruch sofort beendet."""
+        if self._cancelled.wait(seconds):
+            raise TaggingCancelled()
+    
+    def analyze_image_preview(self, image_context: "ImageContext") -> dict:
+        """Analysiert das Bild intensiv für bessere Erkenntnisse (Thinking Mode).
+        
+        Läuft auf einem Thumbnail, damit die Analyse auch bei sehr großen
+        Bildern nur einen Bruchteil der Inference-Zeit braucht.
+        """
         try:
             import numpy as np
         except ImportError:
@@ -40,21 +211,24 @@ class TaggingWorker(QObject):
         
         analysis = {}
         try:
-            image = Image.open(image_path)
-            analysis['size'] = image.size
-            analysis['mode'] = image.mode
-            analysis['format'] = image.format
-            analysis['aspect_ratio'] = image.size[0] / image.size[1] if image.size[1] > 0 else 1.0
-            
-            # Konvertiere zu RGB für Farbanalyse
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            # Detaillierte Farbanalyse
-            img_array = np.array(image)
-            analysis['dominant_colors'] = self._get_dominant_colors(img_array)
-            analysis['brightness'] = float(np.mean(img_array))
-            analysis['contrast'] = float(np.std(img_array))
+            # Metadaten des Originals, Pixel aus dem bereits (reduziert) dekodierten Bild
+            analysis['size'] = image_context.size
+            analysis['mode'] = image_context.mode
+            analysis['format'] = image_context.format
+            width, height = image_context.size
+            analysis['aspect_ratio'] = width / height if height > 0 else 1.0
+            
+            # Alle Statistiken in einem Durchlauf über ein kleines Thumbnail:
+            # Summen und Quadratsummen pro Kanal ergeben Helligkeit, Kontrast und Farbmittel
+            thumbnail = image_context.thumbnail()
+            pixels = thumbnail.reshape(-1, 3).astype(np.float32)
+            channel_sums = pixels.sum(axis=0)
+            square_sum = float(np.einsum('ij,ij->', pixels, pixels))
+            count = max(pixels.shape[0], 1)
+            r_mean, g_mean, b_mean = (float(v) for v in channel_sums / count)
+            analysis['brightness'] = float(channel_sums.sum()) / (3 * count)
+            analysis['contrast'] = float(np.sqrt(max(square_sum / (3 * count) - analysis['brightness'] ** 2, 0.0)))
+            analysis['dominant_colors'] = [int(r_mean), int(g_mean), int(b_mean)]
             
             # Erweiterte Bildmerkmale
             analysis['is_dark'] = analysis['brightness'] < 100
@@ -63,10 +237,6 @@ class TaggingWorker(QObject):
             analysis['is_colorful'] = analysis['contrast'] > 40
             
             # Farbanalyse - erkenne dominante Farben
-            r_mean = float(np.mean(img_array[:, :, 0]))
-            g_mean = float(np.mean(img_array[:, :, 1]))
-            b_mean = float(np.mean(img_array[:, :, 2]))
-            
             analysis['is_reddish'] = r_mean > g_mean + 20 and r_mean > b_mean + 20
             analysis['is_greenish'] = g_mean > r_mean + 20 and g_mean > b_mean + 20
             analysis['is_blueish'] = b_mean > r_mean + 20 and b_mean > g_mean + 20
@@ -81,12 +251,11 @@ class TaggingWorker(QObject):
             
             # Erkenne Hintergrund
             # Analysiere Ränder des Bildes für Hintergrund-Erkennung
-            h, w = img_array.shape[:2]
             edge_pixels = np.concatenate([
-                img_array[0, :].reshape(-1, 3),  # Oben
-                img_array[-1, :].reshape(-1, 3),  # Unten
-                img_array[:, 0].reshape(-1, 3),  # Links
-                img_array[:, -1].reshape(-1, 3)   # Rechts
+                thumbnail[0, :].reshape(-1, 3),  # Oben
+                thumbnail[-1, :].reshape(-1, 3),  # Unten
+                thumbnail[:, 0].reshape(-1, 3),  # Links
+                thumbnail[:, -1].reshape(-1, 3)   # Rechts
             ])
             edge_brightness = float(np.mean(edge_pixels))
             analysis['has_dark_background'] = edge_brightness < 80
@@ -103,19 +272,8 @@ class TaggingWorker(QObject):
         
         return analysis
     
-    def _get_dominant_colors(self, img_array, k=3):
-        """Ermittelt dominante Farben im Bild."""
-        try:
-            # Vereinfachte Methode: Sample einige Pixel
-            h, w = img_array.shape[:2]
-            sample_size = min(1000, h * w)
-            indices = np.random.choice(h * w, sample_size, replace=False)
-            pixels = img_array.reshape(-1, 3)[indices]
-            return pixels.mean(axis=0).astype(int).tolist()
-        except:
-            return [128, 128, 128]  # Fallback: Grau
-    
-    def evaluate_tags(self, tags: list) -> float:
+    @staticmethod
+    def evaluate_tags(tags: list) -> float:
         """Bewertet Tags basierend auf Qualität (höhere Konfidenz = besser)."""
         if not tags:
             return 0.0
@@ -129,25 +287,68 @@ class TaggingWorker(QObject):
         score = avg_confidence * 0.7 + (high_confidence_count / 25.0) * 0.3
         return score
     
+    @classmethod
+    def select_best(cls, raw_results: dict, threshold: float) -> tuple:
+        """
+        Filtert die Tags beider Tagger nach dem Threshold und wählt den besseren.
+        
+        Args:
+            raw_results: Alle Tags und Rating-Tags beider Tagger (aus raw_results)
+            threshold: Schwellenwert für Tag-Konfidenz
+            
+        Returns:
+            Tuple von (Tag-Liste, Tagger-Name, Rating-Tags)
+        """
+        # Tags sind nach Konfidenz sortiert, die Reihenfolge bleibt erhalten
+        tags1 = [(tag, conf) for tag, conf in raw_results['tags1'] if conf >= threshold]
+        tags2 = [(tag, conf) for tag, conf in raw_results['tags2'] if conf >= threshold]
+        
+        # Rating-Tags: vom Tagger 1 (wie bisher), sonst vom Tagger 2
+        rating_tags = raw_results['ratings1'] or raw_results['ratings2']
+        if cls.evaluate_tags(tags1) >= cls.evaluate_tags(tags2):
+            return tags1, cls.TAGGER1_NAME, rating_tags
+        return tags2, cls.TAGGER2_NAME, rating_tags
+    
     def run(self):
+        """Taggt das Bild im gewählten Modus."""
+        try:
+            if self.mode == self.MODE_THROUGHPUT:
+                self._run_throughput()
+            elif self.mode == self.MODE_CASCADE:
+                self._run_cascade()
+            else:
+                self._run_thinking()
+        except TaggingCancelled:
+            pass  # Ergebnis wird nicht mehr gebraucht
+        except Exception as e:
+            self.error.emit(self.image_path, str(e))
+        finally:
+            self.done.emit()
+    
+    def _run_thinking(self):
         """Thinking Mode Engine: Intensives Scannen, tiefe Analyse, dann Tag-Berechnung."""
+        # Tagger 1 rechnet bereits, während das Bild analysiert wird
+        executor = ThreadPoolExecutor(max_workers=1)
         try:
+            # Threshold 0.0 = alle Tags, damit Threshold-Änderungen ohne neue Inference auskommen
+            tagger1_future = executor.submit(self._run_tagger1)
+            
             # Phase 1: Intensives Bild-Scannen
             self.progress.emit(f"🔍 Scanne Bild-Details...", 3)
-            analysis = self.analyze_image_preview(self.image_path)
-            time.sleep(0.3)
+            analysis = self.analyze_image_preview(self.image_context)
+            self._pause(0.3)
             
             # Phase 2: Detaillierte Bildanalyse
             self.progress.emit(f"🔬 Analysiere Bildstruktur...", 8)
-            time.sleep(0.4)
+            self._pause(0.4)
             
             # Phase 3: Farb- und Kompositionsanalyse
             self.progress.emit(f"🎨 Analysiere Farben und Komposition...", 12)
-            time.sleep(0.5)
+            self._pause(0.5)
             
             # Phase 4: "Wait minute" - Tiefe Denkzeit mit detaillierten Erkenntnissen
             self.progress.emit(f"⏳ Tiefe Bildanalyse...", 18)
-            time.sleep(0.6)
+            self._pause(0.6)
             
             # Detaillierte Erkenntnisse sammeln
             insights = []
@@ -202,70 +403,169 @@ class TaggingWorker(QObject):
             if all_insights:
                 insight_text = " | ".join(all_insights)
                 self.progress.emit(f"💭 {insight_text}...", 25)
-                time.sleep(0.5)
+                self._pause(0.5)
             else:
                 self.progress.emit(f"💭 Analysiere Bildmerkmale...", 25)
-                time.sleep(0.4)
+                self._pause(0.4)
             
-            # Phase 5: Berechne Tags mit Tagger 1 (mit Kontext)
+            # Phase 5: Tags von Tagger 1 (läuft seit Phase 1 im Hintergrund)
             self.progress.emit(f"🧠 Berechne Tags mit Tagger 1 (WD14)...", 30)
-            tags1 = self.tagger1.tag_image(self.image_path)
-            score1 = self.evaluate_tags(tags1)
+            tags1, ratings1 = tagger1_future.result()
+            self._check_cancelled()
             
             # Phase 6: Berechne Tags mit Tagger 2 (mit Kontext)
             self.progress.emit(f"🧠 Berechne Tags mit Tagger 2 (SwinV2)...", 65)
-            tags2 = self.tagger2.tag_image(self.image_path)
-            score2 = self.evaluate_tags(tags2)
+            tags2, ratings2 = self._run_tagger2_checked()
+            raw_results = {'tags1': tags1, 'ratings1': ratings1, 'tags2': tags2, 'ratings2': ratings2}
             
             # Phase 7: Vergleiche und wähle besten Tagger
             self.progress.emit(f"🎯 Vergleiche Ergebnisse...", 85)
-            time.sleep(0.3)
+            self._pause(0.3)
             
             # Phase 8: Finale Auswahl
             self.progress.emit(f"✨ Wähle besten Tagger...", 90)
-            time.sleep(0.2)
+            self._pause(0.2)
             
             # Wähle den besseren Tagger
-            if score1 >= score2:
-                best_tags = tags1
-                tagger_name = "Tagger 1 (WD14)"
-            else:
-                best_tags = tags2
-                tagger_name = "Tagger 2 (WD14-SwinV2)"
+            best_tags, tagger_name, rating_tags = self.select_best(raw_results, self.threshold)
             
             self.progress.emit(f"✅ Fertig! ({tagger_name})", 100)
-            self.finished.emit(self.image_path, best_tags, tagger_name)
-        except Exception as e:
-            self.error.emit(self.image_path, str(e))
+            self.raw_results.emit(self.image_path, raw_results)
+            self.finished.emit(self.image_path, best_tags, tagger_name, rating_tags)
+        finally:
+            executor.shutdown(wait=False)
+    
+    def _run_throughput(self):
+        """Durchsatz-Modus: beide Tagger parallel, ohne Pausen; Tagger 1 wird sofort angezeigt."""
+        executor = ThreadPoolExecutor(max_workers=2)
+        try:
+            self.progress.emit(f"🧠 Berechne Tags mit beiden Taggern...", 10)
+            tagger1_future = executor.submit(self._run_tagger1)
+            tagger2_future = executor.submit(self._run_tagger2)
+            
+            # Tagger 1 ist in der Regel schneller - Ergebnis vorab anzeigen
+            tags1, ratings1 = tagger1_future.result()
+            self._check_cancelled()
+            if not tagger2_future.done():
+                partial = {'tags1': tags1, 'ratings1': ratings1, 'tags2': [], 'ratings2': {}}
+                tags, tagger_name, rating_tags = self.select_best(partial, self.threshold)
+                self.raw_results.emit(self.image_path, partial)
+                self.partial_results.emit(self.image_path, tags, tagger_name, rating_tags)
+                self.progress.emit(f"⏳ {tagger_name} fertig - warte auf Tagger 2...", 60)
+            
+            tags2, ratings2 = tagger2_future.result()
+            raw_results = {'tags1': tags1, 'ratings1': ratings1, 'tags2': tags2, 'ratings2': ratings2}
+            best_tags, tagger_name, rating_tags = self.select_best(raw_results, self.threshold)
+            
+            self.progress.emit(f"✅ Fertig! ({tagger_name})", 100)
+            self.raw_results.emit(self.image_path, raw_results)
+            self.finished.emit(self.image_path, best_tags, tagger_name, rating_tags)
+        finally:
+            executor.shutdown(wait=False)
+    
+    def _run_cascade(self):
+        """Kaskaden-Modus: Tagger 2 nur, wenn Tagger 1 unsicher ist oder das Zeitbudget reicht."""
+        start = time.perf_counter()
+        self.progress.emit(f"🧠 Berechne Tags mit Tagger 1 (WD14)...", 10)
+        tags1, ratings1 = self._run_tagger1()
+        partial = {'tags1': tags1, 'ratings1': ratings1, 'tags2': [], 'ratings2': {}}
+        tags, tagger_name, rating_tags = self.select_best(partial, self.threshold)
+        score = self.evaluate_tags(tags)
+        
+        reason = self.cascade.tagger2_reason(score, time.perf_counter() - start)
+        if reason is None:
+            # Tagger 1 ist sicher genug
+            tagger_name = f"{tagger_name}, Score {score:.2f} - Tagger 2 übersprungen"
+            self.progress.emit(f"✅ Fertig! ({tagger_name})", 100)
+            self.raw_results.emit(self.image_path, partial)
+            self.finished.emit(self.image_path, tags, tagger_name, rating_tags)
+            return
+        
+        # Tagger 1 vorab anzeigen, während Tagger 2 rechnet
+        self.raw_results.emit(self.image_path, partial)
+        self.partial_results.emit(self.image_path, tags, tagger_name, rating_tags)
+        self.progress.emit(f"🧠 {reason} - berechne Tags mit Tagger 2 (SwinV2)...", 50)
+        tags2, ratings2 = self._run_tagger2_checked()
+        
+        raw_results = {'tags1': tags1, 'ratings1': ratings1, 'tags2': tags2, 'ratings2': ratings2}
+        best_tags, tagger_name, rating_tags = self.select_best(raw_results, self.threshold)
+        self.progress.emit(f"✅ Fertig! ({tagger_name})", 100)
+        self.raw_results.emit(self.image_path, raw_results)
+        self.finished.emit(self.image_path, best_tags, tagger_name, rating_tags)
+    
+    def _run_tagger1(self) -> tuple:
+        """Inference von Tagger 1 (läuft parallel zur Bildanalyse)."""
+        with startup_profiler.span('first_inference'):
+            return self.tagger1.tag_image_with_ratings(
+                self.image_path, threshold=0.0, image_context=self.image_context)
+    
+    def _run_tagger2(self) -> tuple:
+        """Lädt Tagger 2 bei Bedarf und berechnet seine Tags."""
+        tagger2 = self.tagger2_provider()
+        start = time.perf_counter()
+        result = tagger2.tag_image_with_ratings(
+            self.image_path, threshold=0.0, image_context=self.image_context)
+        self.cascade.observe_tagger2(time.perf_counter() - start)
+        return result
+    
+    def _run_tagger2_checked(self) -> tuple:
+        """Wie _run_tagger2, aber nicht mehr starten, wenn der Worker abgebrochen wurde."""
+        self._check_cancelled()
+        return self._run_tagger2()
 
 
 class MainWindow(QMainWindow):
     """Hauptfenster der Anwendung."""
     
-    def __init__(self):
+    image_requested = Signal(str)  # image_path (an den ImageContextLoader)
+    
+    def __init__(self, profile_image: Optional[str] = None):
+        """
+        Initialisiert das Hauptfenster.
+        
+        Args:
+            profile_image: Bild, das nach dem Laden der Modelle automatisch getaggt wird
+                (main.py --profile-startup --profile-image)
+        """
         super().__init__()
         # Alte Variable entfernt - verwende jetzt tagger1 und tagger2
+        self.tagger1 = None
+        self.tagger2 = None  # Wird beim ersten Tagging geladen (get_tagger2)
+        self._tagger2_lock = threading.Lock()
+        self._tagger2_thread = None
+        self._tagger2_ready = threading.Event()
+        self._tagger2_error = None
+        self.loader_thread = None
+        self.loader = None
+        self.models_ready = False
+        self.pending_images = []  # Während des Ladens abgelegte Bilder (ImageContext)
+        self.current_context = None  # Dekodiertes aktuelles Bild
+        self.image_loader = None
+        self.image_loader_thread = None
+        self.profile_image = profile_image
         self.current_image_path = None
         self.current_tags = []
         self.raw_tags = []  # Speichere ursprüngliche Tags (vor Verarbeitung)
+        self.raw_results = {}  # Alle Tags beider Tagger für das aktuelle Bild (ohne Threshold)
+        self.raw_results_path = None
         self.worker_thread = None
         self.worker = None
+        self.retired_workers = []  # Abgebrochene Worker, deren Thread noch ausläuft
         self.rating_tags = {}  # Für Rating-Tags (sensitive, general, etc.)
+        self.cascade = CascadePolicy()  # Einstellungen und Tagger-2-Laufzeit für den Kaskaden-Modus
         
         # Kaomoji-Liste (Tags die Unterstriche behalten sollen)
-        # Basierend auf WD14 Tagger CSV
-        self.kaomojis = {
-            '0_0', '(o)_(o)', '+_+', '+_-', '._.', '<o>_<o>', '<|>_<|>', 
-            '=_=', '>_<', '3_3', '6_9', '>_o', '@_@', '^_^', 'o_o', 
-            'u_u', 'x_x', '|_|', '||_||'
-        }
+        self.kaomojis = KAOMOJIS
         
         # Standard-Ausschluss-Tags (werden beim Start gesetzt)
-        self.default_exclude = ["monochrome", "greyscale", "dark", "simple background"]
+        self.default_exclude = list(DEFAULT_EXCLUDE)
         
         self.setup_ui()
-        self.setup_tagger()
         self.apply_dark_theme()
+        self.setup_image_loader()
+        
+        # Modelle im Hintergrund laden, das Fenster ist sofort bedienbar
+        self.setup_tagger()
         
         # Setze Standard-Ausschluss-Tags nach UI-Init
         if hasattr(self, 'exclude_tags_input'):
@@ -368,6 +668,35 @@ class MainWindow(QMainWindow):
         self.threshold_spinbox.valueChanged.connect(self.on_threshold_changed)
         tags_label_layout.addWidget(self.threshold_spinbox)
         
+        # Modus-Auswahl (gilt ab dem nächsten Bild)
+        mode_label = QLabel("Modus:")
+        mode_label.setStyleSheet("color: #888; font-size: 11px;")
+        tags_label_layout.addWidget(mode_label)
+        
+        self.mode_combo = QComboBox()
+        for mode, label in TaggingWorker.MODES.items():
+            self.mode_combo.addItem(label, mode)
+        self.mode_combo.setToolTip(
+            "Thinking: gestaffelte Bildanalyse, Tagger nacheinander\n"
+            "Durchsatz: beide Tagger parallel ohne Pausen, Tagger 1 wird sofort angezeigt\n"
+            "Kaskade: Tagger 2 nur wenn Tagger 1 unsicher ist oder das Zeitbudget reicht"
+        )
+        self.mode_combo.setStyleSheet("""
+            QComboBox {
+                background: #2a2a2a;
+                border: 1px solid #3a3a3a;
+                border-radius: 4px;
+                padding: 4px 8px;
+                color: #e0e0e0;
+                font-size: 11px;
+                min-width: 80px;
+            }
+            QComboBox:hover {
+                border: 1px solid #4a4a4a;
+            }
+        """)
+        tags_label_layout.addWidget(self.mode_combo)
+        
         tags_label.setLayout(tags_label_layout)
         tags_layout.addWidget(tags_label)
         
@@ -435,6 +764,45 @@ class MainWindow(QMainWindow):
         exclude_layout.addWidget(self.exclude_tags_input)
         options_layout.addLayout(exclude_layout)
         
+        # Kaskaden-Einstellungen (nur im Modus "Kaskade")
+        cascade_layout = QHBoxLayout()
+        cascade_label = QLabel("Kaskade:")
+        cascade_label.setStyleSheet("color: #888; font-size: 11px;")
+        cascade_label.setMinimumWidth(120)
+        cascade_layout.addWidget(cascade_label)
+        
+        confidence_label = QLabel("Tagger 2 unter Score")
+        confidence_label.setStyleSheet("color: #888; font-size: 11px;")
+        cascade_layout.addWidget(confidence_label)
+        
+        self.cascade_confidence_spinbox = QDoubleSpinBox()
+        self.cascade_confidence_spinbox.setMinimum(0.0)
+        self.cascade_confidence_spinbox.setMaximum(1.0)
+        self.cascade_confidence_spinbox.setSingleStep(0.05)
+        self.cascade_confidence_spinbox.setValue(self.cascade.confidence)
+        self.cascade_confidence_spinbox.setDecimals(2)
+        self.cascade_confidence_spinbox.setStyleSheet(self.threshold_spinbox.styleSheet())
+        self.cascade_confidence_spinbox.valueChanged.connect(self.on_cascade_changed)
+        cascade_layout.addWidget(self.cascade_confidence_spinbox)
+        
+        budget_label = QLabel("Zeitbudget:")
+        budget_label.setStyleSheet("color: #888; font-size: 11px;")
+        cascade_layout.addWidget(budget_label)
+        
+        self.cascade_budget_spinbox = QDoubleSpinBox()
+        self.cascade_budget_spinbox.setMinimum(0)
+        self.cascade_budget_spinbox.setMaximum(60000)
+        self.cascade_budget_spinbox.setSingleStep(100)
+        self.cascade_budget_spinbox.setDecimals(0)
+        self.cascade_budget_spinbox.setSuffix(" ms")
+        self.cascade_budget_spinbox.setSpecialValueText("aus")
+        self.cascade_budget_spinbox.setValue(self.cascade.latency_budget * 1000)
+        self.cascade_budget_spinbox.setStyleSheet(self.threshold_spinbox.styleSheet())
+        self.cascade_budget_spinbox.valueChanged.connect(self.on_cascade_changed)
+        cascade_layout.addWidget(self.cascade_budget_spinbox)
+        cascade_layout.addStretch()
+        options_layout.addLayout(cascade_layout)
+        
         options_widget.setLayout(options_layout)
         tags_layout.addWidget(options_widget)
         
@@ -464,46 +832,118 @@ class MainWindow(QMainWindow):
         # Status-Bar
         self.statusBar().showMessage("Bereit - Ziehen Sie Bilder in den Bereich oben")
         
+        # Ladezustand der Modelle (rechts in der Statusleiste)
+        self.model_state_label = QLabel("")
+        self.model_state_label.setStyleSheet("color: #888; font-size: 11px; padding-right: 6px;")
+        self.statusBar().addPermanentWidget(self.model_state_label)
+        
         central_widget.setLayout(main_layout)
     
     def setup_tagger(self):
-        """Initialisiert beide Tagger."""
+        """Startet das Laden von Tagger 1 im Hintergrund (Tagger 2 wird bei Bedarf geladen)."""
+        # Threshold: Höherer Wert = nur relevantere Tags (Standard: 0.20)
+        # Empfohlen: 0.20-0.35 für mehr Tags, 0.35-0.45 für bessere Qualität
+        threshold = self.threshold_spinbox.value() if hasattr(self, 'threshold_spinbox') else 0.20
+        self.set_model_state("⏳ Lade Modell...")
+        self.statusBar().showMessage("Lade Tagger 1 im Hintergrund - Bilder können bereits abgelegt werden")
+        
+        self.loader = ModelLoader(threshold)
+        self.loader_thread = QThread()
+        self.loader.moveToThread(self.loader_thread)
+        self.loader_thread.started.connect(self.loader.run)
+        self.loader.loaded.connect(self.on_model_loaded)
+        self.loader.error.connect(self.on_model_error)
+        self.loader_thread.start()
+    
+    def setup_image_loader(self):
+        """Startet den Thread, der abgelegte Bilder liest und dekodiert."""
+        self.image_loader = ImageContextLoader()
+        self.image_loader_thread = QThread()
+        self.image_loader.moveToThread(self.image_loader_thread)
+        self.image_requested.connect(self.image_loader.load)
+        self.image_loader.loaded.connect(self.on_image_context_loaded)
+        self.image_loader.error.connect(self.on_image_context_error)
+        self.image_loader_thread.start()
+    
+    def set_model_state(self, text: str):
+        """Zeigt den Ladezustand der Modelle in der Statusleiste an."""
+        self.model_state_label.setText(text)
+    
+    def on_model_loaded(self, tagger):
+        """Wird aufgerufen wenn Tagger 1 geladen ist."""
+        self.tagger1 = tagger
+        # Threshold kann sich während des Ladens geändert haben
+        self.tagger1.threshold = self.threshold_spinbox.value()
+        self.models_ready = True
+        self._stop_loader_thread()
+        self.set_model_state("✅ Bereit")
+        self.statusBar().showMessage("Tagger geladen - Bereit zum Taggen")
+        
+        # Startzeit-Profil: erste Inference automatisch messen (vor den abgelegten Bildern)
+        if self.profile_image:
+            self.request_image_context(self.profile_image)
+            return
+        self.process_next_pending()
+    
+    def on_model_error(self, error_message: str):
+        """Wird aufgerufen wenn das Laden von Tagger 1 fehlschlägt."""
+        self._stop_loader_thread()
+        self.pending_images.clear()
+        self.set_model_state("❌ Modell nicht geladen")
+        QMessageBox.critical(
+            self,
+            "Fehler",
+            f"Fehler beim Laden der Tagger:\n{error_message}\n\n"
+            "Stellen Sie sicher, dass alle Dependencies installiert sind."
+        )
+        self.statusBar().showMessage("Fehler beim Laden der Tagger")
+    
+    def _stop_loader_thread(self):
+        """Beendet den Loader-Thread."""
+        if self.loader_thread:
+            self.loader_thread.quit()
+            self.loader_thread.wait()
+            self.loader_thread = None
+            self.loader = None
+    
+    def get_tagger2(self) -> "WD14Tagger":
+        """
+        Gibt Tagger 2 zurück und lädt ihn beim ersten Aufruf.
+        
+        Wird aus dem Tagging-Thread aufgerufen, damit ein langsamer
+        Modell-Download das Fenster nicht blockiert. Geladen wird in einem
+        eigenen Thread, so dass ein abgebrochener Tagging-Thread das Laden
+        nicht unterbricht.
+        """
+        with self._tagger2_lock:
+            if self._tagger2_thread is None:
+                self._tagger2_ready.clear()
+                self._tagger2_thread = threading.Thread(target=self._load_tagger2, daemon=True)
+                self._tagger2_thread.start()
+        
+        self._tagger2_ready.wait()
+        if self.tagger2 is None:
+            error = self._tagger2_error
+            with self._tagger2_lock:
+                self._tagger2_thread = None  # Beim nächsten Bild erneut versuchen
+            raise RuntimeError(f"Tagger 2 konnte nicht geladen werden: {error}")
+        return self.tagger2
+    
+    def _load_tagger2(self):
+        """Lädt Tagger 2 (läuft im eigenen Thread)."""
         try:
-            # Threshold: Höherer Wert = nur relevantere Tags (Standard: 0.20)
-            # Empfohlen: 0.20-0.35 für mehr Tags, 0.35-0.45 für bessere Qualität
-            threshold = self.threshold_spinbox.value() if hasattr(self, 'threshold_spinbox') else 0.20
-            self.statusBar().showMessage("Lade Tagger 1...")
-            QApplication.processEvents()  # UI aktualisieren
-            
-            # Tagger 1: Standard WD14 (lokales Modell oder wdtagger Standard)
-            self.tagger1 = WD14Tagger(threshold=threshold, use_local=True)
-            
-            self.statusBar().showMessage("Lade Tagger 2...")
-            QApplication.processEvents()
-            
-            # Tagger 2: SwinV2-Variante (falls verfügbar, sonst auch Standard)
-            try:
-                # Versuche SwinV2-Modell zu verwenden (falls wdtagger verfügbar)
-                from wdtagger import Tagger as WDTaggerClass
-                self.tagger2 = WD14Tagger(threshold=threshold, use_local=False)
-                # Falls lokales Modell verwendet wurde, versuche trotzdem einen zweiten Tagger
-                if self.tagger1.local_loader is not None:
-                    # Erstelle zweiten Tagger mit wdtagger (SwinV2)
-                    self.tagger2.wdtagger = WDTaggerClass(model_repo="SmilingWolf/wd-swinv2-tagger-v3")
-                    self.tagger2.local_loader = None
-            except:
-                # Fallback: Verwende denselben Tagger zweimal (besser als nichts)
-                self.tagger2 = WD14Tagger(threshold=threshold, use_local=True)
-            
-            self.statusBar().showMessage("Beide Tagger geladen - Bereit zum Taggen")
+            with startup_profiler.span('tagger2_load'):
+                self.tagger2 = create_tagger2(self.tagger1.threshold, self.tagger1)
         except Exception as e:
-            QMessageBox.critical(
-                self,
-                "Fehler",
-                f"Fehler beim Laden der Tagger:\n{str(e)}\n\n"
-                "Stellen Sie sicher, dass alle Dependencies installiert sind."
-            )
-            self.statusBar().showMessage("Fehler beim Laden der Tagger")
+            self._tagger2_error = str(e)
+        finally:
+            self._tagger2_ready.set()
+    
+    def process_next_pending(self):
+        """Taggt das nächste während des Ladens abgelegte Bild."""
+        if self.pending_images and self.models_ready:
+            context = self.pending_images.pop(0)
+            self.process_image(context.image_path, context)
     
     def on_files_dropped(self, file_paths: list):
         """Wird aufgerufen wenn Dateien per Drag & Drop hinzugefügt werden."""
@@ -518,33 +958,61 @@ class MainWindow(QMainWindow):
             )
             return
         
-        # Verwende das erste Bild
-        image_path = image_files[0]
-        self.process_image(image_path)
+        # Verwende das erste Bild (gelesen und dekodiert wird im Bild-Thread)
+        self.request_image_context(image_files[0])
     
-    def process_image(self, image_path: str):
-        """Verarbeitet ein Bild und generiert Tags."""
-        if not self.tagger1 or not self.tagger2:
-            QMessageBox.warning(
-                self,
-                "Modell nicht geladen",
-                "Die Tagger-Modelle konnten nicht geladen werden."
+    def request_image_context(self, image_path: str):
+        """
+        Lässt ein Bild einmal für die ganze Anfrage lesen und dekodieren.
+        
+        Datei lesen, Hash und Decode laufen im Bild-Thread; das Ergebnis kommt
+        über on_image_context_loaded bzw. on_image_context_error zurück.
+        """
+        self.statusBar().showMessage(f"📂 Lade {Path(image_path).name}...")
+        self.image_requested.emit(image_path)
+    
+    def on_image_context_loaded(self, context: "ImageContext"):
+        """Wird aufgerufen wenn ein Bild im Hintergrund dekodiert wurde."""
+        # Während das Modell lädt: Bild vormerken und nach dem Laden taggen
+        if not self.models_ready and self.loader_thread is not None:
+            self.pending_images.append(context)
+            self.image_preview.set_image_array(context.rgb)
+            self.statusBar().showMessage(
+                f"⏳ {Path(context.image_path).name} wird getaggt, sobald das Modell geladen ist "
+                f"({len(self.pending_images)} in der Warteschlange)"
             )
             return
         
-        # Validiere Bild
-        if not FileHandler.validate_image(image_path):
+        self.process_image(context.image_path, context)
+    
+    def on_image_context_error(self, image_path: str, error_message: str):
+        """Wird aufgerufen wenn ein Bild nicht gelesen oder dekodiert werden konnte."""
+        # Ersetzt die separate Validierung: was sich dekodieren lässt, ist ein gültiges Bild
+        QMessageBox.warning(
+            self,
+            "Ungültiges Bild",
+            "Die ausgewählte Datei ist kein gültiges Bild."
+        )
+        self.statusBar().showMessage(f"Ungültiges Bild: {Path(image_path).name}")
+        if self.profile_image and image_path == self.profile_image:
+            self.profile_image = None
+            self.process_next_pending()
+    
+    def process_image(self, image_path: str, image_context: "ImageContext"):
+        """Verarbeitet ein bereits dekodiertes Bild und generiert Tags."""
+        if not self.tagger1:
             QMessageBox.warning(
                 self,
-                "Ungültiges Bild",
-                "Die ausgewählte Datei ist kein gültiges Bild."
+                "Modell nicht geladen",
+                "Die Tagger-Modelle konnten nicht geladen werden."
             )
             return
         
         self.current_image_path = image_path
+        self.current_context = image_context
         
         # Zeige Bildvorschau
-        self.image_preview.set_image(image_path)
+        self.image_preview.set_image_array(image_context.rgb)
         
         # Starte Tagging im Hintergrund
         self.start_tagging(image_path)
@@ -557,27 +1025,49 @@ class MainWindow(QMainWindow):
                 self.tagger1.threshold = value
             if self.tagger2:
                 self.tagger2.threshold = value
+            
+            # Tags des aktuellen Bildes sofort aus den gespeicherten Ergebnissen neu filtern
+            if self.raw_results and self.raw_results_path == self.current_image_path:
+                tags, tagger_name, rating_tags = TaggingWorker.select_best(self.raw_results, value)
+                self.raw_tags = tags
+                self.selected_tagger_name = tagger_name
+                self.rating_tags = dict(rating_tags) if rating_tags else {}
+                self.on_options_changed()
+                self.statusBar().showMessage(
+                    f"Threshold auf {value:.2f} gesetzt - {len(self.current_tags)} Tags ({tagger_name})"
+                )
+                return
+            
             self.statusBar().showMessage(f"Threshold auf {value:.2f} gesetzt")
         except Exception as e:
             QMessageBox.warning(self, "Fehler", f"Konnte Threshold nicht aktualisieren:\n{str(e)}")
     
+    def on_cascade_changed(self):
+        """Übernimmt die Kaskaden-Einstellungen (gilt ab dem nächsten Bild)."""
+        self.cascade.confidence = self.cascade_confidence_spinbox.value()
+        self.cascade.latency_budget = self.cascade_budget_spinbox.value() / 1000.0
+    
     def start_tagging(self, image_path: str):
         """Startet das Tagging mit beiden Taggern in einem separaten Thread."""
-        if not self.tagger1 or not self.tagger2:
+        if not self.tagger1:
             QMessageBox.warning(self, "Fehler", "Tagger nicht initialisiert!")
             return
         
+        # Bereits dekodiertes Bild wiederverwenden (z.B. bei refresh_tags)
+        image_context = self.current_context
+        if image_context is None or image_context.image_path != image_path:
+            self.request_image_context(image_path)
+            return
+        
         # Stelle sicher, dass beide Tagger den aktuellen Threshold verwenden
         current_threshold = self.threshold_spinbox.value() if hasattr(self, 'threshold_spinbox') else 0.20
         if self.tagger1.threshold != current_threshold:
             self.tagger1.threshold = current_threshold
-        if self.tagger2.threshold != current_threshold:
+        if self.tagger2 and self.tagger2.threshold != current_threshold:
             self.tagger2.threshold = current_threshold
         
-        # Stoppe vorherigen Worker falls vorhanden
-        if self.worker_thread and self.worker_thread.isRunning():
-            self.worker_thread.terminate()
-            self.worker_thread.wait()
+        # Vorherigen Worker abbrechen (läuft im Hintergrund aus, Ergebnisse werden verworfen)
+        self.retire_worker()
         
         # Zeige Progress-Animation
         self.progress_bar.setVisible(True)
@@ -585,12 +1075,18 @@ class MainWindow(QMainWindow):
         self.progress_bar.set_progress(0)
         
         # Erstelle neuen Worker mit beiden Taggern
-        self.worker = TaggingWorker(self.tagger1, self.tagger2, image_path)
+        mode = self.mode_combo.currentData() if hasattr(self, 'mode_combo') else TaggingWorker.MODE_THINKING
+        self.worker = TaggingWorker(self.tagger1, self.get_tagger2, image_context,
+                                    threshold=current_threshold, mode=mode, cascade=self.cascade)
         self.worker_thread = QThread()
         self.worker.moveToThread(self.worker_thread)
         
         # Verbinde Signale
         self.worker_thread.started.connect(self.worker.run)
+        # Direkt im Worker-Thread (quit ist thread-sicher), damit closeEvent auf ihn warten kann
+        self.worker.done.connect(self.worker_thread.quit, Qt.DirectConnection)
+        self.worker.raw_results.connect(self.on_raw_results)
+        self.worker.partial_results.connect(self.on_partial_results)
         self.worker.finished.connect(self.on_tagging_finished)
         self.worker.error.connect(self.on_tagging_error)
         self.worker.progress.connect(self.on_progress_update)
@@ -599,59 +1095,88 @@ class MainWindow(QMainWindow):
         self.worker_thread.start()
         self.statusBar().showMessage(f"🔄 Analysiere {Path(image_path).name} mit beiden Taggern...")
     
+    def retire_worker(self):
+        """
+        Bricht den aktuellen Worker kooperativ ab, ohne auf ihn zu warten.
+        
+        Seine Signale werden getrennt, so dass verspätete Ergebnisse das neue
+        Bild nicht überschreiben; der Thread endet nach dem laufenden Inference-Aufruf.
+        """
+        worker, thread = self.worker, self.worker_thread
+        self.worker = None
+        self.worker_thread = None
+        # Bereits ausgelaufene Worker freigeben
+        self.retired_workers = [(w, t) for w, t in self.retired_workers if t.isRunning()]
+        if worker is None or thread is None or not thread.isRunning():
+            return
+        worker.cancel()
+        for signal in (worker.raw_results, worker.partial_results, worker.finished,
+                       worker.error, worker.progress):
+            signal.disconnect()
+        self.retired_workers.append((worker, thread))
+    
     def on_progress_update(self, message: str, progress: int):
         """Wird aufgerufen wenn Progress aktualisiert wird."""
         self.progress_bar.set_progress(progress)
         self.statusBar().showMessage(message)
     
     def process_tags(self, tags: list) -> list:
-        """Verarbeitet Tags basierend auf den Optionen."""
-        processed_tags = tags.copy()
-        
-        # 1. Tags ausschließen (vor dem Ersetzen von Unterstrichen)
-        exclude_text = self.exclude_tags_input.text().strip()
-        if exclude_text:
-            # Filtere leere Einträge heraus
-            exclude_list = [t.strip().lower() for t in exclude_text.split(',') if t.strip()]
-            if exclude_list:  # Nur filtern, wenn tatsächlich Tags zum Ausschließen vorhanden sind
-                # Vergleiche sowohl mit Unterstrichen als auch ohne (für Flexibilität)
-                processed_tags = [
-                    (tag, conf) for tag, conf in processed_tags
-                    if tag.lower() not in exclude_list and tag.lower().replace('_', ' ') not in exclude_list
-                ]
-        
-        # 2. Unterstriche durch Leerzeichen ersetzen (wenn aktiviert)
-        # WICHTIG: Kaomojis behalten ihre Unterstriche!
-        if self.use_spaces_checkbox.isChecked():
-            processed_tags = [
-                (tag if tag in self.kaomojis else tag.replace('_', ' '), conf) 
-                for tag, conf in processed_tags
-            ]
-        
-        # 3. Alphabetisch sortieren (wenn aktiviert), sonst nach Konfidenz
-        if self.sort_alphabetical_checkbox.isChecked():
-            processed_tags.sort(key=lambda x: x[0].lower())
-        else:
-            processed_tags.sort(key=lambda x: x[1], reverse=True)
-        
-        return processed_tags
+        """Verarbeitet Tags basierend auf den Optionen (gleiche Regeln wie caption_images.py)."""
+        return process_tags(
+            tags,
+            exclude=parse_tag_list(self.exclude_tags_input.text()),
+            use_spaces=self.use_spaces_checkbox.isChecked(),
+            sort_alphabetical=self.sort_alphabetical_checkbox.isChecked(),
+        )
+    
+    def on_raw_results(self, image_path: str, raw_results: dict):
+        """Speichert alle Tags beider Tagger für sofortige Threshold-Änderungen."""
+        self.raw_results = raw_results
+        self.raw_results_path = image_path
+    
+    def on_partial_results(self, image_path: str, tags: list, tagger_name: str = "", rating_tags: dict = None):
+        """Zeigt vorläufige Tags (Durchsatz-Modus: Tagger 1 fertig, Tagger 2 rechnet noch)."""
+        if image_path != self.current_image_path:
+            return
+        self.show_tags(tags, tagger_name, rating_tags)
     
-    def on_tagging_finished(self, image_path: str, tags: list, tagger_name: str = ""):
+    def on_tagging_finished(self, image_path: str, tags: list, tagger_name: str = "", rating_tags: dict = None):
         """Wird aufgerufen wenn Tagging abgeschlossen ist."""
         # Stoppe Progress-Animation
         if hasattr(self, 'progress_bar'):
             self.progress_bar.stop_animation()
             self.progress_bar.setVisible(False)
         
+        self.show_tags(tags, tagger_name, rating_tags)
+        
+        displayed_count = len(self.current_tags)
+        tagger_info = f" ({tagger_name})" if tagger_name else ""
+        self.statusBar().showMessage(
+            f"✅ Fertig - {displayed_count} Tags generiert{tagger_info} für {Path(image_path).name}"
+        )
+        
+        # Stoppe Worker-Thread
+        if self.worker_thread:
+            self.worker_thread.quit()
+            self.worker_thread.wait()
+        
+        # Startzeit-Profil ist vollständig - Anwendung beenden (Bericht gibt main.py aus)
+        if self.profile_image and image_path == self.profile_image:
+            self.profile_image = None
+            QTimer.singleShot(0, self.close)
+            return
+        
+        # Weitere während des Ladens abgelegte Bilder taggen
+        self.process_next_pending()
+    
+    def show_tags(self, tags: list, tagger_name: str = "", rating_tags: dict = None):
+        """Verarbeitet und zeigt die Tags eines Taggers an."""
         # Speichere ursprüngliche Tags
         self.raw_tags = tags.copy()
         self.selected_tagger_name = tagger_name
         
-        # Hole Rating-Tags vom Tagger
-        if self.tagger1 and hasattr(self.tagger1, 'rating_tags'):
-            self.rating_tags = self.tagger1.rating_tags.copy()
-        elif self.tagger2 and hasattr(self.tagger2, 'rating_tags'):
-            self.rating_tags = self.tagger2.rating_tags.copy()
+        # Rating-Tags kommen mit dem Ergebnis aus dem Worker-Thread
+        self.rating_tags = dict(rating_tags) if rating_tags else {}
         
         # Verarbeite Tags basierend auf Optionen
         processed_tags = self.process_tags(tags)
@@ -667,17 +1192,6 @@ class MainWindow(QMainWindow):
             max_tags=max_tags,
             rating_tags=self.rating_tags
         )
-        
-        displayed_count = len(self.current_tags)
-        tagger_info = f" ({tagger_name})" if tagger_name else ""
-        self.statusBar().showMessage(
-            f"✅ Fertig - {displayed_count} Tags generiert{tagger_info} für {Path(image_path).name}"
-        )
-        
-        # Stoppe Worker-Thread
-        if self.worker_thread:
-            self.worker_thread.quit()
-            self.worker_thread.wait()
     
     def on_tagging_error(self, image_path: str, error_message: str):
         """Wird aufgerufen wenn ein Fehler beim Tagging auftritt."""
@@ -696,6 +1210,9 @@ class MainWindow(QMainWindow):
         if self.worker_thread:
             self.worker_thread.quit()
             self.worker_thread.wait()
+        
+        # Weitere während des Ladens abgelegte Bilder taggen
+        self.process_next_pending()
     
     def copy_tags(self):
         """Kopiert die Tags in die Zwischenablage (maximal 25 Tags)."""
@@ -770,7 +1287,7 @@ class MainWindow(QMainWindow):
             )
             return
         
-        if not self.tagger1 or not self.tagger2:
+        if not self.tagger1:
             QMessageBox.warning(self, "Fehler", "Tagger nicht initialisiert!")
             return
         
@@ -778,7 +1295,7 @@ class MainWindow(QMainWindow):
         current_threshold = self.threshold_spinbox.value() if hasattr(self, 'threshold_spinbox') else 0.20
         if self.tagger1.threshold != current_threshold:
             self.tagger1.threshold = current_threshold
-        if self.tagger2.threshold != current_threshold:
+        if self.tagger2 and self.tagger2.threshold != current_threshold:
             self.tagger2.threshold = current_threshold
         
         # Starte Tagging erneut
@@ -788,7 +1305,11 @@ class MainWindow(QMainWindow):
     def clear_all(self):
         """Setzt alles zurück."""
         self.current_image_path = None
+        self.current_context = None
         self.current_tags = []
+        self.raw_tags = []
+        self.raw_results = {}
+        self.raw_results_path = None
         self.image_preview.setText("Kein Bild")
         self.tag_display.clear()
         self.statusBar().showMessage("Zurückgesetzt - Bereit für neues Bild")
@@ -831,9 +1352,20 @@ class MainWindow(QMainWindow):
     
     def closeEvent(self, event):
         """Wird aufgerufen wenn das Fenster geschlossen wird."""
-        # Stoppe Worker-Thread falls aktiv
-        if self.worker_thread and self.worker_thread.isRunning():
-            self.worker_thread.terminate()
-            self.worker_thread.wait()
+        # Worker abbrechen und auslaufen lassen (höchstens einen Inference-Aufruf lang)
+        self.retire_worker()
+        for _, thread in self.retired_workers:
+            if not thread.wait(10000):
+                # Hängt z.B. im Download von Tagger 2 - der Prozess endet ohnehin
+                thread.terminate()
+                thread.wait()
+        # Stoppe Loader-Thread falls das Modell noch lädt
+        if self.loader_thread and self.loader_thread.isRunning():
+            self.loader_thread.terminate()
+            self.loader_thread.wait()
+        # Stoppe Bild-Thread (ein laufender Decode wird noch beendet)
+        if self.image_loader_thread and self.image_loader_thread.isRunning():
+            self.image_loader_thread.quit()
+            self.image_loader_thread.wait()
         event.accept()
 
@@ -1,24 +1,48 @@
 """Haupt-Einstiegspunkt für die Shila-Vision Anwendung."""
 
+from utils.startup_profiler import startup_profiler
+
 import sys
+import argparse
 from PySide6.QtWidgets import QApplication
+from PySide6.QtCore import QTimer
 from gui.main_window import MainWindow
 
 
+def parse_args(argv: list):
+    """Liest die eigenen Optionen, übrige Argumente gehen an Qt."""
+    parser = argparse.ArgumentParser(description="Shila-Vision")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Misst Import-, Fenster-, Modell-Lade- und erste Inference-Zeit")
+    parser.add_argument("--profile-image",
+                        help="Bild, das nach dem Start automatisch getaggt wird (mit --profile-startup)")
+    return parser.parse_known_args(argv[1:])
+
+
 def main():
     """Startet die Anwendung."""
-    app = QApplication(sys.argv)
+    args, qt_args = parse_args(sys.argv)
+    if args.profile_startup:
+        startup_profiler.enable()
+    startup_profiler.mark('imports')
+    
+    app = QApplication([sys.argv[0]] + qt_args)
     app.setApplicationName("Shila-Vision")
     app.setOrganizationName("Shila-Vision")
     
     # Erstelle Hauptfenster
-    window = MainWindow()
+    window = MainWindow(profile_image=args.profile_image if args.profile_startup else None)
     window.show()
     
+    # Erster Durchlauf der Event-Loop = Fenster ist sichtbar
+    QTimer.singleShot(0, lambda: startup_profiler.mark('window_ready'))
+    
     # Starte Event-Loop
-    sys.exit(app.exec())
+    exit_code = app.exec()
+    if startup_profiler.enabled:
+        print(startup_profiler.report())
+    sys.exit(exit_code)
 
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,69 @@
+"""
+Tensor-Cache für Shila-Vision
+Bereitet einen Datensatz einmal vor (Decode, Resize, Letterbox) und speichert die
+448x448-Tensoren in memory-mapped Shards. Wiederholte Tagging-Läufe lesen sie direkt.
+
+Verwendung:
+    python prepare_tensors.py bilder/
+    python prepare_tensors.py bilder/ --cache-dir shila_tensors --workers 8
+"""
+
+import sys
+import time
+import argparse
+
+from utils.file_handler import FileHandler
+
+
+def main():
+    """Hauptfunktion."""
+    parser = argparse.ArgumentParser(description="Bereitet Bilder als Tensor-Cache für wiederholtes Tagging vor")
+    parser.add_argument("sources", nargs="+", help="Bilddateien, Ordner oder Glob-Muster")
+    parser.add_argument("--cache-dir", default="shila_tensors", help="Ordner für Index und Shards")
+    parser.add_argument("--model-dir", default="Modeltagger", help="Modell-Ordner (für das Preprocessing)")
+    parser.add_argument("--workers", type=int, default=4, help="Threads für Decode und Preprocessing")
+    parser.add_argument("--shard-size", type=int, default=256, help="Tensoren pro Shard-Datei")
+    args = parser.parse_args()
+
+    from tagger.local_model_loader import LocalWD14ModelLoader
+    from tagger.tensor_cache import TensorShardCache
+
+    print("=" * 60)
+    print("🚀 Shila-Vision - Tensor-Cache vorbereiten")
+    print("=" * 60)
+
+    try:
+        image_paths = FileHandler.collect_image_files(args.sources)
+        print(f"📷 {len(image_paths)} Bilder gefunden")
+
+        # Gleiches Laden und Preprocessing wie beim Tagging (das Modell wird dafür nicht geladen)
+        loader = LocalWD14ModelLoader(args.model_dir)
+        cache = TensorShardCache(args.cache_dir, shard_size=args.shard_size)
+        removed = cache.prune()
+        if removed:
+            print(f"🧹 {removed} Einträge gelöschter Bilder entfernt (Plätze werden wiederverwendet)")
+
+        start = time.perf_counter()
+        stats = cache.prepare(
+            image_paths,
+            lambda image_path: loader.prepare_image(loader.load_image(image_path)),
+            workers=args.workers,
+        )
+        elapsed = time.perf_counter() - start
+
+        print(f"\n✅ {stats['prepared']} vorbereitet, {stats['skipped']} unverändert übersprungen, "
+              f"{stats['failed']} fehlgeschlagen ({elapsed:.1f} s)")
+        print(f"📦 {len(cache)} Bilder im Cache: {cache.cache_dir}")
+        print(f"\nVerwenden mit: WD14Tagger(tensor_cache=TensorShardCache(\"{args.cache_dir}\"))")
+    except KeyboardInterrupt:
+        print("\n\n❌ Abgebrochen vom Benutzer.")
+        sys.exit(1)
+    except Exception as e:
+        print(f"\n❌ Fehler: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+INT8-Quantisierung für Shila-Vision
+Erstellt Modeltagger/model.int8.onnx und vergleicht es mit dem FP32-Modell.
+
+Verwendung:
+    python quantize_model.py --sample-dir bilder/
+    python quantize_model.py --mode static --calibration-dir kalibrierung/ --sample-dir bilder/
+"""
+
+import sys
+import json
+import argparse
+from pathlib import Path
+
+from utils.file_handler import FileHandler
+
+
+def collect_images(directory: str, limit: int) -> list:
+    """Sammelt Bilder aus einem Ordner (rekursiv, sortiert)."""
+    paths = sorted(str(p) for p in Path(directory).rglob("*") if p.is_file())
+    return FileHandler.filter_image_files(paths)[:limit]
+
+
+def main():
+    """Hauptfunktion."""
+    parser = argparse.ArgumentParser(description="Erstellt eine INT8-Variante des WD14 Modells")
+    parser.add_argument("--model-dir", default="Modeltagger", help="Modell-Ordner mit model.onnx")
+    parser.add_argument("--mode", choices=["dynamic", "static"], default="dynamic",
+                        help="dynamic = nur Gewichte, static = Gewichte und Aktivierungen")
+    parser.add_argument("--calibration-dir", help="Bilder für die statische Kalibrierung")
+    parser.add_argument("--calibration-count", type=int, default=100,
+                        help="Maximale Anzahl Kalibrierungsbilder")
+    parser.add_argument("--per-channel", action="store_true", help="Per-Channel-Quantisierung")
+    parser.add_argument("--sample-dir", help="Bilder für den Genauigkeitsvergleich mit FP32")
+    parser.add_argument("--sample-count", type=int, default=200, help="Maximale Anzahl Vergleichsbilder")
+    parser.add_argument("--threshold", type=float, default=0.35, help="Schwellenwert für den Tag-Vergleich")
+    parser.add_argument("--report", default="quantization_report.json", help="Ausgabedatei für den Bericht")
+    parser.add_argument("--skip-quantize", action="store_true",
+                        help="Vorhandenes model.int8.onnx nur vergleichen")
+    args = parser.parse_args()
+
+    from tagger.quantization import quantize_model, compare_models, format_report
+
+    print("=" * 60)
+    print("🚀 Shila-Vision - INT8-Quantisierung")
+    print("=" * 60)
+
+    try:
+        if not args.skip_quantize:
+            calibration_images = None
+            if args.mode == "static":
+                if not args.calibration_dir:
+                    print("❌ --calibration-dir ist für --mode static erforderlich")
+                    sys.exit(1)
+                calibration_images = collect_images(args.calibration_dir, args.calibration_count)
+                print(f"📷 {len(calibration_images)} Kalibrierungsbilder")
+            quantize_model(args.model_dir, args.mode, calibration_images, args.per_channel)
+
+        if args.sample_dir:
+            sample_images = collect_images(args.sample_dir, args.sample_count)
+            print(f"\n🔬 Vergleiche FP32 und INT8 auf {len(sample_images)} Bildern...")
+            report = compare_models(args.model_dir, sample_images, threshold=args.threshold)
+            with open(args.report, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+            print()
+            print(format_report(report))
+            print(f"\n📝 Bericht gespeichert: {args.report}")
+        else:
+            print("\nℹ️  Kein --sample-dir angegeben - Genauigkeitsvergleich übersprungen.")
+    except KeyboardInterrupt:
+        print("\n\n❌ Abgebrochen vom Benutzer.")
+        sys.exit(1)
+    except Exception as e:
+        print(f"\n❌ Fehler: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+"""
+Lokaler HTTP-Dienst für Shila-Vision
+Hält das WD14-Modell einmal im Speicher und beantwortet Tagging-Anfragen als JSON.
+Gleichzeitige Anfragen werden zu Batches zusammengefasst (Micro-Batching).
+
+Verwendung:
+    python serve.py
+    python serve.py --port 8765 --max-batch-size 16 --max-wait-ms 5
+
+Endpunkte:
+    GET  /health   Prozess läuft
+    GET  /ready    Modell geladen (sonst 503)
+    GET  /stats    Warteschlange, Batches, Anfragen
+    GET  /labels   Tag-Namen nach Output-Index (für probabilities)
+    POST /tag      Bild als Request-Body (?threshold=0.35&probabilities=1)
+                   oder JSON {"path": ...} bzw. {"paths": [...]} mit "threshold", "probabilities"
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import queue
+import signal
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from utils.exporters import result_record
+
+# Maximale Wartezeit einer Anfrage auf ihren Batch (Sekunden)
+REQUEST_TIMEOUT = 60.0
+
+
+class TaggingService:
+    """Modell, Micro-Batcher und Zähler des Dienstes (von allen Request-Threads geteilt)."""
+
+    def __init__(self, args):
+        """
+        Initialisiert den Dienst (das Modell wird mit load() geladen).
+
+        Args:
+            args: Kommandozeilen-Optionen
+        """
+        self.args = args
+        self.threshold = args.threshold
+        self.allowed_roots = [os.path.realpath(root) for root in args.allow_path or []]
+        self.loader = None
+        self.batcher = None
+        self.ready = threading.Event()
+        self.error: Optional[str] = None
+        self.started = time.time()
+        self.counters = {'responses': 0, 'errors': 0, 'rejected': 0}
+        self._counters_lock = threading.Lock()
+
+    def load(self):
+        """Lädt Modell und Micro-Batcher (läuft im Hintergrund, /health antwortet sofort)."""
+        try:
+            from tagger.micro_batcher import MicroBatcher
+            from tagger.session_config import SessionConfig
+            from tagger.wd14_tagger import WD14Tagger
+
+            overrides = {'intra_op_num_threads': self.args.threads} if self.args.threads else {}
+            tensor_cache = None
+            if self.args.tensor_cache:
+                from tagger.tensor_cache import TensorShardCache
+                tensor_cache = TensorShardCache(self.args.tensor_cache)
+            tagger = WD14Tagger(
+                threshold=self.threshold,
+                session_config=SessionConfig.load(**overrides),
+                precision=self.args.precision,
+                tensor_cache=tensor_cache,
+            )
+            if tagger.local_loader is None:
+                raise RuntimeError("Der Dienst benötigt das lokale ONNX-Modell (Modeltagger/model.onnx)")
+            self.loader = tagger.local_loader
+            self.batcher = MicroBatcher(
+                self.loader,
+                max_batch_size=self.args.max_batch_size,
+                max_wait=self.args.max_wait_ms / 1000.0,
+                max_queue=self.args.max_queue,
+                dispatchers=self.args.dispatchers,
+            )
+            self.batcher.start()
+            self.ready.set()
+            print(f"✅ Modell geladen - bereit auf http://{self.args.host}:{self.args.port}")
+        except Exception as e:
+            self.error = str(e)
+            print(f"❌ Modell konnte nicht geladen werden: {e}")
+
+    def count(self, name: str):
+        with self._counters_lock:
+            self.counters[name] += 1
+
+    def check_path(self, image_path: str):
+        """Prüft, ob ein Pfad gelesen werden darf (--allow-path)."""
+        if not self.allowed_roots:
+            return
+        real_path = os.path.realpath(image_path)
+        if not any(real_path == root or real_path.startswith(root + os.sep) for root in self.allowed_roots):
+            raise PermissionError(f"Pfad außerhalb der freigegebenen Ordner: {image_path}")
+
+    def prepare_path(self, image_path: str):
+        """Lädt und bereitet ein Bild von der Platte vor (Tensor-Cache, falls vorhanden)."""
+        self.check_path(image_path)
+        return self.loader.load_prepared(image_path)
+
+    def prepare_upload(self, data: bytes):
+        """Dekodiert und bereitet ein hochgeladenes Bild vor."""
+        return self.loader.prepare_image(self.loader.load_image(io.BytesIO(data)))
+
+    def tag_prepared(self, prepared_images: List, threshold: float) -> List[Tuple[list, dict, object]]:
+        """
+        Taggt vorbereitete Bilder über den Micro-Batcher.
+
+        Returns:
+            Pro Bild ein Tuple von (Tag-Liste, Rating-Tags, Wahrscheinlichkeiten)
+
+        Raises:
+            queue.Full: Wenn nicht alle Bilder in die Warteschlange passen
+        """
+        futures = self.batcher.submit_many(prepared_images)
+        postprocessor = self.loader.get_postprocessor()
+        results = []
+        for future in futures:
+            probabilities = future.result(timeout=REQUEST_TIMEOUT)
+            tag_results, = postprocessor.select(probabilities, threshold)
+            rating_tags, = postprocessor.ratings(probabilities)
+            results.append((tag_results, rating_tags, probabilities))
+        return results
+
+    def stats(self) -> Dict:
+        """Zustand des Dienstes für /stats."""
+        with self._counters_lock:
+            stats = dict(self.counters)
+        stats['ready'] = self.ready.is_set()
+        stats['uptime_seconds'] = round(time.time() - self.started, 1)
+        if self.batcher is not None:
+            stats.update(self.batcher.stats())
+        return stats
+
+
+class TaggingHTTPServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer mit größerem Listen-Backlog für viele gleichzeitige Clients."""
+
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """HTTP-Endpunkte des Dienstes (ein Thread pro Verbindung)."""
+
+    protocol_version = "HTTP/1.1"  # Keep-Alive für Clients mit vielen Anfragen
+    service: TaggingService = None
+
+    def log_message(self, format, *args):
+        if self.service.args.verbose:
+            super().log_message(format, *args)
+
+    def send_json(self, status: int, payload: Dict, headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.service.count('responses' if status < 400 else 'errors')
+
+    def do_GET(self):
+        service = self.service
+        path = urlparse(self.path).path
+        if path == "/health":
+            self.send_json(200, {'status': 'ok', 'uptime_seconds': round(time.time() - service.started, 1)})
+        elif path == "/ready":
+            if service.ready.is_set():
+                self.send_json(200, {'ready': True, 'queue_depth': service.batcher.queue_depth})
+            else:
+                self.send_json(503, {'ready': False, 'error': service.error})
+        elif path == "/stats":
+            self.send_json(200, service.stats())
+        elif path == "/labels":
+            if not service.ready.is_set():
+                self.send_json(503, {'error': 'Modell wird noch geladen'})
+            else:
+                self.send_json(200, {'tag_names': service.loader.get_postprocessor().tag_names.tolist()})
+        else:
+            self.send_json(404, {'error': f'Unbekannter Endpunkt: {path}'})
+
+    def do_POST(self):
+        service = self.service
+        url = urlparse(self.path)
+        if url.path != "/tag":
+            self.send_json(404, {'error': f'Unbekannter Endpunkt: {url.path}'})
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0:
+            self.send_json(400, {'error': 'Leerer Request-Body'})
+            return
+        if length > service.args.max_upload_mb * 1024 * 1024:
+            self.send_json(413, {'error': f'Upload größer als {service.args.max_upload_mb} MB'},
+                           headers={'Connection': 'close'})
+            self.close_connection = True
+            return
+        body = self.rfile.read(length)
+        if not service.ready.is_set():
+            self.send_json(503, {'error': service.error or 'Modell wird noch geladen'}, headers={'Retry-After': '5'})
+            return
+
+        query = parse_qs(url.query)
+        options = {name: values[-1] for name, values in query.items()}
+        paths = None
+        if self.headers.get("Content-Type", "").startswith("application/json"):
+            try:
+                request = json.loads(body)
+            except ValueError as e:
+                self.send_json(400, {'error': f'Ungültiges JSON: {e}'})
+                return
+            paths = self.parse_paths(request)
+            if paths is None:
+                self.send_json(400, {'error': 'JSON benötigt ein Objekt mit "path" (Text) '
+                                              'oder "paths" (Liste von Texten)'})
+                return
+            if len(paths) > service.batcher.queue_capacity:
+                self.send_json(400, {'error': f'Zu viele Pfade (höchstens {service.batcher.queue_capacity})'})
+                return
+            options.update({k: v for k, v in request.items() if k in ('threshold', 'probabilities')})
+
+        try:
+            threshold = float(options.get('threshold', service.threshold))
+        except (TypeError, ValueError):
+            self.send_json(400, {'error': 'Ungültiger threshold'})
+            return
+        include_probabilities = str(options.get('probabilities', '')).lower() in ('1', 'true', 'yes')
+
+        try:
+            if paths is None:
+                self.respond_upload(body, threshold, include_probabilities)
+            else:
+                self.respond_paths(paths, threshold, include_probabilities)
+        except queue.Full:
+            service.count('rejected')
+            self.send_json(503, {'error': 'Warteschlange voll', 'queue_depth': service.batcher.queue_depth},
+                           headers={'Retry-After': '1'})
+        except Exception as e:
+            self.send_json(500, {'error': str(e)})
+
+    @staticmethod
+    def parse_paths(request) -> Optional[List[str]]:
+        """Pfade aus einem JSON-Request ({"path": ...} oder {"paths": [...]}) oder None, wenn ungültig."""
+        if not isinstance(request, dict):
+            return None
+        if 'paths' in request:
+            paths = request['paths']
+            if not isinstance(paths, list) or not paths or not all(isinstance(p, str) for p in paths):
+                return None
+            return paths
+        if isinstance(request.get('path'), str):
+            return [request['path']]
+        return None
+
+    def respond_upload(self, data: bytes, threshold: float, include_probabilities: bool):
+        """Ein hochgeladenes Bild taggen."""
+        try:
+            prepared = self.service.prepare_upload(data)
+        except Exception as e:
+            self.send_json(400, {'error': f'Bild nicht lesbar: {e}'})
+            return
+        (tag_results, rating_tags, probabilities), = self.service.tag_prepared([prepared], threshold)
+        self.send_json(200, result_record(None, tag_results, rating_tags, probabilities, include_probabilities))
+
+    def respond_paths(self, paths: List[str], threshold: float, include_probabilities: bool):
+        """Bilder von der Platte taggen (alle zusammen in den Micro-Batcher)."""
+        prepared_images = []
+        errors = {}
+        for index, image_path in enumerate(paths):
+            try:
+                prepared_images.append((index, self.service.prepare_path(image_path)))
+            except Exception as e:
+                errors[index] = str(e)
+
+        results = self.service.tag_prepared([prepared for _, prepared in prepared_images], threshold)
+        records: List[Optional[Dict]] = [None] * len(paths)
+        for (index, _), (tag_results, rating_tags, probabilities) in zip(prepared_images, results):
+            records[index] = result_record(paths[index], tag_results, rating_tags, probabilities,
+                                           include_probabilities)
+        for index, error in errors.items():
+            records[index] = {'path': paths[index], 'error': error}
+
+        if len(paths) == 1:
+            self.send_json(400 if errors else 200, records[0])
+        else:
+            self.send_json(200, {'results': records})
+
+
+def main():
+    """Hauptfunktion."""
+    parser = argparse.ArgumentParser(description="Lokaler HTTP-Dienst für WD14-Tagging")
+    parser.add_argument("--host", default="127.0.0.1", help="Adresse (Standard: nur lokal erreichbar)")
+    parser.add_argument("--port", type=int, default=8765, help="Port")
+    parser.add_argument("--threshold", type=float, default=0.20, help="Standard-Schwellenwert für Tag-Konfidenz")
+    parser.add_argument("--max-batch-size", type=int, default=16, help="Maximale Bilder pro Session-Aufruf")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0,
+                        help="Maximale Wartezeit auf weitere Anfragen für einen Batch (Millisekunden)")
+    parser.add_argument("--max-queue", type=int, default=256,
+                        help="Maximale Anzahl wartender Bilder (darüber antwortet der Dienst mit 503)")
+    parser.add_argument("--dispatchers", type=int, default=1,
+                        help="Parallele Batches (bis zur Größe des Session-Pools)")
+    parser.add_argument("--threads", type=int, default=0, help="ONNX Runtime Threads (0 = automatisch)")
+    parser.add_argument("--precision", choices=["fp32", "int8"], default="fp32", help="Modell-Variante")
+    parser.add_argument("--tensor-cache", help="Tensor-Cache aus prepare_tensors.py (für Pfad-Anfragen)")
+    parser.add_argument("--allow-path", action="append",
+                        help="Nur Pfade unter diesem Ordner erlauben (mehrfach angebbar; Standard: alle)")
+    parser.add_argument("--max-upload-mb", type=float, default=50.0, help="Maximale Größe eines Uploads")
+    parser.add_argument("--verbose", action="store_true", help="Jede Anfrage protokollieren")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🚀 Shila-Vision - HTTP-Dienst")
+    print("=" * 60)
+
+    service = TaggingService(args)
+    RequestHandler.service = service
+    try:
+        server = TaggingHTTPServer((args.host, args.port), RequestHandler)
+    except OSError as e:
+        print(f"\n❌ Port {args.port} nicht verfügbar: {e}")
+        sys.exit(1)
+
+    # Als Dienst gestoppt (SIGTERM) wie Strg+C behandeln
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, stop)
+
+    threading.Thread(target=service.load, name="model-loader", daemon=True).start()
+    print(f"🌐 Lausche auf http://{args.host}:{args.port} (Modell wird geladen, /ready meldet Bereitschaft)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n⏹️  Dienst beendet")
+    finally:
+        server.server_close()
+        if service.batcher is not None:
+            service.batcher.close()
+
+
+if __name__ == "__main__":
+    main()
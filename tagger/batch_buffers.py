@@ -0,0 +1,107 @@
+"""Vorallokierte Input-/Output-Buffer und IOBinding für die Batch-Inference."""
+
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+
+class BatchBuffers:
+    """
+    Input- und Output-Buffer für einen Batch fester Größe.
+
+    Das Preprocessing schreibt direkt in die Slots von inputs, ONNX Runtime
+    liest per IOBinding direkt daraus und schreibt in outputs. Bindings werden
+    pro Session und Anzahl belegter Slots wiederverwendet.
+    """
+
+    def __init__(self, batch_size: int, input_shape: Tuple[int, ...], num_outputs: int):
+        """
+        Initialisiert die Buffer.
+
+        Args:
+            batch_size: Anzahl Slots
+            input_shape: Shape eines Bildes (H, W, 3)
+            num_outputs: Anzahl Modell-Outputs pro Bild
+        """
+        self.batch_size = batch_size
+        self.inputs = np.empty((batch_size,) + tuple(input_shape), dtype=np.float32)
+        self.outputs = np.empty((batch_size, num_outputs), dtype=np.float32)
+        self._bindings: Dict[Tuple[int, int], object] = {}
+
+    def slot(self, index: int) -> np.ndarray:
+        """Input-Slot eines Bildes (float32, shape: (H, W, 3))."""
+        return self.inputs[index]
+
+    def binding(self, session, input_name: str, output_name: str, count: int):
+        """
+        Gibt das IOBinding für die ersten count Slots zurück.
+
+        Args:
+            session: ONNX Runtime Inference Session
+            input_name: Name des Modell-Inputs
+            output_name: Name des Modell-Outputs
+            count: Anzahl belegter Slots
+
+        Returns:
+            IOBinding auf inputs[:count] und outputs[:count]
+        """
+        key = (id(session), count)
+        binding = self._bindings.get(key)
+        if binding is None:
+            inputs = self.inputs[:count]
+            outputs = self.outputs[:count]
+            binding = session.io_binding()
+            binding.bind_cpu_input(input_name, inputs)
+            binding.bind_output(output_name, 'cpu', 0, np.float32, list(outputs.shape),
+                                outputs.ctypes.data)
+            self._bindings[key] = binding
+        return binding
+
+
+class BatchBufferPool:
+    """
+    Verwaltet wiederverwendbare BatchBuffers pro Batch-Größe.
+
+    Buffer werden bei Bedarf angelegt und nach release() wiederverwendet, so dass
+    ein lang laufender Batch-Worker nach der Anlaufphase nicht mehr alloziert.
+    Get und release dürfen aus verschiedenen Threads kommen (Pipeline-Stages).
+    """
+
+    def __init__(self, input_shape: Tuple[int, ...], num_outputs: int):
+        """
+        Initialisiert den Pool.
+
+        Args:
+            input_shape: Shape eines Bildes (H, W, 3)
+            num_outputs: Anzahl Modell-Outputs pro Bild
+        """
+        self.input_shape = tuple(input_shape)
+        self.num_outputs = num_outputs
+        self._free: Dict[int, List[BatchBuffers]] = {}
+        self._lock = threading.Lock()
+        self.allocated = 0
+
+    def get(self, batch_size: int) -> BatchBuffers:
+        """Leiht Buffer für batch_size Bilder aus (mit release() zurückgeben)."""
+        with self._lock:
+            free = self._free.get(batch_size)
+            if free:
+                return free.pop()
+            self.allocated += 1
+        return BatchBuffers(batch_size, self.input_shape, self.num_outputs)
+
+    def release(self, buffers: BatchBuffers):
+        """Gibt Buffer zur Wiederverwendung zurück."""
+        with self._lock:
+            self._free.setdefault(buffers.batch_size, []).append(buffers)
+
+    @contextmanager
+    def acquire(self, batch_size: int):
+        """Leiht Buffer für die Dauer des with-Blocks aus."""
+        buffers = self.get(batch_size)
+        try:
+            yield buffers
+        finally:
+            self.release(buffers)
@@ -1,34 +1,75 @@
 """Lokaler Modell-Lader für WD 1.4 Tagger mit ONNX."""
 
 import os
+import threading
+import importlib.util
 import numpy as np
 from PIL import Image
 from pathlib import Path
-from typing import Optional, Dict, List, Tuple
+from typing import Optional, Dict, List, Tuple, TYPE_CHECKING
 import csv
 
+from tagger.batch_buffers import BatchBufferPool, BatchBuffers
+from tagger.model_cache import OptimizedModelCache
+from tagger.postprocessing import TagPostprocessor
+from tagger.session_config import SessionConfig
+from tagger.session_pool import SessionPool
+
+if TYPE_CHECKING:
+    from tagger.tensor_cache import TensorShardCache
+
 try:
     import onnxruntime as ort
     ONNX_AVAILABLE = True
 except ImportError:
     ONNX_AVAILABLE = False
 
+# onnx wird nur benötigt, um eine feste Batch-Dimension dynamisch zu machen
+# (Import erst bei Bedarf, onnx verlängert sonst jeden Programmstart)
+ONNX_TOOLS_AVAILABLE = importlib.util.find_spec("onnx") is not None
+
+# Modelldateien je Präzision (model.int8.onnx wird von quantize_model.py erzeugt)
+MODEL_FILES = {
+    "fp32": "model.onnx",
+    "int8": "model.int8.onnx",
+}
+
 
 class LocalWD14ModelLoader:
     """Lädt und verwaltet das lokale WD 1.4 Tagger Modell mit ONNX."""
     
-    def __init__(self, model_dir: str = "Modeltagger"):
+    def __init__(self, model_dir: str = "Modeltagger", session_config: Optional[SessionConfig] = None,
+                 precision: str = "fp32"):
         """
         Initialisiert den lokalen Modell-Lader.
         
         Args:
             model_dir: Pfad zum Modell-Verzeichnis
+            session_config: ONNX Runtime Tuning (Standard: aus Konfigurationsdatei/Umgebung)
+            precision: Modell-Variante ("fp32" oder "int8")
         """
+        if precision not in MODEL_FILES:
+            raise ValueError(
+                f"Ungültige Präzision: {precision} (erlaubt: {', '.join(MODEL_FILES)})"
+            )
         self.model_dir = Path(model_dir)
+        self.precision = precision
+        self.session_config = session_config if session_config is not None else SessionConfig.load()
         self.session: Optional[ort.InferenceSession] = None
+        self.session_pool: Optional[SessionPool] = None
+        self._load_lock = threading.Lock()
+        self._replica_source = None  # Modellquelle für weitere Sessions im Pool
+        self._replica_optimized = False
         self.tags: Dict[int, str] = {}
+        self.postprocessor: Optional[TagPostprocessor] = None
+        self._model_id: Optional[str] = None
         self.device = "cpu"  # Für i5 11600k verwenden wir CPU
         self.loaded = False
+        self.input_name: Optional[str] = None
+        self.output_name: Optional[str] = None
+        self.buffer_pool: Optional[BatchBufferPool] = None  # Vorallokierte Batch-Buffer (IOBinding)
+        self.tensor_cache: Optional["TensorShardCache"] = None  # Vorbereitete Tensoren (prepare_tensors.py)
+        self.max_batch_size: Optional[int] = None  # None = dynamische Batch-Größe
         
         # Prüfe ob CUDA verfügbar ist (optional, für spätere GPU-Nutzung)
         if ONNX_AVAILABLE:
@@ -63,6 +104,10 @@ class LocalWD14ModelLoader:
         
         return tags
     
+    def get_model_file(self) -> Path:
+        """Gibt den Pfad der Modelldatei für die gewählte Präzision zurück."""
+        return self.model_dir / MODEL_FILES[self.precision]
+    
     def load_model(self):
         """
         Lädt das lokale ONNX-Modell.
@@ -73,19 +118,31 @@ class LocalWD14ModelLoader:
         if self.loaded and self.session is not None:
             return self.session
         
+        # Single-Flight: nur ein Thread lädt, alle anderen warten auf dessen Ergebnis
+        with self._load_lock:
+            if self.loaded and self.session is not None:
+                return self.session
+            return self._load_model()
+    
+    def _load_model(self):
+        """Lädt Modell, Session-Pool und Tags (nur unter self._load_lock aufrufen)."""
         if not ONNX_AVAILABLE:
             raise ImportError(
                 "onnxruntime ist nicht installiert. Bitte installieren Sie es mit:\n"
                 "pip install onnxruntime"
             )
         
-        model_file = self.model_dir / "model.onnx"
+        model_file = self.get_model_file()
         
         if not model_file.exists():
-            raise FileNotFoundError(f"ONNX-Modell nicht gefunden: {model_file}")
+            hint = ""
+            if self.precision != "fp32":
+                hint = f"\nErstellen Sie es mit: python quantize_model.py --model-dir {self.model_dir}"
+            raise FileNotFoundError(f"ONNX-Modell nicht gefunden: {model_file}{hint}")
         
-        print(f"Lade lokales WD 1.4 Tagger Modell: {model_file}")
+        print(f"Lade lokales WD 1.4 Tagger Modell: {model_file} ({self.precision})")
         print(f"Verwende Device: {self.device}")
+        print(f"Session-Einstellungen: {self.session_config}")
         
         try:
             # Erstelle ONNX Runtime Session
@@ -103,13 +160,30 @@ class LocalWD14ModelLoader:
             except:
                 pass
             
-            self.session = ort.InferenceSession(
-                str(model_file),
-                providers=providers
-            )
+            self.session = self._create_session(model_file, providers)
+            
+            # Weitere Sessions für parallele Aufrufe aus mehreren Threads
+            sessions = [self.session]
+            for _ in range(self.session_config.session_pool_size - 1):
+                sessions.append(self._create_replica(providers))
+            self.session_pool = SessionPool(sessions)
+            if self.session_pool.size > 1:
+                print(f"Session-Pool mit {self.session_pool.size} Sessions (gemeinsamer Thread-Pool)")
+            
+            self.input_name = self.session.get_inputs()[0].name
+            self.output_name = self.session.get_outputs()[0].name
             
             # Lade Tags
             self.tags = self.load_tags()
+            num_outputs = self.session.get_outputs()[0].shape[-1]
+            self.postprocessor = TagPostprocessor(
+                self.tags,
+                num_outputs=num_outputs if isinstance(num_outputs, int) else None
+            )
+            self.buffer_pool = BatchBufferPool(
+                self._input_image_shape(),
+                num_outputs if isinstance(num_outputs, int) else len(self.tags)
+            )
             
             self.loaded = True
             print(f"Modell erfolgreich geladen! ({len(self.tags)} Tags)")
@@ -120,6 +194,222 @@ class LocalWD14ModelLoader:
             print(f"Fehler beim Laden des Modells: {e}")
             raise
     
+    def _create_session(self, model_file: Path, providers: List[str]):
+        """
+        Erstellt die Inference Session, bevorzugt aus dem Cache optimierter Modelle.
+        
+        Beim ersten Start schreibt ONNX Runtime das optimierte Modell (ORT-Format)
+        in den Cache. Folgestarts laden es direkt, ohne erneutes Parsen und Optimieren.
+        
+        Args:
+            model_file: Pfad zum ONNX-Modell
+            providers: Execution Provider
+            
+        Returns:
+            ONNX Inference Session
+        """
+        cache = None
+        cache_key = None
+        temp_file = None
+        
+        if self.session_config.model_cache:
+            try:
+                cache = OptimizedModelCache(self.session_config.model_cache_dir or None)
+                variant = (f"{self.session_config.graph_optimization_level}|"
+                           f"dynamic_batch={ONNX_TOOLS_AVAILABLE}")
+                cache_key = cache.cache_key(model_file, variant)
+                cached_model = cache.lookup(model_file, cache_key)
+                
+                if cached_model is not None:
+                    try:
+                        options = self.session_config.create_session_options()
+                        # Bereits optimiert - erneute Optimierung überspringen
+                        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+                        session = ort.InferenceSession(
+                            str(cached_model),
+                            sess_options=options,
+                            providers=providers
+                        )
+                        print(f"Optimiertes Modell aus Cache geladen: {cached_model}")
+                        self.max_batch_size = 1 if self._has_fixed_batch_dim(session) else None
+                        self._replica_source = str(cached_model)
+                        self._replica_optimized = True
+                        return session
+                    except Exception as e:
+                        print(f"Gecachtes Modell ungültig, optimiere neu: {e}")
+                        cache.remove(cached_model)
+                
+                temp_file = cache.temp_path(model_file, cache_key)
+            except OSError as e:
+                print(f"Modell-Cache nicht verfügbar: {e}")
+                cache = None
+                temp_file = None
+        
+        def create(model_source):
+            options = self.session_config.create_session_options()
+            if temp_file is not None:
+                options.optimized_model_filepath = str(temp_file)
+                options.add_session_config_entry("session.save_model_format", "ORT")
+            return ort.InferenceSession(model_source, sess_options=options, providers=providers)
+        
+        session = create(str(model_file))
+        self.max_batch_size = None
+        self._replica_source = str(model_file)
+        self._replica_optimized = False
+        
+        # Feste Batch-Dimension (1) erkennen und wenn möglich dynamisch machen
+        if self._has_fixed_batch_dim(session):
+            self.max_batch_size = 1
+            dynamic_model = self._make_batch_dynamic(model_file)
+            if dynamic_model is not None:
+                session = create(dynamic_model)
+                self.max_batch_size = None
+                self._replica_source = dynamic_model
+                print("Feste Batch-Dimension erkannt - Modell auf dynamische Batch-Größe umgestellt")
+            else:
+                print("Feste Batch-Dimension erkannt - Bilder werden einzeln verarbeitet")
+        
+        if cache is not None:
+            try:
+                cached_model = cache.commit(model_file, cache_key, temp_file)
+                if cached_model is not None:
+                    print(f"Optimiertes Modell gecacht: {cached_model}")
+                    self._replica_source = str(cached_model)
+                    self._replica_optimized = True
+            except OSError as e:
+                print(f"Konnte optimiertes Modell nicht cachen: {e}")
+                cache.remove(temp_file)
+        
+        return session
+    
+    def _create_replica(self, providers: List[str]):
+        """Erstellt eine weitere Session aus derselben (ggf. bereits optimierten) Modellquelle."""
+        options = self.session_config.create_session_options()
+        if self._replica_optimized:
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+        return ort.InferenceSession(self._replica_source, sess_options=options, providers=providers)
+    
+    def _input_image_shape(self) -> Tuple[int, int, int]:
+        """Shape eines Bildes im Modell-Input (H, W, 3), Standard 448x448."""
+        shape = self.session.get_inputs()[0].shape[1:]
+        if len(shape) == 3 and all(isinstance(dim, int) for dim in shape):
+            return tuple(shape)
+        return (448, 448, 3)
+    
+    @staticmethod
+    def _has_fixed_batch_dim(session) -> bool:
+        """Prüft ob der Modell-Input eine feste Batch-Dimension von 1 hat."""
+        shape = session.get_inputs()[0].shape
+        return bool(shape) and shape[0] == 1
+    
+    @staticmethod
+    def _make_batch_dynamic(model_file: Path) -> Optional[bytes]:
+        """
+        Ersetzt die feste Batch-Dimension von Inputs und Outputs durch eine dynamische.
+        
+        Args:
+            model_file: Pfad zum ONNX-Modell
+            
+        Returns:
+            Serialisiertes Modell oder None falls onnx nicht verfügbar ist
+        """
+        if not ONNX_TOOLS_AVAILABLE:
+            return None
+        
+        try:
+            import onnx
+            model = onnx.load(str(model_file))
+            for value_info in list(model.graph.input) + list(model.graph.output):
+                dims = value_info.type.tensor_type.shape.dim
+                if dims and dims[0].HasField("dim_value") and dims[0].dim_value == 1:
+                    dims[0].dim_param = "batch_size"
+            # Zwischengespeicherte Shapes enthalten noch die feste Batch-Größe
+            del model.graph.value_info[:]
+            return model.SerializeToString()
+        except Exception as e:
+            print(f"Konnte Batch-Dimension nicht dynamisch machen: {e}")
+            return None
+    
+    def run(self, input_array: np.ndarray) -> np.ndarray:
+        """
+        Führt Inference für einen ganzen Batch mit einem Session-Aufruf durch.
+        Thread-sicher: die Session kommt aus dem Session-Pool.
+        
+        Args:
+            input_array: Preprocessed Batch (float32, shape: (N, H, W, 3))
+            
+        Returns:
+            Modell-Output (shape: (N, num_tags))
+        """
+        if not self.loaded:
+            self.load_model()
+        
+        with self.session_pool.acquire() as session:
+            if self.max_batch_size is None or len(input_array) <= self.max_batch_size:
+                try:
+                    return session.run(None, {self.input_name: input_array})[0]
+                except Exception:
+                    if len(input_array) <= 1:
+                        raise
+                    # Graph enthält vermutlich noch eine feste Batch-Größe
+                    print("Batch-Inference fehlgeschlagen - verarbeite Bilder einzeln")
+                    self.max_batch_size = 1
+            
+            outputs = [
+                session.run(None, {self.input_name: input_array[i:i + self.max_batch_size]})[0]
+                for i in range(0, len(input_array), self.max_batch_size)
+            ]
+        return np.concatenate(outputs, axis=0)
+    
+    def acquire_buffers(self, batch_size: int):
+        """
+        Leiht vorallokierte Batch-Buffer aus (Context Manager).
+        
+        Bilder mit preprocess_image(image, out=buffers.slot(i)) oder
+        write_input(prepared, buffers.slot(i)) hineinschreiben, dann run_buffers().
+        """
+        if not self.loaded:
+            self.load_model()
+        return self.buffer_pool.acquire(batch_size)
+    
+    def run_buffers(self, buffers: BatchBuffers, count: int) -> np.ndarray:
+        """
+        Führt Inference auf den ersten count Slots vorallokierter Buffer durch.
+        
+        Input und Output werden per IOBinding gebunden - ONNX Runtime liest direkt
+        aus buffers.inputs und schreibt direkt in buffers.outputs, ohne Kopien
+        oder neue Output-Arrays.
+        
+        Args:
+            buffers: Buffer aus acquire_buffers() bzw. buffer_pool.get()
+            count: Anzahl belegter Slots
+            
+        Returns:
+            Modell-Output (Sicht auf buffers.outputs, shape: (count, num_tags));
+            nur gültig, solange die Buffer nicht zurückgegeben wurden
+        """
+        if not self.loaded:
+            self.load_model()
+        
+        outputs = buffers.outputs[:count]
+        with self.session_pool.acquire() as session:
+            if self.max_batch_size is None or count <= self.max_batch_size:
+                try:
+                    session.run_with_iobinding(
+                        buffers.binding(session, self.input_name, self.output_name, count))
+                    return outputs
+                except Exception:
+                    if count <= 1:
+                        raise
+                    # Graph enthält vermutlich noch eine feste Batch-Größe
+                    print("Batch-Inference fehlgeschlagen - verarbeite Bilder einzeln")
+                    self.max_batch_size = 1
+            
+            for i in range(0, count, self.max_batch_size):
+                end = min(i + self.max_batch_size, count)
+                outputs[i:end] = session.run(None, {self.input_name: buffers.inputs[i:end]})[0]
+        return outputs
+    
     def get_model(self):
         """Gibt die ONNX Session zurück."""
         if not self.loaded:
@@ -132,12 +422,125 @@ class LocalWD14ModelLoader:
             self.load_model()
         return self.tags
     
-    def preprocess_image(self, image: Image.Image) -> np.ndarray:
+    def get_postprocessor(self) -> TagPostprocessor:
+        """Gibt das vektorisierte Post-Processing für die Modell-Outputs zurück."""
+        if not self.loaded:
+            self.load_model()
+        return self.postprocessor
+    
+    def get_model_id(self) -> str:
+        """
+        Gibt die Identität des Modells zurück (Hash der Modelldatei + Präzision).
+        
+        Der Hash wird über den Modell-Cache nur bei geänderter Datei neu berechnet.
+        """
+        if self._model_id is None:
+            model_cache = OptimizedModelCache(self.session_config.model_cache_dir or None)
+            model_hash = model_cache.model_hash(self.get_model_file())
+            self._model_id = f"{model_hash[:16]}-{self.precision}"
+        return self._model_id
+    
+    def load_image(self, image_path: str) -> Image.Image:
+        """
+        Lädt ein Bild als RGB, große JPEGs direkt in reduzierter Auflösung.
+        
+        Dekodiert wird nur so groß, dass die lange Kante die Modellgröße (448)
+        noch abdeckt - das spart bei großen Fotos Decode-Zeit und Speicher.
+        
+        Args:
+            image_path: Pfad zum Bild
+            
+        Returns:
+            PIL Image (RGB)
+        """
+        try:
+            from utils.image_processing import open_image
+            image = open_image(image_path, target_size=448)
+        except ImportError:
+            image = Image.open(image_path)
+        return image.convert("RGB")
+    
+    def load_prepared(self, image_path: str) -> np.ndarray:
+        """
+        Liefert das Ergebnis von prepare_image für eine Bilddatei.
+        
+        Mit Tensor-Cache wird das vorbereitete Bild ohne Decode direkt aus der
+        Shard-Datei gelesen (read-only Sicht), sonst geladen und vorbereitet.
+        """
+        if self.tensor_cache is not None:
+            prepared = self.tensor_cache.lookup(image_path)
+            if prepared is not None:
+                return prepared
+        return self.prepare_image(self.load_image(image_path))
+    
+    def preprocess_file(self, image_path: str, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Lädt und preprocessed eine Bilddatei (Tensor-Cache, falls vorhanden).
+        
+        Args:
+            image_path: Pfad zum Bild
+            out: Optionaler Batch-Slot (float32, shape: (H, W, 3))
+            
+        Returns:
+            Preprocessed image (BGR, float32, shape: (1, H, W, 3))
+        """
+        if self.tensor_cache is not None:
+            prepared = self.tensor_cache.lookup(image_path)
+            if prepared is not None:
+                if out is None:
+                    out = np.empty(prepared.shape, dtype=np.float32)
+                return self.write_input(prepared, out)[np.newaxis]
+        return self.preprocess_image(self.load_image(image_path), out=out)
+    
+    def get_preprocess_version(self) -> int:
+        """Gibt die Version des verwendeten Preprocessings zurück (0 = Fallback ohne OpenCV)."""
+        try:
+            from utils.image_processing import PREPROCESS_VERSION
+            return PREPROCESS_VERSION
+        except ImportError:
+            return 0
+    
+    def prepare_image(self, image: Image.Image) -> np.ndarray:
+        """
+        Preprocessing bis vor die Float-Konvertierung (für Pipeline-Queues und Batch-Slots).
+        
+        Args:
+            image: PIL Image
+            
+        Returns:
+            Quadratisches RGB-Bild (uint8, shape: (H, W, 3)); ohne OpenCV
+            der fertige Modell-Input eines Bildes (float32)
+        """
+        try:
+            from utils.image_processing import letterbox_for_wd14
+            return letterbox_for_wd14(image, target_size=448)
+        except ImportError:
+            return self.preprocess_image(image)[0]
+    
+    def write_input(self, prepared: np.ndarray, out: np.ndarray) -> np.ndarray:
+        """
+        Schreibt ein Ergebnis von prepare_image als Modell-Input in einen Batch-Slot.
+        
+        Args:
+            prepared: Ergebnis von prepare_image
+            out: Batch-Slot (float32, shape: (H, W, 3))
+            
+        Returns:
+            out
+        """
+        if prepared.dtype == np.uint8:
+            from utils.image_processing import write_wd14_input
+            return write_wd14_input(prepared, out)
+        out[...] = prepared
+        return out
+    
+    def preprocess_image(self, image: Image.Image, out: Optional[np.ndarray] = None) -> np.ndarray:
         """
         Verarbeitet ein Bild für das ONNX-Modell mit verbesserter Bildverarbeitung.
         
         Args:
             image: PIL Image
+            out: Optionaler Batch-Slot (float32, shape: (H, W, 3)), in den direkt geschrieben wird
             
         Returns:
             Preprocessed image as numpy array (BGR, float32, shape: (1, H, W, 3))
@@ -146,7 +549,7 @@ class LocalWD14ModelLoader:
             from utils.image_processing import preprocess_for_wd14
             # Verwende verbesserte Bildverarbeitung
             # Das Modell erwartet [0, 255] Werte in float32, KEINE Normalisierung!
-            img_bgr = preprocess_for_wd14(image, target_size=448)
+            img_bgr = preprocess_for_wd14(image, target_size=448, out=out)
             return img_bgr
             
         except ImportError:
@@ -173,6 +576,9 @@ class LocalWD14ModelLoader:
             img_array = (img_array - mean) / std
             
             # Füge Batch-Dimension hinzu: (1, H, W, C) = (1, 448, 448, 3)
+            if out is not None:
+                out[...] = img_array
+                return out[np.newaxis]
             img_array = np.expand_dims(img_array, axis=0)
             
             return img_array
@@ -0,0 +1,181 @@
+"""Datensatz-Manifest (SQLite) für inkrementelles Tagging großer Verzeichnisse."""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from tagger.result_cache import hash_image_file
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    model_id TEXT NOT NULL,
+    options_version TEXT NOT NULL,
+    updated REAL NOT NULL
+)
+"""
+
+# Einträge pro Schreib-Transaktion
+COMMIT_INTERVAL = 1000
+
+
+def options_version(options: Dict) -> str:
+    """Kurzer Hash über alle Optionen, die das Ergebnis beeinflussen (Threshold, Format, ...)."""
+    encoded = json.dumps(options, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+class DatasetManifest:
+    """
+    Merkt sich pro verarbeitetem Bild Pfad, Größe, Änderungszeit, Inhalts-Hash,
+    Modell-Identität und Options-Version.
+
+    Ein erneuter Lauf über denselben Baum verarbeitet nur neue und geänderte
+    Bilder: Bei gleicher Größe und Änderungszeit wird die Datei nicht gelesen,
+    bei geänderter Änderungszeit entscheidet der Inhalts-Hash (z.B. nach einer
+    Kopie). Einträge gelöschter Bilder werden mit prune() entfernt.
+    """
+
+    def __init__(self, db_path: str = "shila_manifest.sqlite"):
+        """
+        Initialisiert das Manifest.
+
+        Args:
+            db_path: Pfad zur SQLite-Datenbank
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(str(self.db_path), timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(SCHEMA)
+        self.connection.commit()
+        self._pending: List[Tuple] = []
+        self.stats = {'new': 0, 'changed': 0, 'unchanged': 0, 'deleted': 0}
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @staticmethod
+    def _key(image_path: str) -> str:
+        """Manifest-Key: absoluter Pfad."""
+        return os.path.abspath(image_path)
+
+    def _entry(self, key: str) -> Optional[Tuple[int, int, str, str, str]]:
+        return self.connection.execute(
+            "SELECT size, mtime_ns, content_hash, model_id, options_version FROM entries WHERE path = ?",
+            (key,),
+        ).fetchone()
+
+    def changed(self, image_paths: Iterable[str], model_id: str, options: str,
+                seen: Optional[Set[str]] = None) -> Iterator[str]:
+        """
+        Filtert die Bildpfade auf neue und geänderte Bilder.
+
+        Args:
+            image_paths: Bildpfade (auch als Generator)
+            model_id: Identität des Modells (LocalWD14ModelLoader.get_model_id)
+            options: Options-Version (options_version)
+            seen: Wird mit den Keys aller gesehenen Bilder gefüllt (für prune)
+
+        Yields:
+            Bildpfade, die verarbeitet werden müssen
+        """
+        for image_path in image_paths:
+            key = self._key(image_path)
+            if seen is not None:
+                seen.add(key)
+            entry = self._entry(key)
+            if entry is None:
+                self.stats['new'] += 1
+                yield image_path
+                continue
+            size, mtime_ns, content_hash, entry_model, entry_options = entry
+            try:
+                stat = os.stat(image_path)
+            except OSError:
+                yield image_path  # Fehler meldet die Verarbeitung
+                continue
+            if entry_model != model_id or entry_options != options or stat.st_size != size:
+                self.stats['changed'] += 1
+                yield image_path
+            elif stat.st_mtime_ns == mtime_ns:
+                self.stats['unchanged'] += 1
+            else:
+                # Nur die Änderungszeit weicht ab - der Inhalt entscheidet
+                try:
+                    same = hash_image_file(image_path) == content_hash
+                except OSError:
+                    same = False
+                if same:
+                    self._queue(key, stat, content_hash, model_id, options)
+                    self.stats['unchanged'] += 1
+                else:
+                    self.stats['changed'] += 1
+                    yield image_path
+
+    def record(self, image_path: str, model_id: str, options: str):
+        """Trägt ein erfolgreich verarbeitetes Bild ein (gepuffert, siehe flush)."""
+        try:
+            stat = os.stat(image_path)
+            content_hash = hash_image_file(image_path)
+        except OSError as e:
+            print(f"Manifest: {image_path} nicht lesbar: {e}")
+            return
+        self._queue(self._key(image_path), stat, content_hash, model_id, options)
+
+    def _queue(self, key: str, stat: os.stat_result, content_hash: str, model_id: str, options: str):
+        self._pending.append((key, stat.st_size, stat.st_mtime_ns, content_hash, model_id, options, time.time()))
+        if len(self._pending) >= COMMIT_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        """Schreibt gepufferte Einträge in einer Transaktion."""
+        if not self._pending:
+            return
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)", self._pending
+            )
+        self._pending = []
+
+    def prune(self, seen: Set[str]) -> int:
+        """
+        Entfernt Einträge gelöschter Bilder.
+
+        Einträge außerhalb des aktuellen Laufs bleiben erhalten, solange die Datei existiert
+        (z.B. wenn nur ein Unterordner getaggt wurde).
+
+        Args:
+            seen: Keys der Bilder dieses Laufs (aus changed)
+
+        Returns:
+            Anzahl entfernter Einträge
+        """
+        self.flush()
+        deleted = [
+            (key,) for key, in self.connection.execute("SELECT path FROM entries")
+            if key not in seen and not os.path.exists(key)
+        ]
+        if deleted:
+            with self.connection:
+                self.connection.executemany("DELETE FROM entries WHERE path = ?", deleted)
+        self.stats['deleted'] += len(deleted)
+        return len(deleted)
+
+    def close(self):
+        """Schreibt gepufferte Einträge und schließt die Datenbank."""
+        self.flush()
+        self.connection.close()
@@ -0,0 +1,199 @@
+"""Dynamisches Micro-Batching gleichzeitiger Einzelanfragen (z.B. für den HTTP-Dienst)."""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+
+class MicroBatcher:
+    """
+    Fasst einzeln eingereichte Bilder zu Batches für einen Session-Aufruf zusammen.
+
+    Anfragende Threads bereiten ihr Bild selbst vor (Decode und Letterbox laufen
+    damit parallel) und reichen das Ergebnis von prepare_image ein. Ein
+    Dispatcher-Thread wartet nach dem ersten Bild höchstens max_wait Sekunden auf
+    weitere, schreibt bis zu max_batch_size Bilder in vorallokierte Buffer und
+    führt die Inference per IOBinding aus. Jede Anfrage erhält ihren
+    Wahrscheinlichkeitsvektor über ein Future. Die Warteschlange ist begrenzt,
+    damit Überlast als Fehler sichtbar wird statt als wachsende Latenz.
+    """
+
+    def __init__(self, loader, max_batch_size: int = 16, max_wait: float = 0.005,
+                 max_queue: int = 256, dispatchers: int = 1):
+        """
+        Initialisiert den Batcher (Threads starten mit start()).
+
+        Args:
+            loader: LocalWD14ModelLoader (wird beim Start geladen)
+            max_batch_size: Maximale Bilder pro Session-Aufruf
+            max_wait: Maximale Wartezeit in Sekunden nach dem ersten Bild eines Batches
+            max_queue: Maximale Anzahl wartender Bilder
+            dispatchers: Parallele Batches (sinnvoll bis zur Größe des Session-Pools)
+        """
+        self.loader = loader
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait)
+        self.dispatchers = max(1, dispatchers)
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, max_queue))
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._stats_lock = threading.Lock()
+        self._inflight = 0
+        self.requests = 0
+        self.batches = 0
+        self.batched_images = 0
+        self.largest_batch = 0
+        self.inference_seconds = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        """Anzahl wartender Bilder (noch keinem Batch zugeordnet)."""
+        return self._queue.qsize()
+
+    @property
+    def queue_capacity(self) -> int:
+        """Maximale Anzahl wartender Bilder."""
+        return self._queue.maxsize
+
+    def start(self):
+        """Lädt das Modell und startet die Dispatcher-Threads."""
+        if self._threads:
+            return
+        if not self.loader.loaded:
+            self.loader.load_model()
+        for index in range(self.dispatchers):
+            thread = threading.Thread(target=self._dispatch, name=f"micro-batcher-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def close(self):
+        """Beendet die Dispatcher; wartende Anfragen erhalten einen Fehler."""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+        self._threads = []
+        while True:
+            try:
+                _, future = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if future.set_running_or_notify_cancel():
+                future.set_exception(RuntimeError("Micro-Batcher beendet"))
+
+    def submit(self, prepared: np.ndarray) -> Future:
+        """
+        Reicht ein vorbereitetes Bild ein.
+
+        Args:
+            prepared: Ergebnis von loader.prepare_image
+
+        Returns:
+            Future mit dem Wahrscheinlichkeitsvektor (float32, shape: (num_tags,))
+
+        Raises:
+            queue.Full: Wenn die Warteschlange voll ist
+        """
+        future = Future()
+        self._queue.put_nowait((prepared, future))
+        with self._stats_lock:
+            self.requests += 1
+        return future
+
+    def submit_many(self, prepared_images: List[np.ndarray]) -> List[Future]:
+        """
+        Reicht alle Bilder einer Anfrage ein - ganz oder gar nicht.
+
+        Args:
+            prepared_images: Ergebnisse von loader.prepare_image
+
+        Returns:
+            Ein Future pro Bild (Reihenfolge wie prepared_images)
+
+        Raises:
+            queue.Full: Wenn nicht alle Bilder in die Warteschlange passen; bereits
+                eingereichte Bilder der Anfrage werden abgebrochen und nicht gerechnet
+        """
+        if len(prepared_images) > self.queue_capacity - self.queue_depth:
+            raise queue.Full
+        futures = []
+        try:
+            for prepared in prepared_images:
+                futures.append(self.submit(prepared))
+        except queue.Full:
+            # Andere Anfragen waren schneller - der Dispatcher überspringt abgebrochene Futures
+            for future in futures:
+                future.cancel()
+            raise
+        return futures
+
+    def _collect(self) -> List[Tuple[np.ndarray, Future]]:
+        """Wartet auf das erste Bild und sammelt bis zu max_batch_size weitere bis zur Deadline."""
+        try:
+            items = [self._queue.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.max_wait
+        while len(items) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    items.append(self._queue.get(timeout=remaining))
+                else:
+                    items.append(self._queue.get_nowait())  # Bereits Wartende noch mitnehmen
+            except queue.Empty:
+                break
+        return items
+
+    def _dispatch(self):
+        """Dispatcher-Thread: ein Session-Aufruf pro gesammeltem Batch."""
+        postprocessor = self.loader.get_postprocessor()
+        while not self._stop.is_set():
+            items = self._collect()
+            # Abgebrochene Anfragen (z.B. Client-Timeout) nicht mehr rechnen
+            items = [(prepared, future) for prepared, future in items if future.set_running_or_notify_cancel()]
+            if not items:
+                continue
+
+            with self._stats_lock:
+                self._inflight += len(items)
+            start = time.perf_counter()
+            try:
+                with self.loader.buffer_pool.acquire(self.max_batch_size) as buffers:
+                    for index, (prepared, _) in enumerate(items):
+                        self.loader.write_input(prepared, buffers.slot(index))
+                    outputs = self.loader.run_buffers(buffers, len(items))
+                    # Eigene Kopie, bevor die Buffer zurückgehen
+                    probabilities = np.array(postprocessor.to_probabilities(outputs), dtype=np.float32)
+                for index, (_, future) in enumerate(items):
+                    future.set_result(probabilities[index])
+            except Exception as e:
+                print(f"Fehler bei der Batch-Inference: {e}")
+                for _, future in items:
+                    future.set_exception(e)
+            finally:
+                with self._stats_lock:
+                    self._inflight -= len(items)
+                    self.batches += 1
+                    self.batched_images += len(items)
+                    self.largest_batch = max(self.largest_batch, len(items))
+                    self.inference_seconds += time.perf_counter() - start
+
+    def stats(self) -> Dict:
+        """Auslastung: Warteschlange, laufende Bilder, Batches und mittlere Batch-Größe."""
+        with self._stats_lock:
+            return {
+                'queue_depth': self.queue_depth,
+                'queue_capacity': self.queue_capacity,
+                'inflight': self._inflight,
+                'requests': self.requests,
+                'batches': self.batches,
+                'mean_batch_size': round(self.batched_images / self.batches, 2) if self.batches else 0.0,
+                'largest_batch': self.largest_batch,
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': round(self.max_wait * 1000, 2),
+                'inference_seconds': round(self.inference_seconds, 3),
+            }
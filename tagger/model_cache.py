@@ -0,0 +1,147 @@
+"""Cache für optimierte ONNX-Modelle (ORT-Format) für schnelleren Start."""
+
+import os
+import json
+import hashlib
+import platform
+from pathlib import Path
+from typing import Optional
+
+try:
+    import onnxruntime as ort
+    ORT_VERSION = ort.__version__
+except ImportError:
+    ORT_VERSION = "unknown"
+
+HASH_INDEX_FILE = "hashes.json"
+
+
+def default_cache_dir() -> Path:
+    """Standard-Cache-Ordner (auch bei .exe beschreibbar, anders als das PyInstaller temp dir)."""
+    base = os.environ.get("LOCALAPPDATA") or os.environ.get("XDG_CACHE_HOME")
+    base = Path(base) if base else Path.home() / ".cache"
+    return base / "Shila-Vision" / "model_cache"
+
+
+def file_sha256(file_path: Path, chunk_size: int = 1024 * 1024) -> str:
+    """Berechnet den SHA-256 Hash einer Datei blockweise."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class OptimizedModelCache:
+    """
+    Speichert das von ONNX Runtime optimierte Modell im ORT-Format.
+
+    Der Cache-Key besteht aus dem Hash der Modelldatei, der onnxruntime-Version,
+    der CPU-Architektur und einer Variante (z.B. Optimierungsstufe). Ändert sich
+    einer davon, wird das Modell neu optimiert und veraltete Einträge gelöscht.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        """
+        Initialisiert den Cache.
+
+        Args:
+            cache_dir: Cache-Ordner (Standard: Benutzer-Cache)
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir else default_cache_dir()
+
+    def model_hash(self, model_file: Path) -> str:
+        """
+        Gibt den SHA-256 Hash der Modelldatei zurück.
+
+        Der Hash wird zusammen mit Größe und Änderungszeit gespeichert, damit
+        das mehrere hundert MB große Modell nicht bei jedem Start gelesen wird.
+        """
+        model_file = Path(model_file).resolve()
+        stat = model_file.stat()
+        index_file = self.cache_dir / HASH_INDEX_FILE
+
+        index = {}
+        try:
+            with open(index_file, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+        entry = index.get(str(model_file))
+        if entry and entry.get('size') == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns:
+            return entry['sha256']
+
+        sha256 = file_sha256(model_file)
+        index[str(model_file)] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': sha256}
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_file = index_file.with_suffix(".tmp")
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(index, f, indent=2)
+            os.replace(tmp_file, index_file)
+        except OSError as e:
+            print(f"Konnte Hash-Index nicht speichern: {e}")
+        return sha256
+
+    def cache_key(self, model_file: Path, variant: str = "") -> str:
+        """Berechnet den Cache-Key für Modell, onnxruntime-Version und Variante."""
+        parts = [
+            self.model_hash(model_file),
+            ORT_VERSION,
+            platform.machine(),
+            platform.processor(),
+            variant,
+        ]
+        return hashlib.sha256("|".join(parts).encode('utf-8')).hexdigest()[:16]
+
+    @staticmethod
+    def _entry_prefix(model_file: Path) -> str:
+        """Präfix aller Cache-Dateien eines Modellpfads (für das Aufräumen veralteter Einträge)."""
+        model_file = Path(model_file).resolve()
+        path_id = hashlib.sha1(str(model_file).encode('utf-8')).hexdigest()[:8]
+        return f"{model_file.stem}-{path_id}"
+
+    def cached_model_path(self, model_file: Path, key: str) -> Path:
+        """Pfad des optimierten Modells für einen Cache-Key."""
+        return self.cache_dir / f"{self._entry_prefix(model_file)}-{key}.ort"
+
+    def lookup(self, model_file: Path, key: str) -> Optional[Path]:
+        """Gibt das gecachte Modell zurück, falls vorhanden."""
+        cached = self.cached_model_path(model_file, key)
+        if cached.exists() and cached.stat().st_size > 0:
+            return cached
+        return None
+
+    def temp_path(self, model_file: Path, key: str) -> Path:
+        """Temporärer Pfad, in den ONNX Runtime das optimierte Modell schreibt."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        return self.cache_dir / f"{self._entry_prefix(model_file)}-{key}.{os.getpid()}.tmp.ort"
+
+    def commit(self, model_file: Path, key: str, temp_file: Path) -> Optional[Path]:
+        """
+        Übernimmt das geschriebene Modell in den Cache und löscht veraltete Einträge.
+
+        Returns:
+            Pfad des gecachten Modells oder None
+        """
+        temp_file = Path(temp_file)
+        if not temp_file.exists():
+            return None
+
+        cached = self.cached_model_path(model_file, key)
+        os.replace(temp_file, cached)
+
+        # Veraltete Einträge (anderer Hash, andere onnxruntime-Version, ...) entfernen
+        for stale in self.cache_dir.glob(f"{self._entry_prefix(model_file)}-*.ort"):
+            if stale != cached and ".tmp." not in stale.name:
+                self.remove(stale)
+        return cached
+
+    @staticmethod
+    def remove(path: Path):
+        """Löscht eine Cache-Datei (Fehler werden ignoriert)."""
+        try:
+            Path(path).unlink()
+        except OSError:
+            pass
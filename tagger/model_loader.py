@@ -1,12 +1,14 @@
 """Modell-Lader für WD 1.4 Tagger."""
 
 import os
-import torch
-import torchvision.transforms as transforms
 from PIL import Image
-from typing import Optional, Tuple
+from typing import Optional, Tuple, TYPE_CHECKING
 import numpy as np
 
+# torch wird erst beim Erstellen des Loaders importiert (langsamer Import)
+if TYPE_CHECKING:
+    import torch
+
 
 class WD14ModelLoader:
     """Lädt und verwaltet das WD 1.4 Tagger Modell."""
@@ -18,8 +20,10 @@ class WD14ModelLoader:
         Args:
             model_name: HuggingFace Modell-Name oder lokaler Pfad
         """
+        import torch
+        
         self.model_name = model_name
-        self.model: Optional[torch.nn.Module] = None
+        self.model: Optional["torch.nn.Module"] = None
         self.processor = None
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         self.loaded = False
@@ -1,7 +1,6 @@
 """Alternative Modell-Lader für WD 1.4 Tagger mit ONNX-Unterstützung."""
 
 import os
-import torch
 import numpy as np
 from PIL import Image
 from typing import Optional, Tuple
@@ -26,7 +25,13 @@ class WD14ModelLoaderONNX:
         """
         self.model_name = model_name
         self.session: Optional[ort.InferenceSession] = None
-        self.device = "cuda" if torch.cuda.is_available() and ONNX_AVAILABLE else "cpu"
+        # torch nur für die CUDA-Erkennung, erst hier importiert (langsamer Import)
+        try:
+            import torch
+            cuda_available = torch.cuda.is_available()
+        except ImportError:
+            cuda_available = False
+        self.device = "cuda" if cuda_available and ONNX_AVAILABLE else "cpu"
         self.loaded = False
     
     def load_model(self):
@@ -0,0 +1,184 @@
+"""Multi-Prozess-Tagging für große Verzeichnisse (ein Modell pro Worker-Prozess)."""
+
+import os
+import multiprocessing
+from functools import partial
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from tagger.session_config import SessionConfig
+
+# Zustand im Worker-Prozess (wird von _init_worker gesetzt)
+_worker_tagger = None
+_worker_error: Optional[str] = None
+
+
+def default_worker_count() -> int:
+    """Standard-Anzahl Worker: ein Prozess pro 4 Kerne (mindestens 1)."""
+    return max(1, (os.cpu_count() or 1) // 4)
+
+
+def _pin_to_cpus(worker_index: int, threads: int):
+    """Bindet den Worker-Prozess an einen festen Block von Kernen (nur Linux)."""
+    if not hasattr(os, "sched_setaffinity"):
+        print("CPU-Affinität wird auf diesem System nicht unterstützt")
+        return
+    available = sorted(os.sched_getaffinity(0))
+    start = (worker_index * threads) % len(available)
+    cpus = {available[(start + offset) % len(available)] for offset in range(threads)}
+    os.sched_setaffinity(0, cpus)
+
+
+def _init_worker(options: Dict, counter):
+    """Initialisiert einen Worker-Prozess mit eigenem WD14Tagger und festem Thread-Budget."""
+    global _worker_tagger, _worker_error
+
+    with counter.get_lock():
+        worker_index = counter.value
+        counter.value += 1
+
+    try:
+        threads = options['threads']
+        if options['pin_cpus']:
+            _pin_to_cpus(worker_index, threads)
+
+        # OpenCV soll neben ONNX Runtime keine eigenen Threads starten
+        try:
+            import cv2
+            cv2.setNumThreads(1)
+        except ImportError:
+            pass
+
+        from tagger.wd14_tagger import WD14Tagger
+        session_config = SessionConfig.load(
+            intra_op_num_threads=threads,
+            inter_op_num_threads=1,
+            session_pool_size=1,
+        )
+        tensor_cache = None
+        if options['tensor_cache_dir']:
+            from tagger.tensor_cache import TensorShardCache
+            tensor_cache = TensorShardCache(options['tensor_cache_dir'])
+        _worker_tagger = WD14Tagger(
+            threshold=options['threshold'],
+            session_config=session_config,
+            precision=options['precision'],
+            tensor_cache=tensor_cache,
+        )
+    except Exception as e:
+        # Nicht im Initializer abstürzen, sonst startet der Pool den Worker endlos neu
+        _worker_error = f"Worker {worker_index}: {e}"
+
+
+def _tag_chunk(image_paths: List[str], with_probabilities: bool = False) -> List[Tuple[str, list, dict]]:
+    """Taggt einen Block von Bildpfaden im Worker-Prozess."""
+    if _worker_tagger is None:
+        raise RuntimeError(_worker_error or "Worker nicht initialisiert")
+
+    if with_probabilities:
+        return list(_worker_tagger.iter_tag_images(
+            image_paths, batch_size=len(image_paths), decode_workers=1, with_probabilities=True))
+
+    results = _worker_tagger.tag_images(image_paths, batch_size=len(image_paths))
+    return [
+        (image_path, results.get(image_path, []), _worker_tagger.image_ratings.pop(image_path, {}))
+        for image_path in image_paths
+    ]
+
+
+class MultiProcessTagger:
+    """
+    Verteilt Bildpfade auf mehrere Worker-Prozesse.
+
+    Jeder Worker lädt sein eigenes Modell mit festem Thread-Budget (optional an
+    Kerne gebunden), so dass Decode, Preprocessing und Post-Processing nicht
+    mehr an einem einzelnen GIL hängen. Ergebnisse werden blockweise
+    zurückgestreamt, sobald ein Worker fertig ist.
+    """
+
+    def __init__(self, workers: Optional[int] = None, threads_per_worker: Optional[int] = None,
+                 batch_size: int = 16, threshold: float = 0.20, precision: str = "fp32",
+                 pin_cpus: bool = False, tensor_cache_dir: Optional[str] = None):
+        """
+        Initialisiert die Engine (Worker starten erst mit start() bzw. im with-Block).
+
+        Args:
+            workers: Anzahl Worker-Prozesse (Standard: ein Prozess pro 4 Kerne)
+            threads_per_worker: ONNX Runtime Threads pro Worker (Standard: Kerne / Worker)
+            batch_size: Bilder pro Inference-Aufruf und Arbeitspaket
+            threshold: Schwellenwert für Tag-Konfidenz
+            precision: Modell-Variante ("fp32" oder "int8")
+            pin_cpus: Worker an feste Kerne binden (nur Linux)
+            tensor_cache_dir: Tensor-Cache aus prepare_tensors.py (Shards werden von allen
+                Workern gemeinsam über den Page-Cache gelesen)
+        """
+        self.workers = workers or default_worker_count()
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // self.workers)
+        self.batch_size = max(1, batch_size)
+        self.options = {
+            'threads': self.threads_per_worker,
+            'threshold': threshold,
+            'precision': precision,
+            'pin_cpus': pin_cpus,
+            'tensor_cache_dir': tensor_cache_dir,
+        }
+        self.pool = None
+
+    def start(self):
+        """Startet die Worker-Prozesse (spawn, auch unter Windows/PyInstaller lauffähig)."""
+        if self.pool is not None:
+            return
+        context = multiprocessing.get_context("spawn")
+        counter = context.Value('i', 0)
+        print(f"Starte {self.workers} Worker mit je {self.threads_per_worker} Threads")
+        self.pool = context.Pool(
+            processes=self.workers,
+            initializer=_init_worker,
+            initargs=(self.options, counter),
+        )
+
+    def close(self):
+        """Beendet die Worker-Prozesse."""
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and self.pool is not None:
+            self.pool.terminate()
+        self.close()
+
+    def _chunks(self, image_paths: Iterable[str]) -> Iterator[List[str]]:
+        """Teilt die Bildpfade in Arbeitspakete der Größe batch_size."""
+        chunk = []
+        for image_path in image_paths:
+            chunk.append(image_path)
+            if len(chunk) >= self.batch_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def tag_paths(self, image_paths: Iterable[str], ordered: bool = False,
+                  with_probabilities: bool = False) -> Iterator[Tuple[str, List[Tuple[str, float]], Dict[str, float]]]:
+        """
+        Taggt Bilder parallel und liefert die Ergebnisse als Stream.
+
+        Args:
+            image_paths: Bildpfade (auch als Generator)
+            ordered: Ergebnisse in Eingabe-Reihenfolge statt sobald fertig
+            with_probabilities: Zusätzlich den Wahrscheinlichkeitsvektor jedes Bildes liefern
+
+        Yields:
+            Tuple von (Bildpfad, Tag-Liste, Rating-Tags), mit with_probabilities
+            zusätzlich die Wahrscheinlichkeiten
+        """
+        self.start()
+        mapper = self.pool.imap if ordered else self.pool.imap_unordered
+        tag_chunk = partial(_tag_chunk, with_probabilities=with_probabilities)
+        for chunk_results in mapper(tag_chunk, self._chunks(image_paths)):
+            yield from chunk_results
@@ -0,0 +1,302 @@
+"""Streaming-Pipeline: Decode/Preprocess -> Batching -> Inference -> Post-Processing."""
+
+import time
+import queue
+import threading
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+_END = object()  # Markiert das Ende eines Stages
+
+
+class StageStats:
+    """Auslastung eines Pipeline-Stages (Arbeitszeit ohne Warten auf Queues)."""
+
+    def __init__(self, name: str, workers: int = 1):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float, items: int = 1):
+        with self._lock:
+            self.busy_seconds += seconds
+            self.items += items
+
+    def to_dict(self, wall_seconds: float) -> Dict:
+        capacity = wall_seconds * self.workers
+        return {
+            'workers': self.workers,
+            'items': self.items,
+            'busy_seconds': round(self.busy_seconds, 4),
+            'utilization': round(self.busy_seconds / capacity, 3) if capacity > 0 else 0.0,
+        }
+
+
+class TaggingPipeline:
+    """
+    Verarbeitet Bilder in überlappenden Stages statt nacheinander.
+
+    Decode und Preprocessing laufen in einem Thread-Pool (PIL und OpenCV geben
+    den GIL frei), Batches werden vor der Inference gebildet, und begrenzte
+    Queues zwischen den Stages sorgen für Backpressure und konstanten Speicher.
+    Das Post-Processing läuft im aufrufenden Thread.
+
+    Zwischen Decode und Batching liegen uint8-Bilder; die Batch-Stage schreibt
+    sie direkt in die Slots vorallokierter Buffer, die Inference bindet diese
+    per IOBinding. Nach dem Post-Processing gehen die Buffer zurück in den Pool.
+    """
+
+    def __init__(self, loader, threshold: float, batch_size: int = 16, decode_workers: int = 4,
+                 queue_batches: int = 2,
+                 on_probabilities: Optional[Callable[[List[str], np.ndarray], None]] = None,
+                 with_probabilities: bool = False):
+        """
+        Initialisiert die Pipeline.
+
+        Args:
+            loader: Geladener LocalWD14ModelLoader
+            threshold: Schwellenwert für Tag-Konfidenz
+            batch_size: Bilder pro Inference-Aufruf
+            decode_workers: Threads für Decode und Preprocessing
+            queue_batches: Wie viele Batches zwischen den Stages vorgehalten werden
+            on_probabilities: Wird pro Batch mit (Bildpfade, Wahrscheinlichkeiten) aufgerufen
+            with_probabilities: Zusätzlich den Wahrscheinlichkeitsvektor jedes Bildes liefern
+        """
+        self.loader = loader
+        self.threshold = threshold
+        self.batch_size = max(1, batch_size)
+        self.decode_workers = max(1, decode_workers)
+        self.queue_batches = max(1, queue_batches)
+        self.on_probabilities = on_probabilities
+        self.with_probabilities = with_probabilities
+        self.stats: Dict[str, Dict] = {}
+
+    def _put(self, target: queue.Queue, item, stop: threading.Event) -> bool:
+        """Blockierendes put, das bei Abbruch der Pipeline aufgibt."""
+        while not stop.is_set():
+            try:
+                target.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, source: queue.Queue, stop: threading.Event):
+        """Blockierendes get, das bei Abbruch der Pipeline _END liefert."""
+        while not stop.is_set():
+            try:
+                return source.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _END
+
+    def _feed(self, image_paths: Iterable[str], path_queue: queue.Queue, stop: threading.Event,
+              errors: List[BaseException]):
+        """Stage 0: Bildpfade einspeisen (Fehler des Iterables löst run() im aufrufenden Thread aus)."""
+        try:
+            for image_path in image_paths:
+                if not self._put(path_queue, image_path, stop):
+                    return
+        except Exception as e:
+            # Bereits eingespeiste Bilder noch fertig verarbeiten, dann in run() erneut auslösen
+            errors.append(e)
+        for _ in range(self.decode_workers):
+            self._put(path_queue, _END, stop)
+
+    def _decode(self, path_queue: queue.Queue, decoded_queue: queue.Queue,
+                stop: threading.Event, stats: StageStats):
+        """Stage 1: Bild laden und für das Modell vorbereiten."""
+        while True:
+            image_path = self._get(path_queue, stop)
+            if image_path is _END:
+                break
+            start = time.perf_counter()
+            try:
+                item = (image_path, self.loader.load_prepared(image_path))
+            except Exception as e:
+                print(f"Fehler beim Laden des Bildes {image_path}: {e}")
+                item = (image_path, None)
+            stats.add(time.perf_counter() - start)
+            if not self._put(decoded_queue, item, stop):
+                return
+        self._put(decoded_queue, _END, stop)
+
+    def _batch(self, decoded_queue: queue.Queue, batch_queue: queue.Queue,
+               stop: threading.Event, stats: StageStats, errors: List[BaseException]):
+        """Stage 2: Batches direkt in vorallokierten Buffern bilden, während die Inference noch rechnet."""
+        finished_decoders = 0
+        paths: List[str] = []
+        failed: List[str] = []
+        buffers = None
+
+        def flush() -> bool:
+            nonlocal buffers
+            item = (list(paths), buffers, list(failed))
+            paths.clear()
+            failed.clear()
+            buffers = None
+            return self._put(batch_queue, item, stop)
+
+        try:
+            while finished_decoders < self.decode_workers:
+                item = self._get(decoded_queue, stop)
+                if item is _END:
+                    if stop.is_set():
+                        return
+                    finished_decoders += 1
+                    continue
+                image_path, prepared = item
+                if prepared is None:
+                    failed.append(image_path)
+                else:
+                    start = time.perf_counter()
+                    try:
+                        if buffers is None:
+                            buffers = self.loader.buffer_pool.get(self.batch_size)
+                        self.loader.write_input(prepared, buffers.slot(len(paths)))
+                        paths.append(image_path)
+                    except Exception as e:
+                        print(f"Fehler beim Schreiben in den Batch-Buffer {image_path}: {e}")
+                        failed.append(image_path)
+                    stats.add(time.perf_counter() - start)
+                if len(paths) >= self.batch_size and not flush():
+                    return
+
+            if paths or failed:
+                flush()
+        except Exception as e:
+            # Unerwarteter Fehler: in run() im aufrufenden Thread erneut auslösen
+            errors.append(e)
+            if buffers is not None:
+                self.loader.buffer_pool.release(buffers)
+        finally:
+            # Nachfolgende Stages enden immer (bei Abbruch gibt _put sofort auf)
+            self._put(batch_queue, _END, stop)
+
+    def _infer(self, batch_queue: queue.Queue, result_queue: queue.Queue,
+               stop: threading.Event, stats: StageStats):
+        """Stage 3: ein Session-Aufruf pro Batch (IOBinding auf die Batch-Buffer)."""
+        while True:
+            item = self._get(batch_queue, stop)
+            if item is _END:
+                break
+            paths, buffers, failed = item
+            outputs = None
+            if buffers is not None:
+                start = time.perf_counter()
+                try:
+                    outputs = self.loader.run_buffers(buffers, len(paths))
+                except Exception as e:
+                    print(f"Fehler bei der Batch-Inference: {e}")
+                    failed = failed + paths
+                    paths = []
+                stats.add(time.perf_counter() - start, len(paths))
+            if not self._put(result_queue, (paths, buffers, outputs, failed), stop):
+                return
+        self._put(result_queue, _END, stop)
+
+    def run(self, image_paths: Iterable[str]) -> Iterator[Tuple[str, List[Tuple[str, float]], Dict[str, float]]]:
+        """
+        Taggt Bilder als Stream.
+
+        Args:
+            image_paths: Bildpfade (auch als Generator)
+
+        Yields:
+            Tuple von (Bildpfad, Tag-Liste, Rating-Tags); nicht ladbare Bilder mit leeren Tags.
+            Mit with_probabilities zusätzlich der Wahrscheinlichkeitsvektor (None bei Fehlern)
+
+        Raises:
+            Exception: Fehler beim Iterieren von image_paths oder in der Batch-Stage
+                (nach den bis dahin gelieferten Bildern)
+        """
+        postprocessor = self.loader.get_postprocessor()
+        queue_size = self.batch_size * self.queue_batches
+        path_queue = queue.Queue(maxsize=queue_size)
+        decoded_queue = queue.Queue(maxsize=queue_size)
+        batch_queue = queue.Queue(maxsize=self.queue_batches)
+        result_queue = queue.Queue(maxsize=self.queue_batches)
+        stop = threading.Event()
+        stage_errors: List[BaseException] = []  # Von Stage-Threads, in run() erneut ausgelöst
+
+        stage_stats = {
+            'decode': StageStats('decode', self.decode_workers),
+            'batch': StageStats('batch'),
+            'inference': StageStats('inference'),
+            'postprocess': StageStats('postprocess'),
+        }
+
+        threads = [threading.Thread(target=self._feed, args=(image_paths, path_queue, stop, stage_errors),
+                                    daemon=True)]
+        threads += [
+            threading.Thread(target=self._decode, args=(path_queue, decoded_queue, stop, stage_stats['decode']),
+                             daemon=True)
+            for _ in range(self.decode_workers)
+        ]
+        threads.append(threading.Thread(target=self._batch,
+                                        args=(decoded_queue, batch_queue, stop, stage_stats['batch'],
+                                              stage_errors),
+                                        daemon=True))
+        threads.append(threading.Thread(target=self._infer,
+                                        args=(batch_queue, result_queue, stop, stage_stats['inference']),
+                                        daemon=True))
+
+        wall_start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                item = self._get(result_queue, stop)
+                if item is _END:
+                    break
+                paths, buffers, outputs, failed = item
+                for image_path in failed:
+                    yield (image_path, [], {}, None) if self.with_probabilities else (image_path, [], {})
+                if outputs is None:
+                    if buffers is not None:
+                        self.loader.buffer_pool.release(buffers)
+                    continue
+                start = time.perf_counter()
+                probabilities = postprocessor.to_probabilities(outputs)
+                if self.on_probabilities is not None:
+                    self.on_probabilities(paths, probabilities)
+                processed = list(zip(postprocessor.select(probabilities, self.threshold),
+                                     postprocessor.ratings(probabilities)))
+                if self.with_probabilities:
+                    # Eigene Kopie: ohne Sigmoid sind die Wahrscheinlichkeiten eine Sicht auf den Buffer
+                    rows = np.array(probabilities, dtype=np.float32)
+                # Ergebnisse sind kopiert - Buffer für den nächsten Batch freigeben
+                self.loader.buffer_pool.release(buffers)
+                stage_stats['postprocess'].add(time.perf_counter() - start, len(paths))
+                for index, (image_path, (tag_results, rating_tags)) in enumerate(zip(paths, processed)):
+                    if self.with_probabilities:
+                        yield image_path, tag_results, rating_tags, rows[index]
+                    else:
+                        yield image_path, tag_results, rating_tags
+            if stage_errors:
+                raise stage_errors[0]
+        finally:
+            # Auch bei vorzeitigem Abbruch durch den Aufrufer alle Stages beenden
+            stop.set()
+            for thread in threads:
+                thread.join(timeout=1.0)
+            wall_seconds = time.perf_counter() - wall_start
+            self.stats = {name: s.to_dict(wall_seconds) for name, s in stage_stats.items()}
+            self.stats['wall_seconds'] = round(wall_seconds, 4)
+
+
+def format_stats(stats: Dict) -> str:
+    """Formatiert die Stage-Auslastung für die Konsole."""
+    lines = [f"Pipeline: {stats.get('wall_seconds', 0.0):.2f} s"]
+    for name, values in stats.items():
+        if isinstance(values, dict):
+            lines.append(
+                f"  {name:<12} {values['items']:>6} Bilder  "
+                f"{values['busy_seconds']:>8.2f} s  Auslastung {values['utilization'] * 100:5.1f}% "
+                f"({values['workers']} Thread{'s' if values['workers'] != 1 else ''})"
+            )
+    return "\n".join(lines)
@@ -0,0 +1,117 @@
+"""Vektorisiertes Post-Processing für WD 1.4 Tagger Outputs."""
+
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+# scipy wird erst beim ersten Sigmoid importiert (None = noch nicht geprüft)
+_expit = None
+
+# Die ersten 4 Tags sind Rating-Tags (general, sensitive, questionable, explicit)
+RATING_TAG_COUNT = 4
+
+
+def sigmoid(values: np.ndarray) -> np.ndarray:
+    """Wendet Sigmoid an (scipy falls verfügbar, sonst NumPy)."""
+    global _expit
+    if _expit is None:
+        try:
+            from scipy.special import expit
+            _expit = expit
+        except ImportError:
+            _expit = False
+    if _expit:
+        return _expit(values)
+    return 1.0 / (1.0 + np.exp(-np.clip(values, -500, 500)))
+
+
+class TagPostprocessor:
+    """Wandelt Modell-Outputs (N, num_tags) ohne Python-Schleife über die Tags in Tags um."""
+
+    def __init__(self, tags: Dict[int, str], num_outputs: Optional[int] = None,
+                 rating_count: int = RATING_TAG_COUNT):
+        """
+        Initialisiert das Post-Processing.
+
+        Args:
+            tags: Tag-Namen nach Output-Index (aus selected_tags.csv)
+            num_outputs: Anzahl Modell-Outputs (Standard: Anzahl Tags)
+            rating_count: Anzahl der Rating-Tags am Anfang des Outputs
+        """
+        if num_outputs is None:
+            num_outputs = max(tags) + 1 if tags else 0
+
+        self.rating_count = rating_count
+        self.tag_names = np.array(
+            [tags.get(idx, f"tag_{idx}") for idx in range(num_outputs)], dtype=object
+        )
+        self.rating_names = self.tag_names[:rating_count].tolist()
+        self.general_names = self.tag_names[rating_count:]
+
+        # Ob Sigmoid nötig ist, wird einmal beim ersten Output entschieden
+        # (ONNX-Modelle geben oft bereits Sigmoid-Werte zurück)
+        self.apply_sigmoid: Optional[bool] = None
+
+    def to_probabilities(self, outputs: np.ndarray) -> np.ndarray:
+        """
+        Wandelt rohe Modell-Outputs in Wahrscheinlichkeiten um.
+
+        Args:
+            outputs: Modell-Output (shape: (N, num_tags) oder (num_tags,))
+
+        Returns:
+            Wahrscheinlichkeiten (shape: (N, num_tags))
+        """
+        outputs = np.atleast_2d(outputs)
+        if self.apply_sigmoid is None:
+            self.apply_sigmoid = bool(outputs.max() > 1.0 or outputs.min() < 0.0)
+        if self.apply_sigmoid:
+            return sigmoid(outputs)
+        return outputs
+
+    def ratings(self, probabilities: np.ndarray) -> List[Dict[str, float]]:
+        """Schneidet die Rating-Spalten heraus (eine Dict pro Bild)."""
+        rating_block = np.atleast_2d(probabilities)[:, :self.rating_count].tolist()
+        return [dict(zip(self.rating_names, row)) for row in rating_block]
+
+    def select(self, probabilities: np.ndarray, threshold: float,
+               max_tags: Optional[int] = None) -> List[List[Tuple[str, float]]]:
+        """
+        Wählt die Tags über dem Schwellenwert aus.
+
+        Args:
+            probabilities: Wahrscheinlichkeiten (shape: (N, num_tags))
+            threshold: Schwellenwert für Tag-Konfidenz
+            max_tags: Maximale Anzahl Tags pro Bild (None = alle)
+
+        Returns:
+            Pro Bild eine Liste von (tag, confidence) Tupeln, sortiert nach Konfidenz
+        """
+        general = np.atleast_2d(probabilities)[:, self.rating_count:]
+        mask = general >= threshold
+
+        results = []
+        for row, row_mask in zip(general, mask):
+            indices = np.flatnonzero(row_mask)
+            if max_tags and len(indices) > max_tags:
+                top = np.argpartition(row[indices], -max_tags)[-max_tags:]
+                indices = indices[top]
+            # Stabil sortieren, damit gleiche Konfidenzen ihre Reihenfolge behalten
+            order = indices[np.argsort(-row[indices], kind="stable")]
+            results.append(list(zip(self.general_names[order].tolist(), row[order].tolist())))
+        return results
+
+    def process(self, outputs: np.ndarray, threshold: float,
+                max_tags: Optional[int] = None) -> List[Tuple[List[Tuple[str, float]], Dict[str, float]]]:
+        """
+        Kompletter Post-Processing-Schritt für einen ganzen Batch.
+
+        Args:
+            outputs: Roher Modell-Output (shape: (N, num_tags))
+            threshold: Schwellenwert für Tag-Konfidenz
+            max_tags: Maximale Anzahl Tags pro Bild (None = alle)
+
+        Returns:
+            Pro Bild ein Tuple von (Tag-Liste, Rating-Tags)
+        """
+        probabilities = self.to_probabilities(outputs)
+        return list(zip(self.select(probabilities, threshold, max_tags), self.ratings(probabilities)))
@@ -0,0 +1,226 @@
+"""INT8-Quantisierung des WD 1.4 Modells und Genauigkeitsvergleich mit FP32."""
+
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from tagger.local_model_loader import LocalWD14ModelLoader, MODEL_FILES
+
+try:
+    from onnxruntime.quantization import (
+        CalibrationDataReader, QuantFormat, QuantType, quantize_dynamic, quantize_static
+    )
+    QUANTIZATION_AVAILABLE = True
+except ImportError:
+    CalibrationDataReader = object
+    QUANTIZATION_AVAILABLE = False
+
+QUANT_MODES = ("dynamic", "static")
+
+# Dynamische Quantisierung nur für MatMul/Gemm: ConvInteger wird von der CPU
+# nicht überall unterstützt und bringt bei ViT-Modellen kaum etwas
+DYNAMIC_OP_TYPES = ["MatMul", "Gemm"]
+
+
+class ImageCalibrationReader(CalibrationDataReader):
+    """Liefert preprocessed Bilder als Kalibrierungsdaten für die statische Quantisierung."""
+
+    def __init__(self, image_paths: List[str], input_name: str, loader: LocalWD14ModelLoader):
+        self.image_paths = list(image_paths)
+        self.input_name = input_name
+        self.loader = loader
+        self.index = 0
+
+    def get_next(self) -> Optional[Dict[str, np.ndarray]]:
+        while self.index < len(self.image_paths):
+            image_path = self.image_paths[self.index]
+            self.index += 1
+            try:
+                image = self.loader.load_image(image_path)
+                return {self.input_name: self.loader.preprocess_image(image)}
+            except Exception as e:
+                print(f"Überspringe Kalibrierungsbild {image_path}: {e}")
+        return None
+
+    def rewind(self):
+        self.index = 0
+
+
+def quantize_model(model_dir: str, mode: str = "dynamic",
+                   calibration_images: Optional[List[str]] = None,
+                   per_channel: bool = False) -> Path:
+    """
+    Erstellt model.int8.onnx aus model.onnx.
+
+    Args:
+        model_dir: Modell-Verzeichnis mit model.onnx
+        mode: "dynamic" (nur Gewichte) oder "static" (Gewichte und Aktivierungen, braucht Kalibrierungsbilder)
+        calibration_images: Bildpfade für die statische Kalibrierung
+        per_channel: Per-Channel-Quantisierung der Gewichte
+
+    Returns:
+        Pfad des quantisierten Modells
+    """
+    if not QUANTIZATION_AVAILABLE:
+        raise ImportError(
+            "onnxruntime.quantization ist nicht verfügbar. Bitte installieren Sie:\n"
+            "pip install onnxruntime onnx"
+        )
+    if mode not in QUANT_MODES:
+        raise ValueError(f"Ungültiger Modus: {mode} (erlaubt: {', '.join(QUANT_MODES)})")
+
+    model_dir = Path(model_dir)
+    model_file = model_dir / MODEL_FILES["fp32"]
+    output_file = model_dir / MODEL_FILES["int8"]
+    if not model_file.exists():
+        raise FileNotFoundError(f"ONNX-Modell nicht gefunden: {model_file}")
+
+    print(f"Quantisiere {model_file} ({mode}) -> {output_file}")
+
+    if mode == "dynamic":
+        quantize_dynamic(
+            str(model_file),
+            str(output_file),
+            op_types_to_quantize=DYNAMIC_OP_TYPES,
+            per_channel=per_channel,
+            weight_type=QuantType.QInt8,
+        )
+    else:
+        if not calibration_images:
+            raise ValueError("Statische Quantisierung benötigt Kalibrierungsbilder")
+        fp32_loader = LocalWD14ModelLoader(str(model_dir), precision="fp32")
+        input_name = fp32_loader.get_model().get_inputs()[0].name
+        quantize_static(
+            str(model_file),
+            str(output_file),
+            ImageCalibrationReader(calibration_images, input_name, fp32_loader),
+            quant_format=QuantFormat.QDQ,
+            per_channel=per_channel,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+        )
+
+    size_fp32 = model_file.stat().st_size / (1024 * 1024)
+    size_int8 = output_file.stat().st_size / (1024 * 1024)
+    print(f"Fertig: {size_fp32:.1f} MB -> {size_int8:.1f} MB")
+    return output_file
+
+
+def _tag_set(probabilities: np.ndarray, rating_count: int, threshold: float) -> set:
+    """Indizes der allgemeinen Tags über dem Schwellenwert."""
+    return set(np.flatnonzero(probabilities[rating_count:] >= threshold).tolist())
+
+
+def compare_models(model_dir: str, image_paths: List[str], threshold: float = 0.35,
+                   worst_count: int = 10) -> Dict:
+    """
+    Vergleicht das INT8-Modell mit dem FP32-Modell auf einer Stichprobe.
+
+    Args:
+        model_dir: Modell-Verzeichnis mit model.onnx und model.int8.onnx
+        image_paths: Bildpfade der Stichprobe
+        threshold: Schwellenwert für den Tag-Vergleich
+        worst_count: Anzahl der Bilder mit der geringsten Übereinstimmung im Bericht
+
+    Returns:
+        Bericht als Dictionary (JSON-serialisierbar)
+    """
+    loaders = {
+        precision: LocalWD14ModelLoader(str(model_dir), precision=precision)
+        for precision in ("fp32", "int8")
+    }
+    for loader in loaders.values():
+        loader.load_model()
+
+    latencies = {precision: [] for precision in loaders}
+    per_image = []
+    abs_diffs = []
+    rating_matches = 0
+
+    for image_path in image_paths:
+        try:
+            image = loaders["fp32"].load_image(image_path)
+        except Exception as e:
+            print(f"Überspringe {image_path}: {e}")
+            continue
+
+        input_array = loaders["fp32"].preprocess_image(image)
+        probabilities = {}
+        for precision, loader in loaders.items():
+            start = time.perf_counter()
+            outputs = loader.run(input_array)
+            latencies[precision].append(time.perf_counter() - start)
+            probabilities[precision] = loader.get_postprocessor().to_probabilities(outputs)[0]
+
+        fp32, int8 = probabilities["fp32"], probabilities["int8"]
+        rating_count = loaders["fp32"].get_postprocessor().rating_count
+        diff = np.abs(fp32 - int8)
+        abs_diffs.append(diff)
+
+        tags_fp32 = _tag_set(fp32, rating_count, threshold)
+        tags_int8 = _tag_set(int8, rating_count, threshold)
+        union = tags_fp32 | tags_int8
+        jaccard = len(tags_fp32 & tags_int8) / len(union) if union else 1.0
+        rating_match = int(np.argmax(fp32[:rating_count]) == np.argmax(int8[:rating_count]))
+        rating_matches += rating_match
+
+        per_image.append({
+            'image': str(image_path),
+            'jaccard': jaccard,
+            'tags_fp32': len(tags_fp32),
+            'tags_int8': len(tags_int8),
+            'missing_in_int8': len(tags_fp32 - tags_int8),
+            'extra_in_int8': len(tags_int8 - tags_fp32),
+            'max_abs_diff': float(diff.max()),
+            'rating_match': bool(rating_match),
+        })
+
+    if not per_image:
+        raise ValueError("Keine Bilder in der Stichprobe konnten verarbeitet werden")
+
+    all_diffs = np.stack(abs_diffs)
+    total_fp32 = sum(entry['tags_fp32'] for entry in per_image)
+    total_int8 = sum(entry['tags_int8'] for entry in per_image)
+    total_missing = sum(entry['missing_in_int8'] for entry in per_image)
+    total_extra = sum(entry['extra_in_int8'] for entry in per_image)
+
+    def latency_ms(precision: str) -> float:
+        # Erstes Bild (Warm-up) nicht mitzählen, falls möglich
+        values = latencies[precision][1:] or latencies[precision]
+        return float(np.mean(values) * 1000)
+
+    report = {
+        'images': len(per_image),
+        'threshold': threshold,
+        'model_size_mb': {
+            precision: loader.get_model_file().stat().st_size / (1024 * 1024)
+            for precision, loader in loaders.items()
+        },
+        'latency_ms': {precision: latency_ms(precision) for precision in loaders},
+        'mean_jaccard': float(np.mean([entry['jaccard'] for entry in per_image])),
+        'tag_recall': 1.0 - total_missing / total_fp32 if total_fp32 else 1.0,
+        'tag_precision': 1.0 - total_extra / total_int8 if total_int8 else 1.0,
+        'rating_agreement': rating_matches / len(per_image),
+        'mean_abs_prob_diff': float(all_diffs.mean()),
+        'p99_abs_prob_diff': float(np.percentile(all_diffs, 99)),
+        'max_abs_prob_diff': float(all_diffs.max()),
+        'worst_images': sorted(per_image, key=lambda entry: entry['jaccard'])[:worst_count],
+    }
+    return report
+
+
+def format_report(report: Dict) -> str:
+    """Formatiert den Vergleichsbericht für die Konsole."""
+    lines = [
+        f"Bilder:                 {report['images']} (Threshold {report['threshold']:.2f})",
+        f"Modellgröße:            {report['model_size_mb']['fp32']:.1f} MB -> {report['model_size_mb']['int8']:.1f} MB",
+        f"Latenz pro Bild:        {report['latency_ms']['fp32']:.1f} ms -> {report['latency_ms']['int8']:.1f} ms",
+        f"Tag-Übereinstimmung:    {report['mean_jaccard']:.3f} (Jaccard, Mittel)",
+        f"Tag-Recall/Precision:   {report['tag_recall']:.3f} / {report['tag_precision']:.3f}",
+        f"Rating-Übereinstimmung: {report['rating_agreement']:.3f}",
+        f"Wahrsch.-Abweichung:    Mittel {report['mean_abs_prob_diff']:.4f}, "
+        f"P99 {report['p99_abs_prob_diff']:.4f}, Max {report['max_abs_prob_diff']:.4f}",
+    ]
+    return "\n".join(lines)
@@ -0,0 +1,158 @@
+"""Inhaltsadressierter Ergebnis-Cache (SQLite) für Tagging-Ergebnisse."""
+
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    image_hash TEXT NOT NULL,
+    model_id TEXT NOT NULL,
+    preprocess_version INTEGER NOT NULL,
+    probabilities BLOB NOT NULL,
+    ratings TEXT NOT NULL,
+    created REAL NOT NULL,
+    PRIMARY KEY (image_hash, model_id, preprocess_version)
+)
+"""
+
+
+def hash_image_file(image_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 über den Dateiinhalt (unabhängig von Name und Pfad)."""
+    digest = hashlib.sha256()
+    with open(image_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Speichert den vollständigen Wahrscheinlichkeitsvektor und die Rating-Tags pro Bild.
+
+    Key: Hash des Bildinhalts + Modell-Identität + Preprocessing-Version. Umbenannte
+    oder doppelte Bilder werden so ohne Decode und Inference beantwortet. Gleichzeitige
+    Anfragen für denselben Key werden zu einer Berechnung zusammengefasst.
+    """
+
+    def __init__(self, db_path: str = "shila_results.sqlite"):
+        """
+        Initialisiert den Cache.
+
+        Args:
+            db_path: Pfad zur SQLite-Datenbank
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._inflight: Dict[Tuple[str, str, int], Future] = {}
+        self._inflight_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        connection = self._connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(SCHEMA)
+        connection.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Eine SQLite-Verbindung pro Thread."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(str(self.db_path), timeout=30)
+            self._local.connection = connection
+        return connection
+
+    def get(self, image_hash: str, model_id: str,
+            preprocess_version: int) -> Optional[Tuple[np.ndarray, Dict[str, float]]]:
+        """
+        Liest ein Ergebnis aus dem Cache.
+
+        Returns:
+            Tuple von (Wahrscheinlichkeiten, Rating-Tags) oder None
+        """
+        row = self._connection().execute(
+            "SELECT probabilities, ratings FROM results "
+            "WHERE image_hash = ? AND model_id = ? AND preprocess_version = ?",
+            (image_hash, model_id, preprocess_version),
+        ).fetchone()
+        if row is None:
+            return None
+        probabilities = np.frombuffer(row[0], dtype=np.float32)
+        return probabilities, json.loads(row[1])
+
+    def put(self, image_hash: str, model_id: str, preprocess_version: int,
+            probabilities: np.ndarray, ratings: Dict[str, float]):
+        """Speichert ein Ergebnis im Cache."""
+        connection = self._connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                image_hash,
+                model_id,
+                preprocess_version,
+                np.ascontiguousarray(probabilities, dtype=np.float32).tobytes(),
+                json.dumps(ratings),
+                time.time(),
+            ),
+        )
+        connection.commit()
+
+    def get_or_compute(self, image_hash: str, model_id: str, preprocess_version: int,
+                       compute: Callable[[], Tuple[np.ndarray, Dict[str, float]]]) -> Tuple[np.ndarray, Dict[str, float]]:
+        """
+        Liefert das Ergebnis aus dem Cache oder berechnet es genau einmal.
+
+        Args:
+            image_hash: Hash des Bildinhalts
+            model_id: Modell-Identität
+            preprocess_version: Version des Preprocessings
+            compute: Berechnet (Wahrscheinlichkeiten, Rating-Tags) bei einem Cache-Miss
+
+        Returns:
+            Tuple von (Wahrscheinlichkeiten, Rating-Tags)
+        """
+        cached = self.get(image_hash, model_id, preprocess_version)
+        key = (image_hash, model_id, preprocess_version)
+        with self._inflight_lock:
+            if cached is not None:
+                self.hits += 1
+                return cached
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        # Ein anderer Thread berechnet denselben Key bereits
+        if not owner:
+            return future.result()
+
+        try:
+            result = compute()
+            self.put(image_hash, model_id, preprocess_version, result[0], result[1])
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+
+    def close(self):
+        """Schließt die Verbindung des aktuellen Threads."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
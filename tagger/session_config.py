@@ -0,0 +1,186 @@
+"""Einstellungen für ONNX Runtime Sessions (Threads, Optimierung, Speicher)."""
+
+import os
+import json
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+try:
+    import onnxruntime as ort
+    ONNX_AVAILABLE = True
+except ImportError:
+    ONNX_AVAILABLE = False
+
+from tagger.session_pool import ensure_global_thread_pool
+
+# Konfigurationsdatei (JSON) mit Abschnitt "onnxruntime"
+DEFAULT_CONFIG_FILE = "shila_vision.json"
+CONFIG_FILE_ENV = "SHILA_VISION_CONFIG"
+CONFIG_SECTION = "onnxruntime"
+
+EXECUTION_MODES = ("sequential", "parallel")
+OPTIMIZATION_LEVELS = ("disable", "basic", "extended", "all")
+
+
+def parse_bool(value: Any) -> bool:
+    """Wandelt Strings wie '1', 'true', 'ja', 'off' in bool um."""
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ("1", "true", "yes", "ja", "on"):
+        return True
+    if text in ("0", "false", "no", "nein", "off"):
+        return False
+    raise ValueError(f"Ungültiger Wahrheitswert: {value!r}")
+
+
+class SessionConfig:
+    """
+    Tuning-Parameter für LocalWD14ModelLoader.
+
+    Reihenfolge beim Laden: Standardwerte < Konfigurationsdatei < Umgebungsvariablen
+    < explizit übergebene Werte.
+    """
+
+    # Feldname -> (Typ, Standardwert, Umgebungsvariable)
+    FIELDS: Dict[str, tuple] = {
+        'intra_op_num_threads': (int, 0, "SHILA_ORT_INTRA_OP_THREADS"),  # 0 = ORT-Standard
+        'inter_op_num_threads': (int, 0, "SHILA_ORT_INTER_OP_THREADS"),
+        'execution_mode': (str, "sequential", "SHILA_ORT_EXECUTION_MODE"),
+        'graph_optimization_level': (str, "all", "SHILA_ORT_GRAPH_OPTIMIZATION"),
+        'enable_cpu_mem_arena': (parse_bool, True, "SHILA_ORT_CPU_MEM_ARENA"),
+        'enable_mem_pattern': (parse_bool, True, "SHILA_ORT_MEM_PATTERN"),
+        'allow_spinning': (parse_bool, True, "SHILA_ORT_ALLOW_SPINNING"),
+        'model_cache': (parse_bool, True, "SHILA_ORT_MODEL_CACHE"),  # Optimiertes Modell cachen
+        'model_cache_dir': (str, "", "SHILA_ORT_MODEL_CACHE_DIR"),  # "" = Benutzer-Cache
+        'session_pool_size': (int, 1, "SHILA_ORT_SESSIONS"),  # 1 = eine Session für alle Threads
+        'shared_thread_pool': (parse_bool, False, "SHILA_ORT_SHARED_THREAD_POOL"),  # Bei >1 Session immer
+    }
+
+    def __init__(self, **values):
+        """
+        Initialisiert die Konfiguration mit Standardwerten.
+
+        Args:
+            **values: Überschreibt einzelne Felder (siehe FIELDS)
+        """
+        for name, (_, default, _) in self.FIELDS.items():
+            setattr(self, name, default)
+        self.update(**values)
+
+    def update(self, **values) -> "SessionConfig":
+        """Setzt einzelne Felder (None-Werte werden ignoriert) und validiert sie."""
+        for name, value in values.items():
+            if name not in self.FIELDS:
+                raise ValueError(f"Unbekannte Session-Einstellung: {name}")
+            if value is None:
+                continue
+            field_type = self.FIELDS[name][0]
+            setattr(self, name, field_type(value))
+        self._validate()
+        return self
+
+    def _validate(self):
+        """Prüft die Werte auf Gültigkeit."""
+        if self.intra_op_num_threads < 0 or self.inter_op_num_threads < 0:
+            raise ValueError("Thread-Anzahl darf nicht negativ sein")
+        if self.session_pool_size < 1:
+            raise ValueError("session_pool_size muss mindestens 1 sein")
+        self.execution_mode = self.execution_mode.lower()
+        if self.execution_mode not in EXECUTION_MODES:
+            raise ValueError(
+                f"Ungültiger execution_mode: {self.execution_mode} "
+                f"(erlaubt: {', '.join(EXECUTION_MODES)})"
+            )
+        self.graph_optimization_level = self.graph_optimization_level.lower()
+        if self.graph_optimization_level not in OPTIMIZATION_LEVELS:
+            raise ValueError(
+                f"Ungültiger graph_optimization_level: {self.graph_optimization_level} "
+                f"(erlaubt: {', '.join(OPTIMIZATION_LEVELS)})"
+            )
+
+    @classmethod
+    def load(cls, config_file: Optional[str] = None, **overrides) -> "SessionConfig":
+        """
+        Lädt die Konfiguration aus Datei und Umgebungsvariablen.
+
+        Args:
+            config_file: Pfad zur JSON-Datei (Standard: $SHILA_VISION_CONFIG oder shila_vision.json)
+            **overrides: Explizite Werte mit höchster Priorität
+
+        Returns:
+            SessionConfig
+        """
+        config = cls()
+
+        # 1. Konfigurationsdatei
+        path = Path(config_file or os.environ.get(CONFIG_FILE_ENV, DEFAULT_CONFIG_FILE))
+        if path.exists():
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except Exception as e:
+                raise ValueError(f"Fehler beim Lesen der Konfiguration {path}: {e}")
+            config.update(**data.get(CONFIG_SECTION, {}))
+
+        # 2. Umgebungsvariablen
+        env_values = {
+            name: os.environ[env_name]
+            for name, (_, _, env_name) in cls.FIELDS.items()
+            if os.environ.get(env_name, "").strip()
+        }
+        config.update(**env_values)
+
+        # 3. Explizite Werte
+        config.update(**overrides)
+        return config
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Gibt die Konfiguration als Dictionary zurück."""
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    def uses_global_thread_pool(self) -> bool:
+        """Ob die Sessions den prozessweiten Thread-Pool teilen (bei mehreren Sessions immer)."""
+        return self.shared_thread_pool or self.session_pool_size > 1
+
+    def create_session_options(self):
+        """
+        Erstellt die passenden onnxruntime.SessionOptions.
+
+        Returns:
+            onnxruntime.SessionOptions
+        """
+        if not ONNX_AVAILABLE:
+            raise ImportError(
+                "onnxruntime ist nicht installiert. Bitte installieren Sie es mit:\n"
+                "pip install onnxruntime"
+            )
+
+        options = ort.SessionOptions()
+        if self.uses_global_thread_pool():
+            if ensure_global_thread_pool(self.intra_op_num_threads, self.inter_op_num_threads):
+                options.use_per_session_threads = False
+        if options.use_per_session_threads:
+            options.intra_op_num_threads = self.intra_op_num_threads
+            options.inter_op_num_threads = self.inter_op_num_threads
+        options.execution_mode = {
+            "sequential": ort.ExecutionMode.ORT_SEQUENTIAL,
+            "parallel": ort.ExecutionMode.ORT_PARALLEL,
+        }[self.execution_mode]
+        options.graph_optimization_level = {
+            "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+            "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+            "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+            "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+        }[self.graph_optimization_level]
+        options.enable_cpu_mem_arena = self.enable_cpu_mem_arena
+        options.enable_mem_pattern = self.enable_mem_pattern
+
+        spinning = "1" if self.allow_spinning else "0"
+        options.add_session_config_entry("session.intra_op.allow_spinning", spinning)
+        options.add_session_config_entry("session.inter_op.allow_spinning", spinning)
+        return options
+
+    def __repr__(self) -> str:
+        values = ", ".join(f"{k}={v!r}" for k, v in self.to_dict().items())
+        return f"SessionConfig({values})"
@@ -0,0 +1,104 @@
+"""Thread-sicherer Pool von ONNX Runtime Sessions für paralleles Tagging."""
+
+import queue
+import threading
+from contextlib import contextmanager
+from typing import List, Optional
+
+try:
+    import onnxruntime as ort
+    ONNX_AVAILABLE = True
+except ImportError:
+    ONNX_AVAILABLE = False
+
+# Maximale Wartezeit auf eine freie Session (Sekunden); eine verlorene Session
+# (z.B. in einem hart beendeten Thread) soll die Anwendung nicht endlos blockieren
+ACQUIRE_TIMEOUT = 300.0
+
+_global_pool_lock = threading.Lock()
+_global_pool_sizes = None  # (intra, inter) sobald der globale Thread-Pool eingerichtet ist
+
+
+def ensure_global_thread_pool(intra_op_num_threads: int, inter_op_num_threads: int) -> bool:
+    """
+    Richtet den prozessweiten ONNX Runtime Thread-Pool ein.
+
+    Sessions mit use_per_session_threads = False teilen sich diesen Pool, so dass
+    mehrere Sessions die Kerne nicht überbelegen. Der Pool kann nur einmal pro
+    Prozess festgelegt werden; spätere Aufrufe mit anderen Größen werden ignoriert.
+
+    Returns:
+        True wenn der globale Pool verwendet werden kann
+    """
+    global _global_pool_sizes
+
+    if not ONNX_AVAILABLE or not hasattr(ort, "set_global_thread_pool_sizes"):
+        return False
+
+    with _global_pool_lock:
+        if _global_pool_sizes is not None:
+            if _global_pool_sizes != (intra_op_num_threads, inter_op_num_threads):
+                print(f"Globaler Thread-Pool bereits mit {_global_pool_sizes} eingerichtet - "
+                      f"ignoriere ({intra_op_num_threads}, {inter_op_num_threads})")
+            return True
+        try:
+            ort.set_global_thread_pool_sizes(intra_op_num_threads, inter_op_num_threads)
+        except Exception as e:
+            print(f"Globaler Thread-Pool nicht verfügbar: {e}")
+            return False
+        _global_pool_sizes = (intra_op_num_threads, inter_op_num_threads)
+        return True
+
+
+class SessionPool:
+    """
+    Verteilt Inference-Aufrufe mehrerer Threads auf eine oder mehrere Sessions.
+
+    Mit einer Session wird diese von allen Threads gemeinsam genutzt
+    (InferenceSession.run ist thread-sicher). Mit mehreren Sessions bekommt
+    jeder Aufruf exklusiv eine freie Session und wartet sonst.
+    """
+
+    def __init__(self, sessions: List):
+        """
+        Initialisiert den Pool.
+
+        Args:
+            sessions: Bereits erstellte Inference Sessions
+        """
+        if not sessions:
+            raise ValueError("SessionPool benötigt mindestens eine Session")
+        self.sessions = list(sessions)
+        self._available = queue.LifoQueue()
+        for session in self.sessions:
+            self._available.put(session)
+
+    @property
+    def size(self) -> int:
+        """Anzahl der Sessions im Pool."""
+        return len(self.sessions)
+
+    @contextmanager
+    def acquire(self, timeout: Optional[float] = ACQUIRE_TIMEOUT):
+        """
+        Leiht eine Session für die Dauer des with-Blocks aus.
+
+        Args:
+            timeout: Maximale Wartezeit auf eine freie Session in Sekunden (None = unbegrenzt)
+
+        Raises:
+            TimeoutError: Wenn innerhalb von timeout keine Session frei wird
+        """
+        if len(self.sessions) == 1:
+            yield self.sessions[0]
+            return
+
+        try:
+            session = self._available.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(f"Keine freie ONNX-Session nach {timeout:g} s "
+                               f"({self.size} Sessions im Pool)") from None
+        try:
+            yield session
+        finally:
+            self._available.put(session)
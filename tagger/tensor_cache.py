@@ -0,0 +1,251 @@
+"""Cache vorbereiteter Modell-Inputs (uint8-Tensoren) in memory-mapped Shard-Dateien."""
+
+import os
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from utils.image_processing import PREPROCESS_VERSION
+
+INDEX_VERSION = 1
+INDEX_FILE = "index.json"
+
+
+class TensorShardCache:
+    """
+    Speichert das Preprocessing (letterbox_for_wd14, 448x448x3 uint8) eines Datensatzes.
+
+    Die Tensoren liegen in .npy-Shards fester Größe, die per Memory-Mapping
+    gelesen werden; ein Index ordnet jedem Bildpfad Shard und Slot zu.
+    Ein Treffer liefert eine Sicht auf die Shard-Datei - ohne Decode, Resize
+    und Kopie. Einträge gelten nur, solange Größe und Änderungszeit der
+    Bilddatei und die Preprocessing-Version übereinstimmen. Geänderte Bilder
+    behalten ihren Slot, Slots gelöschter Bilder (prune) werden wiederverwendet.
+    """
+
+    def __init__(self, cache_dir: str = "shila_tensors", target_size: int = 448,
+                 shard_size: int = 256, preprocess_version: int = PREPROCESS_VERSION):
+        """
+        Initialisiert den Cache (vorhandener Index wird geladen).
+
+        Args:
+            cache_dir: Ordner für Index und Shards
+            target_size: Kantenlänge der Tensoren
+            shard_size: Tensoren pro Shard-Datei (256 x 448 x 448 x 3 = ca. 150 MB)
+            preprocess_version: Version des Preprocessings (ältere Caches werden verworfen)
+        """
+        self.cache_dir = Path(cache_dir)
+        self.target_size = target_size
+        self.shard_size = max(1, shard_size)
+        self.preprocess_version = preprocess_version
+        self.entries: Dict[str, List[int]] = {}  # Pfad -> [Shard, Slot, Größe, mtime_ns]
+        self.next_slot = 0
+        self.free_slots: List[int] = []  # Slots entfernter Einträge (aufsteigend)
+        self._shards: Dict[int, np.ndarray] = {}  # Geöffnete Shards (read-only Memory-Maps)
+        self._lock = threading.Lock()
+        self._load_index()
+
+    @property
+    def tensor_shape(self) -> tuple:
+        """Shape eines Tensors (H, W, 3)."""
+        return (self.target_size, self.target_size, 3)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @staticmethod
+    def _key(image_path: str) -> str:
+        """Index-Key: absoluter Pfad."""
+        return os.path.abspath(image_path)
+
+    def _shard_path(self, shard: int) -> Path:
+        return self.cache_dir / f"shard-{shard:05d}.npy"
+
+    def _load_index(self):
+        """Lädt den Index; passt er nicht zu Version oder Geometrie, beginnt der Cache leer."""
+        index_file = self.cache_dir / INDEX_FILE
+        if not index_file.exists():
+            return
+        try:
+            with open(index_file, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Tensor-Cache-Index nicht lesbar, beginne neu: {e}")
+            return
+        if (index.get('version') != INDEX_VERSION
+                or index.get('preprocess_version') != self.preprocess_version
+                or index.get('target_size') != self.target_size):
+            print("Tensor-Cache stammt von einem anderen Preprocessing - wird neu aufgebaut")
+            return
+        self.shard_size = index['shard_size']
+        self.entries = index['entries']
+        self.next_slot = index['next_slot']
+        self.free_slots = index.get('free_slots', [])
+
+    def save_index(self):
+        """Schreibt den Index atomar (temporäre Datei + Umbenennen)."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        index = {
+            'version': INDEX_VERSION,
+            'preprocess_version': self.preprocess_version,
+            'target_size': self.target_size,
+            'shard_size': self.shard_size,
+            'next_slot': self.next_slot,
+            'free_slots': self.free_slots,
+            'entries': self.entries,
+        }
+        index_file = self.cache_dir / INDEX_FILE
+        temp_file = index_file.with_suffix(".tmp")
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+        os.replace(temp_file, index_file)
+
+    def _open_shard(self, shard: int, writable: bool = False) -> np.ndarray:
+        """Öffnet eine Shard-Datei als Memory-Map (legt sie beim Schreiben bei Bedarf an)."""
+        path = self._shard_path(shard)
+        if writable:
+            shape = (self.shard_size,) + self.tensor_shape
+            if path.exists():
+                array = np.load(path, mmap_mode='r+')
+                if array.shape == shape and array.dtype == np.uint8:
+                    return array
+                del array  # Shard eines verworfenen Caches - neu anlegen
+            return np.lib.format.open_memmap(path, mode='w+', dtype=np.uint8, shape=shape)
+        return np.load(path, mmap_mode='r')
+
+    def _flush(self, writable: Dict[int, np.ndarray]):
+        """Schreibt geöffnete Shards auf die Platte, dann den Index."""
+        for array in writable.values():
+            array.flush()
+        self.save_index()
+
+    def is_current(self, image_path: str) -> bool:
+        """Prüft ob für das Bild ein gültiger (nicht veralteter) Eintrag existiert."""
+        entry = self.entries.get(self._key(image_path))
+        if entry is None:
+            return False
+        try:
+            stat = os.stat(image_path)
+        except OSError:
+            return False
+        return entry[2] == stat.st_size and entry[3] == stat.st_mtime_ns
+
+    def prune(self) -> int:
+        """
+        Entfernt Einträge, deren Bilddatei nicht mehr existiert.
+
+        Die frei gewordenen Slots werden von prepare() für neue Bilder wiederverwendet.
+
+        Returns:
+            Anzahl entfernter Einträge
+        """
+        missing = [key for key in self.entries if not os.path.exists(key)]
+        for key in missing:
+            shard, slot = self.entries.pop(key)[:2]
+            self.free_slots.append(shard * self.shard_size + slot)
+        if missing:
+            self.free_slots.sort()
+            self.save_index()
+        return len(missing)
+
+    def _allocate(self, key: str) -> Tuple[int, int]:
+        """Shard und Slot für einen Eintrag: bisheriger Slot, freier Slot oder neuer Slot am Ende."""
+        entry = self.entries.get(key)
+        if entry is not None:
+            return entry[0], entry[1]  # Geändertes Bild: alten Tensor überschreiben
+        if self.free_slots:
+            return divmod(self.free_slots.pop(0), self.shard_size)
+        position = self.next_slot
+        self.next_slot += 1
+        return divmod(position, self.shard_size)
+
+    def lookup(self, image_path: str) -> Optional[np.ndarray]:
+        """
+        Liefert den vorbereiteten Tensor eines Bildes.
+
+        Args:
+            image_path: Pfad zum Bild
+
+        Returns:
+            Read-only Sicht in die Shard-Datei (uint8, shape: (H, W, 3)) oder
+            None, wenn das Bild fehlt oder sich seit prepare() geändert hat
+        """
+        if not self.is_current(image_path):
+            return None
+        shard, slot = self.entries[self._key(image_path)][:2]
+        with self._lock:
+            array = self._shards.get(shard)
+            if array is None:
+                try:
+                    array = self._open_shard(shard)
+                except OSError:
+                    return None
+                self._shards[shard] = array
+        return array[slot]
+
+    def prepare(self, image_paths: Iterable[str], prepare_file: Callable[[str], np.ndarray],
+                workers: int = 4, chunk_size: int = 64) -> Dict[str, int]:
+        """
+        Bereitet Bilder einmalig vor und schreibt die Tensoren in die Shards.
+
+        Unveränderte Bilder werden übersprungen, geänderte in ihren bisherigen Slot geschrieben.
+
+        Args:
+            image_paths: Bildpfade
+            prepare_file: Lädt und preprocessed ein Bild (Pfad -> uint8 (H, W, 3)),
+                z.B. LocalWD14ModelLoader.prepare_image(load_image(pfad))
+            workers: Threads für Decode und Preprocessing
+            chunk_size: Bilder pro Arbeitspaket (begrenzt den Speicher)
+
+        Returns:
+            Statistik mit prepared, skipped und failed
+        """
+        stats = {'prepared': 0, 'skipped': 0, 'failed': 0}
+        todo = []
+        for image_path in image_paths:
+            if self.is_current(image_path):
+                stats['skipped'] += 1
+            else:
+                todo.append(image_path)
+        if not todo:
+            return stats
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        def load(image_path):
+            try:
+                tensor = prepare_file(image_path)
+                if tensor.dtype != np.uint8 or tensor.shape != self.tensor_shape:
+                    raise ValueError(f"Unerwarteter Tensor {tensor.dtype} {tensor.shape} "
+                                     "(benötigt OpenCV-Preprocessing)")
+                return os.stat(image_path), tensor
+            except Exception as e:
+                print(f"Fehler beim Vorbereiten von {image_path}: {e}")
+                return None, None
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            for start in range(0, len(todo), chunk_size):
+                chunk = todo[start:start + chunk_size]
+                writable: Dict[int, np.ndarray] = {}
+                for image_path, (stat, tensor) in zip(chunk, executor.map(load, chunk)):
+                    if tensor is None:
+                        stats['failed'] += 1
+                        continue
+                    key = self._key(image_path)
+                    shard, slot = self._allocate(key)
+                    if shard not in writable:
+                        writable[shard] = self._open_shard(shard, writable=True)
+                    writable[shard][slot] = tensor
+                    self.entries[key] = [shard, slot, stat.st_size, stat.st_mtime_ns]
+                    stats['prepared'] += 1
+                # Fortschritt pro Arbeitspaket sichern (nur dessen Memory-Maps sind offen)
+                self._flush(writable)
+
+        # Read-only Maps neu öffnen, damit lookup() die neuen Tensoren sieht
+        with self._lock:
+            self._shards.clear()
+        return stats
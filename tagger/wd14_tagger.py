@@ -2,14 +2,24 @@
 
 import os
 import sys
+import threading
+from collections import deque
 from pathlib import Path
 from PIL import Image
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional, Iterable, Iterator, Callable, TYPE_CHECKING
 import numpy as np
 
+from tagger.pipeline import TaggingPipeline
+from tagger.session_config import SessionConfig
+from tagger.result_cache import ResultCache, hash_image_file
+from utils.image_context import ImageContext
+
+if TYPE_CHECKING:
+    from tagger.tensor_cache import TensorShardCache
+
 # Versuche lokales Modell zu verwenden
 try:
-    from tagger.local_model_loader import LocalWD14ModelLoader
+    from tagger.local_model_loader import LocalWD14ModelLoader, MODEL_FILES
     LOCAL_MODEL_AVAILABLE = True
 except ImportError:
     LOCAL_MODEL_AVAILABLE = False
@@ -18,11 +28,20 @@ except ImportError:
 WDTAGGER_AVAILABLE = None  # None = noch nicht geprüft
 WDTagger = None
 
+# Standard-Batch-Größe für tag_images (8-32 ist auf CPUs ein guter Bereich)
+DEFAULT_BATCH_SIZE = 16
+
+# Decode-Threads der Pipeline (PIL/OpenCV geben den GIL frei)
+DEFAULT_DECODE_WORKERS = 4
+
 
 class WD14Tagger:
     """Hauptklasse für das Tagging von Bildern mit WD 1.4."""
     
-    def __init__(self, model_name: str = None, threshold: float = 0.20, use_local: bool = True):
+    def __init__(self, model_name: str = None, threshold: float = 0.20, use_local: bool = True,
+                 session_config: Optional[SessionConfig] = None, precision: str = "fp32",
+                 result_cache: Optional[ResultCache] = None,
+                 tensor_cache: Optional["TensorShardCache"] = None):
         """
         Initialisiert den Tagger.
         
@@ -30,12 +49,28 @@ class WD14Tagger:
             model_name: HuggingFace Modell-Name (optional, nur wenn use_local=False)
             threshold: Schwellenwert für Tag-Konfidenz (0.0-1.0)
             use_local: Ob lokales Modell verwendet werden soll (Standard: True)
+            session_config: ONNX Runtime Tuning für das lokale Modell
+                (Standard: aus shila_vision.json bzw. SHILA_ORT_* Umgebungsvariablen)
+            precision: Modell-Variante des lokalen Modells ("fp32" oder "int8")
+            result_cache: Ergebnis-Cache nach Bildinhalt (nur für das lokale Modell)
+            tensor_cache: Vorbereitete Modell-Inputs aus prepare_tensors.py (nur für das lokale Modell)
+        
+        Raises:
+            ValueError: Bei unbekannter Präzision
         """
+        if use_local and LOCAL_MODEL_AVAILABLE and precision not in MODEL_FILES:
+            raise ValueError(
+                f"Ungültige Präzision: {precision} (erlaubt: {', '.join(MODEL_FILES)})"
+            )
         self.threshold = threshold
         self.use_local = use_local
         self.local_loader = None
         self.wdtagger = None
         self.rating_tags = {}  # Rating-Tags (general, sensitive, questionable, explicit)
+        self.image_ratings = {}  # Rating-Tags pro Bildpfad (aus tag_images)
+        self._wdtagger_lock = threading.Lock()
+        self.last_pipeline_stats = {}  # Stage-Auslastung des letzten Pipeline-Laufs
+        self.result_cache = result_cache
         
         # Versuche zuerst lokales Modell zu verwenden
         if use_local and LOCAL_MODEL_AVAILABLE:
@@ -56,7 +91,16 @@ class WD14Tagger:
             if model_dir:
                 try:
                     print(f"Verwende lokales Modell aus {model_dir}")
-                    self.local_loader = LocalWD14ModelLoader(str(model_dir))
+                    if precision != "fp32" and not (model_dir / MODEL_FILES[precision]).exists():
+                        print(f"Keine {precision}-Variante gefunden - verwende fp32 "
+                              f"(erstellen mit: python quantize_model.py)")
+                        precision = "fp32"
+                    self.local_loader = LocalWD14ModelLoader(
+                        str(model_dir),
+                        session_config=session_config,
+                        precision=precision
+                    )
+                    self.local_loader.tensor_cache = tensor_cache
                     self.local_loader.load_model()
                     return
                 except Exception as e:
@@ -85,30 +129,61 @@ class WD14Tagger:
         """
         Taggt ein einzelnes Bild.
         
+        Die Rating-Tags des Aufrufs landen zusätzlich in self.rating_tags. Bei
+        parallelen Aufrufen aus mehreren Threads stattdessen
+        tag_image_with_ratings verwenden.
+        
         Args:
             image_path: Pfad zum Bild
             
         Returns:
             Liste von (tag, confidence) Tupeln, sortiert nach Konfidenz
         """
-        try:
-            # Lade Bild
-            image = Image.open(image_path).convert("RGB")
+        tag_results, rating_tags = self.tag_image_with_ratings(image_path)
+        self.rating_tags = rating_tags
+        return tag_results
+    
+    def tag_image_with_ratings(self, image_path: str, threshold: Optional[float] = None,
+                               image_context: Optional[ImageContext] = None) -> Tuple[List[Tuple[str, float]], Dict[str, float]]:
+        """
+        Taggt ein einzelnes Bild ohne Zustand im Tagger zu verändern (thread-sicher).
+        
+        Args:
+            image_path: Pfad zum Bild
+            threshold: Abweichender Schwellenwert (None = self.threshold, 0.0 = alle Tags)
+            image_context: Bereits geladenes Bild (wird nicht erneut gelesen und dekodiert)
             
+        Returns:
+            Tuple von (Tag-Liste sortiert nach Konfidenz, Rating-Tags)
+        """
+        if threshold is None:
+            threshold = self.threshold
+        try:
             # Verwende lokales Modell falls verfügbar
             if self.local_loader is not None:
-                return self._tag_with_local_model(image)
+                if self.result_cache is not None:
+                    return self._tag_with_result_cache(image_path, threshold, image_context)
+                return self._tag_with_local_model(self._model_input(image_path, image_context), threshold)
+            
+            # Lade Bild
+            if image_context is not None:
+                image = image_context.image
+            else:
+                image = Image.open(image_path).convert("RGB")
             
             # Fallback: wdtagger
             if self.wdtagger is not None:
-                # wdtagger verwendet .tag() nicht .predict()
-                result = self.wdtagger.tag(image, general_threshold=self.threshold)
+                # wdtagger ist nicht als thread-sicher dokumentiert
+                with self._wdtagger_lock:
+                    # wdtagger verwendet .tag() nicht .predict()
+                    result = self.wdtagger.tag(image, general_threshold=threshold)
                 # Result hat general_tag, character_tag, rating_data
                 tag_results = []
+                rating_tags = {}
                 
                 # Extrahiere Rating-Tags
                 if hasattr(result, 'rating_data'):
-                    self.rating_tags = {k: float(v) for k, v in result.rating_data.items()}
+                    rating_tags = {k: float(v) for k, v in result.rating_data.items()}
                 
                 # Kombiniere general und character tags
                 if hasattr(result, 'general_tag'):
@@ -116,88 +191,321 @@ class WD14Tagger:
                 if hasattr(result, 'character_tag'):
                     tag_results.extend([(tag, float(conf)) for tag, conf in result.character_tag.items()])
                 tag_results.sort(key=lambda x: x[1], reverse=True)
-                return tag_results
+                return tag_results, rating_tags
             
-            return []
+            return [], {}
             
         except Exception as e:
             print(f"Fehler beim Taggen des Bildes {image_path}: {e}")
             import traceback
             traceback.print_exc()
-            return []
+            return [], {}
+    
+    def _model_input(self, image_path: str, image_context: Optional[ImageContext] = None) -> np.ndarray:
+        """
+        Lädt und preprocessed ein Bild für das lokale Modell.
+        
+        Mit Bild-Kontext wird der Input nur einmal berechnet und zwischen den
+        Taggern einer Anfrage geteilt.
+        """
+        loader = self.local_loader
+        if image_context is not None:
+            return image_context.model_input(loader.get_preprocess_version(), loader.preprocess_image)
+        return loader.preprocess_file(image_path)
     
-    def _tag_with_local_model(self, image: Image.Image) -> List[Tuple[str, float]]:
+    def _tag_with_local_model(self, input_array: np.ndarray,
+                              threshold: float) -> Tuple[List[Tuple[str, float]], Dict[str, float]]:
         """
         Taggt ein Bild mit dem lokalen ONNX-Modell.
         
         Args:
-            image: PIL Image
+            input_array: Preprocessed Bild (shape: (1, 448, 448, 3))
+            threshold: Schwellenwert für Tag-Konfidenz
             
         Returns:
-            Liste von (tag, confidence) Tupeln, sortiert nach Konfidenz
+            Tuple von (Tag-Liste sortiert nach Konfidenz, Rating-Tags)
+        """
+        # Führe Inference durch
+        outputs = self.local_loader.run(input_array)
+        
+        # Vektorisiertes Post-Processing (ein Bild = ein Batch der Größe 1)
+        (tag_results, rating_tags), = self.local_loader.get_postprocessor().process(outputs, threshold)
+        return tag_results, rating_tags
+    
+    def _cache_identity(self) -> Tuple[str, int]:
+        """Modell-Identität und Preprocessing-Version für den Ergebnis-Cache."""
+        return self.local_loader.get_model_id(), self.local_loader.get_preprocess_version()
+    
+    def _predict_probabilities(self, image_path: str,
+                               image_context: Optional[ImageContext] = None) -> Tuple[np.ndarray, Dict[str, float]]:
+        """Berechnet den vollständigen Wahrscheinlichkeitsvektor und die Rating-Tags eines Bildes."""
+        outputs = self.local_loader.run(self._model_input(image_path, image_context))
+        postprocessor = self.local_loader.get_postprocessor()
+        probabilities = postprocessor.to_probabilities(outputs)
+        return probabilities[0].astype(np.float32), postprocessor.ratings(probabilities)[0]
+    
+    def _tag_with_result_cache(self, image_path: str, threshold: float,
+                               image_context: Optional[ImageContext] = None) -> Tuple[List[Tuple[str, float]], Dict[str, float]]:
         """
-        import onnxruntime as ort
+        Taggt ein Bild über den Ergebnis-Cache.
         
-        # Preprocess Bild
-        input_array = self.local_loader.preprocess_image(image)
+        Bei einem Treffer (gleicher Bildinhalt, gleiches Modell, gleiches Preprocessing)
+        wird nur der Schwellenwert auf die gespeicherten Wahrscheinlichkeiten angewendet.
         
-        # Führe Inference durch
-        session = self.local_loader.get_model()
-        input_name = session.get_inputs()[0].name
+        Args:
+            image_path: Pfad zum Bild
+            threshold: Schwellenwert für Tag-Konfidenz
+            image_context: Bereits geladenes Bild (liefert auch den Inhalts-Hash)
+            
+        Returns:
+            Tuple von (Tag-Liste sortiert nach Konfidenz, Rating-Tags)
+        """
+        model_id, preprocess_version = self._cache_identity()
+        if image_context is not None and image_context.content_hash:
+            image_hash = image_context.content_hash
+        else:
+            image_hash = hash_image_file(image_path)
+        probabilities, rating_tags = self.result_cache.get_or_compute(
+            image_hash, model_id, preprocess_version,
+            lambda: self._predict_probabilities(image_path, image_context)
+        )
+        tag_results, = self.local_loader.get_postprocessor().select(probabilities, threshold)
+        return tag_results, dict(rating_tags)
+    
+    def iter_tag_images(self, image_paths: Iterable[str], batch_size: int = DEFAULT_BATCH_SIZE,
+                        decode_workers: int = DEFAULT_DECODE_WORKERS,
+                        with_probabilities: bool = False) -> Iterator[Tuple[str, List[Tuple[str, float]], Dict[str, float]]]:
+        """
+        Taggt Bilder als Stream über die Pipeline (Decode/Preprocess parallel zur Inference).
+        
+        Die Auslastung der einzelnen Stages steht danach in self.last_pipeline_stats.
+        
+        Args:
+            image_paths: Bildpfade (auch als Generator)
+            batch_size: Anzahl Bilder pro Inference-Aufruf
+            decode_workers: Threads für Decode und Preprocessing
+            with_probabilities: Zusätzlich den vollständigen Wahrscheinlichkeitsvektor
+                liefern (float32; None bei Fehlern und beim wdtagger-Fallback)
+            
+        Yields:
+            Tuple von (Bildpfad, Tag-Liste, Rating-Tags), mit with_probabilities
+            zusätzlich die Wahrscheinlichkeiten
+        """
+        # Fallback: wdtagger verarbeitet die Bilder einzeln
+        if self.local_loader is None:
+            for image_path in image_paths:
+                tag_results, rating_tags = self.tag_image_with_ratings(image_path)
+                if with_probabilities:
+                    yield image_path, tag_results, rating_tags, None
+                else:
+                    yield image_path, tag_results, rating_tags
+            return
         
-        outputs = session.run(None, {input_name: input_array})
+        if self.result_cache is not None:
+            yield from self._iter_tag_images_cached(image_paths, batch_size, decode_workers, with_probabilities)
+            return
         
-        # Output ist normalerweise ein Array mit Wahrscheinlichkeiten
-        probabilities = outputs[0][0]  # Entferne Batch-Dimension
+        pipeline = TaggingPipeline(
+            self.local_loader,
+            threshold=self.threshold,
+            batch_size=batch_size,
+            decode_workers=decode_workers,
+            with_probabilities=with_probabilities,
+        )
+        try:
+            yield from pipeline.run(image_paths)
+        finally:
+            self.last_pipeline_stats = pipeline.stats
+    
+    def _cache_misses(self, image_paths: Iterable[str], on_hit: Callable[[str, np.ndarray, Dict[str, float]], None],
+                      image_hashes: Dict[str, str], duplicates: Dict[str, List[str]],
+                      duplicates_lock: threading.Lock) -> Iterator[str]:
+        """
+        Filtert Bildpfade über den Ergebnis-Cache.
         
-        # Wende Sigmoid an (falls noch nicht angewendet)
-        # ONNX-Modelle geben oft bereits Sigmoid-Werte zurück
-        if probabilities.max() > 1.0 or probabilities.min() < 0.0:
-            # Falls nicht normalisiert, wende Sigmoid an
+        Args:
+            image_paths: Bildpfade (auch als Generator)
+            on_hit: Wird für Treffer mit (Bildpfad, Wahrscheinlichkeiten, Rating-Tags) aufgerufen
+            image_hashes: Wird mit Bildpfad -> Hash der zu berechnenden Bilder gefüllt
+            duplicates: Wird mit Bildpfad -> Pfaden mit gleichem Inhalt gefüllt
+            duplicates_lock: Schützt duplicates (wird auch vom Verbraucher geleert)
+            
+        Yields:
+            Bildpfade, die berechnet werden müssen (ein Pfad pro Bildinhalt)
+        """
+        model_id, preprocess_version = self._cache_identity()
+        pending = {}  # Hash -> zu berechnender Bildpfad
+        for image_path in image_paths:
             try:
-                from scipy.special import expit
-                probabilities = expit(probabilities)
-            except ImportError:
-                # Fallback: Manuelle Sigmoid-Implementierung
-                probabilities = 1.0 / (1.0 + np.exp(-np.clip(probabilities, -500, 500)))
-        
-        # Extrahiere Tags über Schwellenwert
-        tags = self.local_loader.get_tags()
-        tag_results = []
-        rating_tags = {}  # Rating-Tags (erste 4: general, sensitive, questionable, explicit)
-        
-        for idx, prob in enumerate(probabilities):
-            tag_name = tags.get(idx, f"tag_{idx}")
-            
-            # Die ersten 4 Tags sind Rating-Tags (general, sensitive, questionable, explicit)
-            if idx < 4:
-                rating_tags[tag_name] = float(prob)
+                image_hash = hash_image_file(image_path)
+            except OSError:
+                yield image_path  # Fehler meldet die Verarbeitung beim Laden
+                continue
+            hit = self.result_cache.get(image_hash, model_id, preprocess_version)
+            if hit is not None:
+                on_hit(image_path, hit[0], hit[1])
+            elif image_hash in pending:
+                with duplicates_lock:
+                    duplicates.setdefault(pending[image_hash], []).append(image_path)
             else:
-                # Normale Tags nur wenn über Threshold
-                if prob >= self.threshold:
-                    tag_results.append((tag_name, float(prob)))
+                pending[image_hash] = image_path
+                image_hashes[image_path] = image_hash
+                yield image_path
+    
+    def _store_probabilities(self, paths: List[str], probabilities: np.ndarray, image_hashes: Dict[str, str]):
+        """Legt berechnete Wahrscheinlichkeiten und Rating-Tags im Ergebnis-Cache ab."""
+        model_id, preprocess_version = self._cache_identity()
+        rating_rows = self.local_loader.get_postprocessor().ratings(probabilities)
+        for image_path, row, rating_tags in zip(paths, probabilities, rating_rows):
+            if image_path in image_hashes:
+                self.result_cache.put(image_hashes[image_path], model_id, preprocess_version,
+                                      row, rating_tags)
+    
+    def _iter_tag_images_cached(self, image_paths: Iterable[str], batch_size: int, decode_workers: int,
+                                with_probabilities: bool = False) -> Iterator[Tuple[str, List[Tuple[str, float]], Dict[str, float]]]:
+        """
+        Wie iter_tag_images, aber nur Cache-Misses laufen durch die Pipeline.
         
-        # Sortiere nach Konfidenz (absteigend)
-        tag_results.sort(key=lambda x: x[1], reverse=True)
+        Treffer und Duplikate innerhalb des Laufs werden ohne Decode und Inference
+        beantwortet; neue Ergebnisse landen im Cache. Duplikate, die der Feed-Thread
+        erst nach ihrem Original meldet, werden am Ende aus dem Cache beantwortet.
+        """
+        postprocessor = self.local_loader.get_postprocessor()
+        threshold = self.threshold
+        cached = deque()  # Treffer aus dem Feed-Thread der Pipeline
+        image_hashes = {}
+        duplicates = {}
+        duplicates_lock = threading.Lock()
         
-        # Speichere Rating-Tags für spätere Verwendung
-        self.rating_tags = rating_tags
+        def failed(image_path):
+            return (image_path, [], {}, None) if with_probabilities else (image_path, [], {})
         
-        return tag_results
+        def on_hit(image_path, probabilities, rating_tags):
+            tag_results, = postprocessor.select(probabilities, threshold)
+            if with_probabilities:
+                cached.append((image_path, tag_results, rating_tags, probabilities))
+            else:
+                cached.append((image_path, tag_results, rating_tags))
+        
+        pipeline = TaggingPipeline(
+            self.local_loader,
+            threshold=threshold,
+            batch_size=batch_size,
+            decode_workers=decode_workers,
+            on_probabilities=lambda paths, probabilities: self._store_probabilities(
+                paths, probabilities, image_hashes),
+            with_probabilities=with_probabilities,
+        )
+        try:
+            misses = self._cache_misses(image_paths, on_hit, image_hashes, duplicates, duplicates_lock)
+            for result in pipeline.run(misses):
+                yield result
+                with duplicates_lock:
+                    duplicate_paths = duplicates.pop(result[0], [])
+                for duplicate_path in duplicate_paths:
+                    yield (duplicate_path,) + result[1:]
+                while cached:
+                    yield cached.popleft()
+            while cached:
+                yield cached.popleft()
+            
+            # Der Feed-Thread ist beendet - verspätete Duplikate aus dem Cache beantworten
+            model_id, preprocess_version = self._cache_identity()
+            for primary_path, duplicate_paths in duplicates.items():
+                hit = self.result_cache.get(image_hashes[primary_path], model_id, preprocess_version)
+                for duplicate_path in duplicate_paths:
+                    if hit is None:
+                        yield failed(duplicate_path)  # Original war nicht ladbar
+                    else:
+                        on_hit(duplicate_path, hit[0], hit[1])
+                        yield cached.popleft()
+            duplicates.clear()
+        finally:
+            self.last_pipeline_stats = pipeline.stats
     
-    def tag_images(self, image_paths: List[str]) -> Dict[str, List[Tuple[str, float]]]:
+    def tag_images(self, image_paths: List[str], batch_size: int = DEFAULT_BATCH_SIZE,
+                   decode_workers: int = 0) -> Dict[str, List[Tuple[str, float]]]:
         """
         Taggt mehrere Bilder.
         
+        Mit dem lokalen Modell werden jeweils batch_size Bilder direkt in einen
+        vorallokierten (N, 448, 448, 3) Batch-Buffer preprocessed und mit einem
+        Session-Aufruf (IOBinding) verarbeitet.
+        Die Rating-Tags pro Bild landen in self.image_ratings.
+        
         Args:
             image_paths: Liste von Bildpfaden
+            batch_size: Anzahl Bilder pro Inference-Aufruf
+            decode_workers: > 0 verwendet die Pipeline mit so vielen Decode-Threads
+                (siehe iter_tag_images), 0 verarbeitet Batch für Batch nacheinander
             
         Returns:
             Dictionary mit Bildpfad als Key und Tag-Liste als Value
         """
-        results = {}
-        for image_path in image_paths:
-            results[image_path] = self.tag_image(image_path)
+        results = {image_path: [] for image_path in image_paths}
+        
+        if decode_workers > 0:
+            for image_path, tag_results, rating_tags in self.iter_tag_images(
+                    image_paths, batch_size=batch_size, decode_workers=decode_workers):
+                results[image_path] = tag_results
+                self.image_ratings[image_path] = rating_tags
+            return results
+        
+        # Fallback: wdtagger verarbeitet die Bilder einzeln
+        if self.local_loader is None:
+            for image_path in image_paths:
+                results[image_path], self.image_ratings[image_path] = self.tag_image_with_ratings(image_path)
+            return results
+        
+        batch_size = max(1, batch_size)
+        threshold = self.threshold
+        postprocessor = self.local_loader.get_postprocessor()
+        
+        # Mit Ergebnis-Cache nur neue Bildinhalte berechnen
+        image_hashes = {}
+        duplicates = {}
+        if self.result_cache is not None:
+            def on_hit(image_path, probabilities, rating_tags):
+                results[image_path], = postprocessor.select(probabilities, threshold)
+                self.image_ratings[image_path] = dict(rating_tags)
+            
+            image_paths = list(self._cache_misses(image_paths, on_hit, image_hashes, duplicates))
+        
+        for start in range(0, len(image_paths), batch_size):
+            batch_paths = []
+            
+            with self.local_loader.acquire_buffers(batch_size) as buffers:
+                # Lade und preprocesse alle Bilder des Batches direkt in die Slots des Batch-Buffers
+                for image_path in image_paths[start:start + batch_size]:
+                    try:
+                        self.local_loader.preprocess_file(image_path, out=buffers.slot(len(batch_paths)))
+                        batch_paths.append(image_path)
+                    except Exception as e:
+                        print(f"Fehler beim Laden des Bildes {image_path}: {e}")
+                
+                if not batch_paths:
+                    continue
+                
+                try:
+                    outputs = self.local_loader.run_buffers(buffers, len(batch_paths))
+                except Exception as e:
+                    print(f"Fehler bei der Batch-Inference: {e}")
+                    import traceback
+                    traceback.print_exc()
+                    continue
+                
+                # Post-Processing für den ganzen Batch (kopiert aus den Buffern), dann Zuordnung zum Bildpfad
+                probabilities = postprocessor.to_probabilities(outputs)
+                if self.result_cache is not None:
+                    self._store_probabilities(batch_paths, probabilities, image_hashes)
+                processed = list(zip(postprocessor.select(probabilities, threshold),
+                                     postprocessor.ratings(probabilities)))
+            
+            for image_path, (tag_results, rating_tags) in zip(batch_paths, processed):
+                for target_path in [image_path] + duplicates.pop(image_path, []):
+                    results[target_path] = tag_results
+                    self.image_ratings[target_path] = rating_tags
+        
         return results
     
     def format_tags_as_prompt(self, tags: List[Tuple[str, float]], 
@@ -0,0 +1,444 @@
+"""Sammel-Export von Tagging-Ergebnissen (JSONL, CSV, Parquet, SQLite, Multi-Hot .npz)."""
+
+import csv
+import json
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Rating-Spalten, falls die Ergebnisse keine Rating-Tags enthalten
+DEFAULT_RATING_NAMES = ["general", "sensitive", "questionable", "explicit"]
+
+# Ergebnisse pro Schreibvorgang (Zeilen bzw. Parquet-Row-Group)
+DEFAULT_BUFFER_SIZE = 1024
+
+
+def top_rating(rating_tags: Dict[str, float]) -> str:
+    """Name des wahrscheinlichsten Ratings ("" ohne Rating-Tags)."""
+    if not rating_tags:
+        return ""
+    return max(rating_tags.items(), key=lambda item: item[1])[0]
+
+
+def result_record(image_path: Optional[str], tags: List[Tuple[str, float]], rating_tags: Dict[str, float],
+                  probabilities: Optional[np.ndarray] = None, include_probabilities: bool = False) -> Dict:
+    """
+    JSON-Darstellung eines Ergebnisses (JSONL-Export und HTTP-Dienst).
+
+    Args:
+        image_path: Pfad zum Bild (None = ohne path-Feld)
+        tags: Liste von (tag, confidence) Tupeln
+        rating_tags: Rating-Tags
+        probabilities: Wahrscheinlichkeitsvektor
+        include_probabilities: probabilities-Feld aufnehmen (None, wenn kein Vektor vorliegt)
+
+    Returns:
+        Dictionary mit path, tags, rating, ratings und optional probabilities (4 Nachkommastellen)
+    """
+    record = {} if image_path is None else {'path': image_path}
+    record['tags'] = {tag: round(conf, 4) for tag, conf in tags}
+    record['rating'] = top_rating(rating_tags)
+    record['ratings'] = {name: round(conf, 4) for name, conf in rating_tags.items()}
+    if include_probabilities:
+        record['probabilities'] = (
+            None if probabilities is None
+            else np.round(np.asarray(probabilities, dtype=np.float64), 4).tolist()
+        )
+    return record
+
+
+class TagExporter:
+    """
+    Basisklasse für Exporte vieler Bilder in eine Datei.
+
+    Ergebnisse werden gepuffert und blockweise geschrieben (eine Zeilengruppe
+    pro flush()). Die Datei wird beim ersten flush() angelegt; die Rating-Spalten
+    ergeben sich aus den ersten Rating-Tags. Mit include_probabilities wird
+    zusätzlich der vollständige Wahrscheinlichkeitsvektor jedes Bildes gespeichert.
+    """
+
+    suffixes: Tuple[str, ...] = ()
+
+    def __init__(self, path: str, tag_names: Optional[Sequence[str]] = None,
+                 include_probabilities: bool = False, buffer_size: int = DEFAULT_BUFFER_SIZE):
+        """
+        Initialisiert den Export.
+
+        Args:
+            path: Ausgabedatei
+            tag_names: Tag-Namen nach Output-Index (Spalten der Wahrscheinlichkeiten;
+                fehlende Namen werden als tag_<index> ergänzt)
+            include_probabilities: Vollständige Wahrscheinlichkeitsvektoren mit exportieren
+            buffer_size: Ergebnisse pro Schreibvorgang
+        """
+        self.path = Path(path)
+        self.tag_names = list(tag_names) if tag_names is not None else None
+        self.include_probabilities = include_probabilities
+        self.buffer_size = max(1, buffer_size)
+        self.rating_names: Optional[List[str]] = None
+        self.rows: List[Tuple[str, List[Tuple[str, float]], Dict[str, float], Optional[np.ndarray]]] = []
+        self.written = 0
+        self._opened = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def write(self, image_path: str, tags: List[Tuple[str, float]], rating_tags: Dict[str, float],
+              probabilities: Optional[np.ndarray] = None):
+        """
+        Nimmt das Ergebnis eines Bildes auf.
+
+        Args:
+            image_path: Pfad zum Bild
+            tags: Liste von (tag, confidence) Tupeln
+            rating_tags: Rating-Tags
+            probabilities: Wahrscheinlichkeitsvektor (nur mit include_probabilities)
+        """
+        if self.include_probabilities and probabilities is not None:
+            probabilities = np.asarray(probabilities, dtype=np.float32)
+        else:
+            probabilities = None
+        self.rows.append((str(image_path), tags, rating_tags, probabilities))
+        if len(self.rows) >= self.buffer_size:
+            self.flush()
+
+    def write_many(self, results: Iterable[tuple]):
+        """Nimmt Ergebnisse aus iter_tag_images bzw. tag_paths auf."""
+        for result in results:
+            self.write(*result)
+
+    def flush(self):
+        """Schreibt die gepufferten Ergebnisse."""
+        if not self.rows:
+            return
+        self._ensure_open()
+        self._write_rows(self.rows)
+        self.written += len(self.rows)
+        self.rows = []
+
+    def close(self):
+        """Schreibt den Rest und schließt die Datei (legt sie auch ohne Ergebnisse an)."""
+        self.flush()
+        self._ensure_open()
+        self._close()
+
+    def _ensure_open(self):
+        if self._opened:
+            return
+        if self.rating_names is None:
+            first = next((rating_tags for _, _, rating_tags, _ in self.rows if rating_tags), None)
+            self.rating_names = list(first) if first else list(DEFAULT_RATING_NAMES)
+        if self.include_probabilities:
+            size = next((len(p) for _, _, _, p in self.rows if p is not None), len(self.tag_names or []))
+            names = list(self.tag_names or [])[:size]
+            self.tag_names = names + [f"tag_{index}" for index in range(len(names), size)]
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._open()
+        self._opened = True
+
+    def _probability_matrix(self, rows) -> np.ndarray:
+        """Wahrscheinlichkeiten der Zeilen als (N, num_tags) Matrix (NaN für fehlende)."""
+        matrix = np.full((len(rows), len(self.tag_names)), np.nan, dtype=np.float32)
+        for index, (_, _, _, probabilities) in enumerate(rows):
+            if probabilities is not None:
+                matrix[index] = probabilities
+        return matrix
+
+    def _open(self):
+        raise NotImplementedError
+
+    def _write_rows(self, rows):
+        raise NotImplementedError
+
+    def _close(self):
+        raise NotImplementedError
+
+
+class JsonlExporter(TagExporter):
+    """Ein JSON-Objekt pro Zeile (path, tags, rating, ratings, optional probabilities)."""
+
+    suffixes = (".jsonl", ".ndjson")
+
+    def _open(self):
+        self.file = open(self.path, 'w', encoding='utf-8', buffering=1024 * 1024)
+
+    def _write_rows(self, rows):
+        lines = [
+            json.dumps(result_record(image_path, tags, rating_tags, probabilities, self.include_probabilities),
+                       ensure_ascii=False)
+            for image_path, tags, rating_tags, probabilities in rows
+        ]
+        self.file.write("\n".join(lines) + "\n")
+        self.file.flush()
+
+    def _close(self):
+        self.file.close()
+
+
+class CsvExporter(TagExporter):
+    """
+    Eine Zeile pro Bild: path, tags, confidences, rating, eine Spalte pro Rating
+    und optional eine Spalte prob_<tag> pro Tag mit dessen Wahrscheinlichkeit.
+    """
+
+    suffixes = (".csv",)
+
+    def _open(self):
+        self.file = open(self.path, 'w', encoding='utf-8', newline='', buffering=1024 * 1024)
+        self.writer = csv.writer(self.file)
+        header = ['path', 'tags', 'confidences', 'rating'] + self.rating_names
+        if self.include_probabilities:
+            header += [f"prob_{name}" for name in self.tag_names]
+        self.writer.writerow(header)
+
+    def _write_rows(self, rows):
+        matrix = self._probability_matrix(rows) if self.include_probabilities else None
+        lines = []
+        for index, (image_path, tags, rating_tags, _) in enumerate(rows):
+            line = [
+                image_path,
+                ", ".join(tag for tag, _ in tags),
+                ", ".join(f"{conf:.4f}" for _, conf in tags),
+                top_rating(rating_tags),
+            ]
+            line += [f"{rating_tags[name]:.4f}" if name in rating_tags else "" for name in self.rating_names]
+            if matrix is not None:
+                line += ["" if np.isnan(value) else f"{value:.4f}" for value in matrix[index].tolist()]
+            lines.append(line)
+        self.writer.writerows(lines)
+        self.file.flush()
+
+    def _close(self):
+        self.file.close()
+
+
+class ParquetExporter(TagExporter):
+    """
+    Parquet-Datei mit einer Row-Group pro flush() (benötigt pyarrow).
+
+    Spalten: path, tags (list<string>), confidences (list<float>), rating, eine
+    Spalte pro Rating und optional probabilities (fixed_size_list<float>, die
+    Tag-Namen stehen in den Schema-Metadaten unter "tag_names").
+    """
+
+    suffixes = (".parquet", ".pq")
+
+    def __init__(self, *args, **kwargs):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("Parquet-Export benötigt pyarrow (pip install pyarrow)")
+        self.pa = pyarrow
+        self.pq = pyarrow.parquet
+        super().__init__(*args, **kwargs)
+
+    def _open(self):
+        pa = self.pa
+        fields = [
+            pa.field('path', pa.string()),
+            pa.field('tags', pa.list_(pa.string())),
+            pa.field('confidences', pa.list_(pa.float32())),
+            pa.field('rating', pa.string()),
+        ]
+        fields += [pa.field(name, pa.float32()) for name in self.rating_names]
+        metadata = None
+        if self.include_probabilities:
+            fields.append(pa.field('probabilities', pa.list_(pa.float32(), len(self.tag_names))))
+            metadata = {'tag_names': json.dumps(self.tag_names, ensure_ascii=False)}
+        self.schema = pa.schema(fields, metadata=metadata)
+        self.writer = self.pq.ParquetWriter(str(self.path), self.schema)
+
+    def _write_rows(self, rows):
+        pa = self.pa
+        columns = [
+            pa.array([image_path for image_path, _, _, _ in rows], pa.string()),
+            pa.array([[tag for tag, _ in tags] for _, tags, _, _ in rows], pa.list_(pa.string())),
+            pa.array([[conf for _, conf in tags] for _, tags, _, _ in rows], pa.list_(pa.float32())),
+            pa.array([top_rating(rating_tags) for _, _, rating_tags, _ in rows], pa.string()),
+        ]
+        columns += [
+            pa.array([rating_tags.get(name) for _, _, rating_tags, _ in rows], pa.float32())
+            for name in self.rating_names
+        ]
+        if self.include_probabilities:
+            matrix = self._probability_matrix(rows)
+            columns.append(pa.FixedSizeListArray.from_arrays(pa.array(matrix.ravel()), matrix.shape[1]))
+        self.writer.write_table(pa.Table.from_arrays(columns, schema=self.schema))
+
+    def _close(self):
+        self.writer.close()
+
+
+class SqliteExporter(TagExporter):
+    """
+    SQLite-Tabelle mit einer Zeile pro Bild (Pfad als Primärschlüssel).
+
+    Spalten wie beim CSV-Export; Wahrscheinlichkeiten liegen als float32-BLOB in
+    probabilities, die Tag-Namen in der Tabelle tag_names. Jeder flush() ist eine
+    Transaktion mit einem executemany().
+    """
+
+    suffixes = (".sqlite", ".sqlite3", ".db")
+
+    def __init__(self, *args, table: str = "tags", **kwargs):
+        super().__init__(*args, **kwargs)
+        self.table = table
+
+    @staticmethod
+    def _quote(name: str) -> str:
+        return '"' + name.replace('"', '""') + '"'
+
+    def _open(self):
+        self.connection = sqlite3.connect(str(self.path))
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        columns = ["path TEXT PRIMARY KEY", "tags TEXT", "confidences TEXT", "rating TEXT"]
+        columns += [f"{self._quote(name)} REAL" for name in self.rating_names]
+        if self.include_probabilities:
+            columns.append("probabilities BLOB")
+        self.connection.execute(f"CREATE TABLE IF NOT EXISTS {self._quote(self.table)} ({', '.join(columns)})")
+        if self.include_probabilities:
+            self.connection.execute("CREATE TABLE IF NOT EXISTS tag_names (idx INTEGER PRIMARY KEY, name TEXT)")
+            self.connection.executemany("INSERT OR REPLACE INTO tag_names VALUES (?, ?)",
+                                        list(enumerate(self.tag_names)))
+        self.connection.commit()
+        placeholders = ", ".join("?" * (len(columns)))
+        self.insert = f"INSERT OR REPLACE INTO {self._quote(self.table)} VALUES ({placeholders})"
+
+    def _write_rows(self, rows):
+        values = []
+        for image_path, tags, rating_tags, probabilities in rows:
+            row = [
+                image_path,
+                ", ".join(tag for tag, _ in tags),
+                json.dumps([round(conf, 4) for _, conf in tags]),
+                top_rating(rating_tags),
+            ]
+            row += [rating_tags.get(name) for name in self.rating_names]
+            if self.include_probabilities:
+                row.append(None if probabilities is None else probabilities.tobytes())
+            values.append(row)
+        with self.connection:
+            self.connection.executemany(self.insert, values)
+
+    def _close(self):
+        self.connection.close()
+
+
+class MultiHotExporter(TagExporter):
+    """
+    Multi-Hot-Matrix (Bilder x Tags) als .npz im CSR-Format von scipy.sparse.
+
+    Die Datei lässt sich mit scipy.sparse.load_npz laden und enthält zusätzlich
+    paths, tag_names, ratings (N x Ratings) und rating_names, optional die
+    dichte Matrix probabilities. Die Spalten folgen tag_names (Output-Index des
+    Modells); unbekannte Tags werden angehängt. Da .npz nicht erweitert werden
+    kann, wird die Datei beim Schließen geschrieben - pro flush() werden die
+    Zeilen aber bereits zu kompakten Arrays zusammengefasst.
+    """
+
+    suffixes = (".npz",)
+
+    def __init__(self, *args, binary: bool = False, **kwargs):
+        """
+        Initialisiert den Export.
+
+        Args:
+            binary: 1 statt der Konfidenz als Matrix-Wert speichern
+            (weitere Argumente wie TagExporter)
+        """
+        super().__init__(*args, **kwargs)
+        self.binary = binary
+
+    def _open(self):
+        self.vocabulary = list(self.tag_names or [])
+        self.columns = {name: index for index, name in enumerate(self.vocabulary)}
+        self.paths: List[str] = []
+        self.indices: List[np.ndarray] = []
+        self.data: List[np.ndarray] = []
+        self.row_lengths: List[int] = []
+        self.ratings: List[np.ndarray] = []
+        self.probabilities: List[np.ndarray] = []
+
+    def _column(self, tag: str) -> int:
+        index = self.columns.get(tag)
+        if index is None:
+            index = self.columns[tag] = len(self.vocabulary)
+            self.vocabulary.append(tag)
+        return index
+
+    def _write_rows(self, rows):
+        indices = []
+        data = []
+        for image_path, tags, _, _ in rows:
+            self.paths.append(image_path)
+            self.row_lengths.append(len(tags))
+            indices.extend(self._column(tag) for tag, _ in tags)
+            data.extend(conf for _, conf in tags)
+        self.indices.append(np.array(indices, dtype=np.int32))
+        self.data.append(np.array(data, dtype=np.float32))
+        self.ratings.append(np.array(
+            [[rating_tags.get(name, np.nan) for name in self.rating_names] for _, _, rating_tags, _ in rows],
+            dtype=np.float32,
+        ))
+        if self.include_probabilities:
+            self.probabilities.append(self._probability_matrix(rows))
+
+    def _close(self):
+        indptr = np.zeros(len(self.paths) + 1, dtype=np.int64)
+        np.cumsum(self.row_lengths, out=indptr[1:])
+        data = np.concatenate(self.data) if self.data else np.zeros(0, dtype=np.float32)
+        arrays = {
+            'format': np.array(b'csr'),
+            'shape': np.array([len(self.paths), len(self.vocabulary)], dtype=np.int64),
+            'indptr': indptr,
+            'indices': np.concatenate(self.indices) if self.indices else np.zeros(0, dtype=np.int32),
+            'data': np.ones_like(data, dtype=np.uint8) if self.binary else data,
+            'paths': np.array(self.paths, dtype=str),
+            'tag_names': np.array(self.vocabulary, dtype=str),
+            'ratings': (np.concatenate(self.ratings) if self.ratings
+                        else np.zeros((0, len(self.rating_names)), dtype=np.float32)),
+            'rating_names': np.array(self.rating_names, dtype=str),
+        }
+        if self.include_probabilities:
+            arrays['probabilities'] = (np.concatenate(self.probabilities) if self.probabilities
+                                       else np.zeros((0, len(self.tag_names)), dtype=np.float32))
+        with open(self.path, 'wb') as f:
+            np.savez_compressed(f, **arrays)
+
+
+EXPORTERS = {
+    'jsonl': JsonlExporter,
+    'csv': CsvExporter,
+    'parquet': ParquetExporter,
+    'sqlite': SqliteExporter,
+    'npz': MultiHotExporter,
+}
+
+
+def create_exporter(path: str, export_format: Optional[str] = None, **kwargs) -> TagExporter:
+    """
+    Erzeugt den passenden Export für eine Ausgabedatei.
+
+    Args:
+        path: Ausgabedatei
+        export_format: jsonl, csv, parquet, sqlite oder npz (Standard: aus der Dateiendung)
+        **kwargs: Weitere Argumente des Exports (tag_names, include_probabilities, ...)
+
+    Returns:
+        TagExporter (mit with-Block oder close() verwenden)
+    """
+    if export_format is None:
+        suffix = Path(path).suffix.lower()
+        export_format = next((name for name, exporter in EXPORTERS.items() if suffix in exporter.suffixes), None)
+        if export_format is None:
+            raise ValueError(f"Export-Format für '{path}' unbekannt (erlaubt: {', '.join(EXPORTERS)})")
+    if export_format not in EXPORTERS:
+        raise ValueError(f"Unbekanntes Export-Format: {export_format} (erlaubt: {', '.join(EXPORTERS)})")
+    return EXPORTERS[export_format](path, **kwargs)
@@ -1,9 +1,9 @@
 """Datei-Handler für Bild-Verarbeitung."""
 
 import os
+import glob
 from pathlib import Path
-from typing import List, Set
-from PIL import Image
+from typing import Iterable, List, Set
 
 
 class FileHandler:
@@ -41,6 +41,52 @@ class FileHandler:
         """
         return [fp for fp in file_paths if FileHandler.is_image_file(fp)]
     
+    @staticmethod
+    def collect_image_files(sources: Iterable[str], recursive: bool = True) -> List[str]:
+        """
+        Sammelt Bilder aus Dateien, Ordnern und Glob-Mustern.
+        
+        Args:
+            sources: Dateien, Ordner (sortiert durchsucht) oder Muster wie "bilder/**/*.png"
+            recursive: Ordner inklusive Unterordnern durchsuchen
+            
+        Returns:
+            Liste von Bildpfaden (ohne Duplikate, in Reihenfolge der Quellen)
+        """
+        paths = []
+        for source in sources:
+            if os.path.isdir(source):
+                pattern = "**/*" if recursive else "*"
+                paths.extend(sorted(str(p) for p in Path(source).glob(pattern) if p.is_file()))
+            elif os.path.isfile(source):
+                paths.append(source)
+            else:
+                paths.extend(sorted(p for p in glob.glob(source, recursive=True) if os.path.isfile(p)))
+        return FileHandler.filter_image_files(list(dict.fromkeys(paths)))
+    
+    @staticmethod
+    def caption_path(image_path: str, extension: str = ".txt") -> Path:
+        """Pfad der Caption-Datei neben dem Bild (bild.png -> bild.txt)."""
+        return Path(image_path).with_suffix(extension)
+    
+    @staticmethod
+    def save_caption(image_path: str, caption: str, extension: str = ".txt") -> Path:
+        """
+        Schreibt eine Caption-Datei (kohya-Format: eine Zeile "tag1, tag2, ...") neben das Bild.
+        
+        Args:
+            image_path: Pfad zum Bild
+            caption: Caption-Text
+            extension: Dateiendung der Caption
+            
+        Returns:
+            Pfad der Caption-Datei
+        """
+        caption_file = FileHandler.caption_path(image_path, extension)
+        with open(caption_file, 'w', encoding='utf-8') as f:
+            f.write(caption + "\n")
+        return caption_file
+    
     @staticmethod
     def validate_image(file_path: str) -> bool:
         """
@@ -52,6 +98,8 @@ class FileHandler:
         Returns:
             True wenn gültiges Bild
         """
+        from PIL import Image
+        
         try:
             with Image.open(file_path) as img:
                 img.verify()
@@ -70,6 +118,8 @@ class FileHandler:
         Returns:
             Dictionary mit Bildinformationen
         """
+        from PIL import Image
+        
         try:
             with Image.open(file_path) as img:
                 return {
@@ -0,0 +1,265 @@
+"""Überwachung von Ordnern auf neue und geänderte Bilder (inotify mit Polling-Fallback)."""
+
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from utils.file_handler import FileHandler
+
+# inotify-Konstanten (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+def _stat_signature(path: str) -> Optional[Tuple[int, int]]:
+    """(Größe, mtime_ns) einer Datei oder None, wenn sie fehlt."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _scan(directory: str, recursive: bool) -> List[str]:
+    """Alle Bilder eines Ordners."""
+    return FileHandler.collect_image_files([directory], recursive=recursive)
+
+
+class PollingWatcher:
+    """Findet neue und geänderte Bilder durch regelmäßiges Durchsuchen (überall lauffähig)."""
+
+    def __init__(self, directories: Iterable[str], recursive: bool = True, interval: float = 2.0):
+        """
+        Initialisiert den Watcher (vorhandene Bilder gelten als bekannt).
+
+        Args:
+            directories: Zu überwachende Ordner
+            recursive: Unterordner einbeziehen
+            interval: Sekunden zwischen zwei Durchläufen
+        """
+        self.directories = [str(d) for d in directories]
+        self.recursive = recursive
+        self.interval = interval
+        self._snapshot = self._take_snapshot()
+        self._next_scan = time.monotonic() + interval
+
+    def _take_snapshot(self) -> Dict[str, Tuple[int, int]]:
+        snapshot = {}
+        for directory in self.directories:
+            for path in _scan(directory, self.recursive):
+                signature = _stat_signature(path)
+                if signature is not None:
+                    snapshot[path] = signature
+        return snapshot
+
+    def poll(self, timeout: float) -> List[str]:
+        """
+        Wartet höchstens timeout Sekunden auf Änderungen.
+
+        Returns:
+            Neue oder geänderte Bildpfade
+        """
+        wait = self._next_scan - time.monotonic()
+        if wait > timeout:
+            time.sleep(timeout)
+            return []
+        if wait > 0:
+            time.sleep(wait)
+        self._next_scan = time.monotonic() + self.interval
+        snapshot = self._take_snapshot()
+        changed = [path for path, signature in snapshot.items() if self._snapshot.get(path) != signature]
+        self._snapshot = snapshot
+        return changed
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """
+    Meldet neue und fertig geschriebene Bilder über inotify (nur Linux, per ctypes).
+
+    Überwacht werden IN_CLOSE_WRITE, IN_MOVED_TO und IN_CREATE; neue Unterordner
+    werden automatisch aufgenommen. Läuft die Event-Queue des Kernels über,
+    werden alle Ordner neu durchsucht.
+    """
+
+    def __init__(self, directories: Iterable[str], recursive: bool = True):
+        """
+        Initialisiert den Watcher.
+
+        Args:
+            directories: Zu überwachende Ordner
+            recursive: Unterordner einbeziehen
+
+        Raises:
+            OSError: Wenn inotify nicht verfügbar ist oder das Watch-Limit erreicht wird
+        """
+        library = ctypes.util.find_library("c")
+        self._libc = ctypes.CDLL(library or "libc.so.6", use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError(errno.ENOSYS, "inotify nicht verfügbar")
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        self.directories = [str(d) for d in directories]
+        self.recursive = recursive
+        self._watches: Dict[int, str] = {}
+        try:
+            for directory in self.directories:
+                self._add_tree(directory)
+        except OSError:
+            self.close()
+            raise
+
+    def _add_watch(self, directory: str):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, f"inotify_add_watch({directory}): {os.strerror(error)}")
+        self._watches[wd] = directory
+
+    def _add_tree(self, directory: str):
+        """Überwacht einen Ordner (und seine Unterordner)."""
+        self._add_watch(directory)
+        if self.recursive:
+            for root, dirs, _ in os.walk(directory):
+                for name in dirs:
+                    self._add_watch(os.path.join(root, name))
+
+    def poll(self, timeout: float) -> List[str]:
+        """
+        Wartet höchstens timeout Sekunden auf Events.
+
+        Returns:
+            Neue oder geänderte Bildpfade
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        changed = []
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                print("inotify-Queue übergelaufen - durchsuche Ordner neu")
+                for directory in self.directories:
+                    changed.extend(_scan(directory, self.recursive))
+                continue
+            if mask & IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+            directory = self._watches.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                if self.recursive:
+                    # Neuer Unterordner: überwachen und bereits hineinkopierte Bilder melden
+                    try:
+                        self._add_tree(path)
+                    except OSError as e:
+                        print(f"Ordner kann nicht überwacht werden: {e}")
+                    changed.extend(_scan(path, True))
+            elif FileHandler.is_image_file(path):
+                changed.append(path)
+        return changed
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+def create_watcher(directories: Iterable[str], recursive: bool = True, poll_interval: float = 2.0,
+                   use_inotify: bool = True):
+    """
+    Erzeugt einen inotify-Watcher, bei Bedarf einen Polling-Watcher.
+
+    Args:
+        directories: Zu überwachende Ordner
+        recursive: Unterordner einbeziehen
+        poll_interval: Sekunden zwischen zwei Durchläufen des Polling-Watchers
+        use_inotify: False erzwingt Polling (z.B. für Netzlaufwerke, die keine Events liefern)
+
+    Returns:
+        Watcher mit poll(timeout) und close()
+    """
+    directories = list(directories)
+    if use_inotify and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(directories, recursive=recursive)
+        except (OSError, AttributeError) as e:
+            print(f"inotify nicht nutzbar ({e}) - verwende Polling")
+    return PollingWatcher(directories, recursive=recursive, interval=poll_interval)
+
+
+class Debouncer:
+    """
+    Hält gemeldete Dateien zurück, bis sie fertig geschrieben sind.
+
+    Eine Datei gilt als fertig, wenn seit dem letzten Event debounce Sekunden
+    vergangen sind und sich Größe und Änderungszeit in dieser Zeit nicht
+    geändert haben.
+    """
+
+    def __init__(self, debounce: float = 1.0):
+        """
+        Initialisiert den Debouncer.
+
+        Args:
+            debounce: Ruhezeit in Sekunden
+        """
+        self.debounce = debounce
+        self._pending: Dict[str, Tuple[float, Optional[Tuple[int, int]]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self, paths: Iterable[str]):
+        """Nimmt gemeldete Pfade auf (erneute Events verlängern die Wartezeit)."""
+        now = time.monotonic()
+        for path in paths:
+            self._pending[path] = (now, _stat_signature(path))
+
+    def ready(self) -> List[str]:
+        """Gibt die fertig geschriebenen Dateien zurück (und entfernt sie aus der Warteschlange)."""
+        now = time.monotonic()
+        done = []
+        for path, (last_event, signature) in list(self._pending.items()):
+            if now - last_event < self.debounce:
+                continue
+            current = _stat_signature(path)
+            if current is None:
+                del self._pending[path]  # Inzwischen gelöscht oder verschoben
+            elif current == signature:
+                del self._pending[path]
+                done.append(path)
+            else:
+                self._pending[path] = (now, current)  # Wird noch geschrieben
+        return done
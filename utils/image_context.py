@@ -0,0 +1,131 @@
+"""Bild-Kontext pro Tagging-Anfrage: Datei einmal lesen, Bild einmal dekodieren."""
+
+import io
+import hashlib
+import threading
+from typing import Callable, Dict, Hashable, Optional, Tuple, TYPE_CHECKING
+
+# numpy und PIL erst bei Bedarf importieren: die GUI importiert dieses Modul beim Start
+if TYPE_CHECKING:
+    import numpy as np
+    from PIL import Image
+
+# Beide Tagger verwenden 448x448 als Input
+MODEL_INPUT_SIZE = 448
+
+# Lange Kante des Thumbnails für die Bildanalyse
+THUMBNAIL_SIZE = 256
+
+
+class ImageContext:
+    """
+    Hält alles, was eine Tagging-Anfrage über ein Bild braucht.
+
+    Die Datei wird einmal gelesen (Inhalts-Hash für den Ergebnis-Cache) und
+    einmal in reduzierter Auflösung dekodiert. Validierung, Vorschau,
+    Bildanalyse und beide Tagger teilen sich dieses Ergebnis; der
+    preprocessed Modell-Input wird einmal berechnet und von beiden
+    Modellen verwendet.
+    """
+
+    def __init__(self, image_path: str, target_size: int = MODEL_INPUT_SIZE):
+        """
+        Initialisiert den Kontext (geladen wird erst mit load()).
+
+        Args:
+            image_path: Pfad zum Bild
+            target_size: Mindestlänge der langen Kante beim Dekodieren
+        """
+        self.image_path = image_path
+        self.target_size = target_size
+        self.size: Tuple[int, int] = (0, 0)  # Originalgröße
+        self.mode: Optional[str] = None  # Originalmodus
+        self.format: Optional[str] = None
+        self.image: Optional["Image.Image"] = None  # RGB, reduziert dekodiert
+        self.content_hash: Optional[str] = None  # SHA-256 des Dateiinhalts
+        self.error: Optional[str] = None
+        self._rgb: Optional["np.ndarray"] = None
+        self._thumbnail: Optional["np.ndarray"] = None
+        self._model_inputs: Dict[Hashable, "np.ndarray"] = {}
+        # Getrennte Locks: die Bildanalyse (Thumbnail) wartet nicht auf das Preprocessing der Tagger
+        self._pixels_lock = threading.Lock()
+        self._model_input_lock = threading.Lock()
+
+    def load(self) -> bool:
+        """
+        Liest und dekodiert das Bild.
+
+        Returns:
+            True wenn das Bild gültig ist (sonst steht der Grund in self.error)
+        """
+        try:
+            from PIL import Image
+
+            with open(self.image_path, 'rb') as f:
+                data = f.read()
+            self.content_hash = hashlib.sha256(data).hexdigest()
+
+            image = Image.open(io.BytesIO(data))
+            self.size = image.size
+            self.mode = image.mode
+            self.format = image.format
+            try:
+                from utils.image_processing import draft_image
+                draft_image(image, self.target_size)
+            except ImportError:
+                pass
+            self.image = image.convert("RGB")
+            return True
+        except Exception as e:
+            self.error = str(e)
+            self.image = None
+            return False
+
+    @property
+    def is_loaded(self) -> bool:
+        """Prüft ob das Bild erfolgreich dekodiert wurde."""
+        return self.image is not None
+
+    @property
+    def rgb(self) -> "np.ndarray":
+        """Dekodiertes Bild als RGB-Array (uint8, shape: (H, W, 3))."""
+        import numpy as np
+
+        with self._pixels_lock:
+            if self._rgb is None:
+                self._rgb = np.asarray(self.image)
+            return self._rgb
+
+    def thumbnail(self, max_size: int = THUMBNAIL_SIZE) -> "np.ndarray":
+        """
+        Kleines RGB-Thumbnail (uint8, lange Kante höchstens max_size) für die Bildanalyse.
+
+        Wird einmal aus dem bereits dekodierten Bild berechnet (Box-Filter).
+        """
+        import numpy as np
+        from PIL import Image
+
+        with self._pixels_lock:
+            if self._thumbnail is None:
+                thumbnail = self.image.copy()
+                thumbnail.thumbnail((max_size, max_size), Image.Resampling.BOX)
+                self._thumbnail = np.asarray(thumbnail)
+            return self._thumbnail
+
+    def model_input(self, key: Hashable, preprocess: Callable[["Image.Image"], "np.ndarray"]) -> "np.ndarray":
+        """
+        Gibt den preprocessed Modell-Input zurück und berechnet ihn nur einmal.
+
+        Args:
+            key: Variante des Preprocessings (z.B. PREPROCESS_VERSION)
+            preprocess: Preprocessing-Funktion (PIL Image -> (1, H, W, 3) float32)
+
+        Returns:
+            Modell-Input (nicht verändern - wird von beiden Taggern geteilt)
+        """
+        # Der Lock bleibt während des Preprocessings gehalten, damit der zweite Tagger
+        # auf das Ergebnis des ersten wartet statt es erneut zu berechnen
+        with self._model_input_lock:
+            if key not in self._model_inputs:
+                self._model_inputs[key] = preprocess(self.image)
+            return self._model_inputs[key]
@@ -1,10 +1,19 @@
 """Bildverarbeitungs-Utilities für bessere Tag-Qualität.
 Basierend auf dbimutils.py aus stable-diffusion-webui-wd14-tagger."""
 
+import math
+from typing import Optional, Tuple
+
 import cv2
 import numpy as np
 from PIL import Image
 
+# Bei jeder Änderung am Preprocessing erhöhen (macht zwischengespeicherte Ergebnisse ungültig)
+PREPROCESS_VERSION = 3
+
+# Verkleinerungsfaktoren, die JPEG-Decoder direkt beim Dekodieren beherrschen
+REDUCED_DECODE_FACTORS = (8, 4, 2)
+
 
 def fill_transparent(image: Image.Image, color='WHITE'):
     """
@@ -52,13 +61,105 @@ def resize(pic: Image.Image, size: int, keep_ratio=True) -> Image.Image:
     return pic.resize(target_size, resample=Image.Resampling.LANCZOS)
 
 
-def smart_imread(img_path: str, flag=cv2.IMREAD_UNCHANGED):
+def reduced_decode_factor(size: Tuple[int, int], target_size: int) -> int:
+    """
+    Größter Verkleinerungsfaktor, bei dem die lange Kante target_size noch abdeckt.
+    
+    Args:
+        size: Originalgröße (Breite, Höhe)
+        target_size: Mindestlänge der langen Kante
+    
+    Returns:
+        8, 4, 2 oder 1 (= volle Auflösung)
+    """
+    long_edge = max(size)
+    for factor in REDUCED_DECODE_FACTORS:
+        if long_edge // factor >= target_size:
+            return factor
+    return 1
+
+
+def draft_image(image: Image.Image, target_size: int) -> Image.Image:
+    """
+    Lässt ein noch nicht dekodiertes JPEG direkt in reduzierter Auflösung dekodieren.
+    
+    Mit Image.draft skaliert der JPEG-Decoder um 1/2, 1/4 oder 1/8 (DCT-Skalierung),
+    so dass große Fotos und Scans nicht vollständig dekodiert werden müssen.
+    Gewählt wird die kleinste Stufe, deren lange Kante target_size noch abdeckt.
+    Andere Formate bleiben unverändert.
+    
+    Args:
+        image: Mit Image.open geöffnetes Bild
+        target_size: Benötigte Länge der langen Kante
+    
+    Returns:
+        Dasselbe PIL Image (image.size ist danach die reduzierte Größe)
+    """
+    if image.format == "JPEG" and reduced_decode_factor(image.size, target_size) > 1:
+        width, height = image.size
+        scale = target_size / max(width, height)
+        image.draft(None, (max(1, math.ceil(width * scale)), max(1, math.ceil(height * scale))))
+    return image
+
+
+def open_image(img_path: str, target_size: Optional[int] = None) -> Image.Image:
+    """
+    Öffnet ein Bild, bei Angabe von target_size mit reduziertem JPEG-Decode.
+    
+    Args:
+        img_path: Pfad zum Bild
+        target_size: Benötigte Länge der langen Kante (None = volle Auflösung)
+    
+    Returns:
+        PIL Image (noch nicht dekodiert, Modus wie in der Datei)
+    """
+    image = Image.open(img_path)
+    if target_size:
+        draft_image(image, target_size)
+    return image
+
+
+def reduced_imread_flag(img_path: str, flag: int, target_size: int) -> int:
+    """
+    Wählt das passende cv2.IMREAD_REDUCED_* Flag für eine Zielgröße.
+    
+    Args:
+        img_path: Pfad zum Bild (nur der Header wird gelesen)
+        flag: Gewünschtes OpenCV Read-Flag
+        target_size: Benötigte Länge der langen Kante
+    
+    Returns:
+        Reduziertes Flag oder das ursprüngliche Flag
+    """
+    if flag == cv2.IMREAD_GRAYSCALE:
+        reduced_flags = {2: cv2.IMREAD_REDUCED_GRAYSCALE_2, 4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+                         8: cv2.IMREAD_REDUCED_GRAYSCALE_8}
+    elif flag == cv2.IMREAD_COLOR or (flag == cv2.IMREAD_UNCHANGED
+                                      and img_path.lower().endswith((".jpg", ".jpeg"))):
+        # JPEGs haben keinen Alpha-Kanal, dort ist UNCHANGED = COLOR
+        reduced_flags = {2: cv2.IMREAD_REDUCED_COLOR_2, 4: cv2.IMREAD_REDUCED_COLOR_4,
+                         8: cv2.IMREAD_REDUCED_COLOR_8}
+    else:
+        return flag
+    
+    try:
+        with Image.open(img_path) as img:
+            size = img.size
+    except Exception:
+        return flag
+    factor = reduced_decode_factor(size, target_size)
+    return reduced_flags.get(factor, flag)
+
+
+def smart_imread(img_path: str, flag=cv2.IMREAD_UNCHANGED, target_size: Optional[int] = None):
     """
     Liest ein Bild und konvertiert es zu 24-bit falls nötig.
     
     Args:
         img_path: Pfad zum Bild
         flag: OpenCV Read-Flag
+        target_size: Benötigte Länge der langen Kante; mit Angabe wird über
+            cv2.IMREAD_REDUCED_* direkt verkleinert gelesen (None = volle Auflösung)
     
     Returns:
         OpenCV Image (BGR)
@@ -68,6 +169,8 @@ def smart_imread(img_path: str, flag=cv2.IMREAD_UNCHANGED):
         img = img.convert("RGB")
         img = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
     else:
+        if target_size:
+            flag = reduced_imread_flag(img_path, flag, target_size)
         img = cv2.imread(img_path, flag)
     return img
 
@@ -142,41 +245,117 @@ def smart_resize(img, size):
     return img
 
 
-def preprocess_for_wd14(image: Image.Image, target_size: int = 448) -> np.ndarray:
+def has_transparency(image: Image.Image) -> bool:
+    """Prüft ob ein PIL Image einen Alpha-Kanal oder eine Transparenz-Farbe hat."""
+    return image.mode in ('RGBA', 'LA', 'PA', 'RGBa', 'La') or 'transparency' in image.info
+
+
+def to_rgb_on_white(image: Image.Image) -> Image.Image:
+    """Alpha zu Weiß konvertieren (nur wenn das Bild Transparenz hat), sonst nur nach RGB."""
+    if has_transparency(image):
+        return fill_transparent(image, color='WHITE')
+    if image.mode != 'RGB':
+        return image.convert('RGB')
+    return image
+
+
+def letterbox(img: np.ndarray, target_size: int, out: Optional[np.ndarray] = None) -> np.ndarray:
     """
-    Vollständiges Preprocessing für WD14 Tagger Modelle.
-    Kombiniert alle Schritte für optimale Tag-Qualität.
-    Basierend auf der Original-Implementierung von SmilingWolf.
+    Verkleinert die lange Kante auf target_size und polstert weiß auf target_size x target_size.
+    
+    Entspricht make_square + smart_resize, aber ohne das Bild vorher in voller
+    Auflösung quadratisch aufzublasen. Kleinere Bilder werden wie bisher nicht
+    vergrößert, sondern nur mittig aufgepolstert.
+    
+    Args:
+        img: OpenCV Image (numpy array, 3 Kanäle)
+        target_size: Zielgröße
+        out: Optionales Ziel (target_size x target_size x 3, beliebiger dtype/Strides),
+            in das direkt geschrieben wird, statt ein neues Array anzulegen
+    
+    Returns:
+        Quadratisches Image (target_size x target_size)
+    """
+    height, width = img.shape[:2]
+    long_edge = max(height, width)
+    if long_edge > target_size:
+        scale = target_size / long_edge
+        new_size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        img = cv2.resize(img, new_size, interpolation=cv2.INTER_AREA)
+    if out is None:
+        return make_square(img, target_size)
+    
+    # Gleiche Position wie make_square, aber Rand und Bild direkt ins Ziel schreiben
+    height, width = img.shape[:2]
+    top = (target_size - height) // 2
+    left = (target_size - width) // 2
+    out[...] = 255
+    out[top:top + height, left:left + width] = img
+    return out
+
+
+def letterbox_for_wd14(image: Image.Image, target_size: int = 448) -> np.ndarray:
+    """
+    Preprocessing für WD14 bis vor die Float-Konvertierung.
     
     Args:
         image: PIL Image
         target_size: Zielgröße (Standard: 448 für WD14)
     
     Returns:
-        Preprocessed numpy array (BGR, float32, shape: (1, H, W, 3))
-        WICHTIG: Keine ImageNet-Normalisierung! Das Modell erwartet [0, 255] Werte.
+        Quadratisches RGB-Bild (uint8, shape: (H, W, 3)) - 4x kleiner als der Modell-Input
+    """
+    # 1. Alpha zu Weiß konvertieren, PIL zu numpy (RGB)
+    img_array = np.asarray(to_rgb_on_white(image))
+    
+    # 2. Lange Kante verkleinern, dann weiß auf ein Quadrat polstern
+    # (statt das Bild in voller Auflösung quadratisch zu machen)
+    return letterbox(img_array, target_size)
+
+
+def write_wd14_input(tile: np.ndarray, out: np.ndarray) -> np.ndarray:
     """
-    # 1. Alpha zu Weiß konvertieren
-    image = fill_transparent(image, color='WHITE')
+    Schreibt ein quadratisches RGB-Bild (uint8) als Modell-Input in ein vorhandenes Array.
     
-    # 2. PIL zu numpy (RGB)
-    img_array = np.array(image)
+    RGB zu BGR und uint8 zu float32 passieren in einem Schritt beim Kopieren,
+    ohne Zwischen-Arrays (z.B. direkt in einen Slot eines Batch-Buffers).
+    
+    Args:
+        tile: Ergebnis von letterbox_for_wd14
+        out: Ziel (float32, shape: (H, W, 3))
     
-    # 3. RGB zu BGR (OpenCV Format)
-    img_bgr = img_array[:, :, ::-1]  # RGB zu BGR
+    Returns:
+        out
+    """
+    out[...] = tile[:, :, ::-1]
+    return out
+
+
+def preprocess_for_wd14(image: Image.Image, target_size: int = 448,
+                        out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Vollständiges Preprocessing für WD14 Tagger Modelle.
+    Kombiniert alle Schritte für optimale Tag-Qualität.
+    Basierend auf der Original-Implementierung von SmilingWolf.
     
-    # 4. Quadratisch machen
-    img_bgr = make_square(img_bgr, target_size)
+    Args:
+        image: PIL Image
+        target_size: Zielgröße (Standard: 448 für WD14)
+        out: Optionaler Batch-Slot (float32, shape: (H, W, 3)), in den geschrieben wird
     
-    # 5. Smart Resize
-    img_bgr = smart_resize(img_bgr, target_size)
+    Returns:
+        Preprocessed numpy array (BGR, float32, shape: (1, H, W, 3)); mit out eine Sicht darauf
+        WICHTIG: Keine ImageNet-Normalisierung! Das Modell erwartet [0, 255] Werte.
+    """
+    if out is None:
+        out = np.empty((target_size, target_size, 3), dtype=np.float32)
     
-    # 6. Zu float32 konvertieren (WICHTIG: Keine Normalisierung auf [0,1]!)
-    # Das Modell erwartet [0, 255] Werte in float32
-    img_bgr = img_bgr.astype(np.float32)
+    # 1. Alpha zu Weiß konvertieren, PIL zu numpy (RGB)
+    img_array = np.asarray(to_rgb_on_white(image))
     
-    # 7. Batch-Dimension hinzufügen
-    img_bgr = np.expand_dims(img_bgr, 0)  # (1, H, W, 3)
+    # 2. Letterbox direkt ins Ziel; über die kanal-gespiegelte Sicht wird dabei
+    # RGB zu BGR (OpenCV Format) und uint8 zu float32 (WICHTIG: Keine Normalisierung auf [0,1]!)
+    letterbox(img_array, target_size, out=out[:, :, ::-1])
     
-    return img_bgr
-
+    # Batch-Dimension (Sicht, keine Kopie)
+    return out[np.newaxis]  # (1, H, W, 3)
@@ -0,0 +1,66 @@
+"""Startzeit-Messung für main.py --profile-startup."""
+
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+# Startzeitpunkt: dieses Modul wird von main.py als erstes importiert
+PROCESS_START = time.perf_counter()
+
+PHASE_LABELS = {
+    'imports': "Imports",
+    'window_ready': "Fenster bereit",
+    'model_load': "Tagger 1 laden",
+    'tagger2_load': "Tagger 2 laden",
+    'first_inference': "Erste Inference",  # Tagger 1
+}
+
+
+class StartupProfiler:
+    """
+    Sammelt Zeitpunkte und Dauern des Programmstarts.
+
+    Ist das Profiling nicht aktiviert, sind mark() und span() ohne Wirkung.
+    Jede Phase wird nur beim ersten Auftreten gemessen.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.start = PROCESS_START
+        self.phases: Dict[str, Tuple[float, Optional[float]]] = {}  # Name -> (seit Start, Dauer)
+
+    def enable(self):
+        """Aktiviert das Profiling."""
+        self.enabled = True
+
+    def mark(self, name: str, duration: Optional[float] = None):
+        """Merkt sich einen Zeitpunkt (Sekunden seit Programmstart)."""
+        if self.enabled and name not in self.phases:
+            self.phases[name] = (time.perf_counter() - self.start, duration)
+
+    @contextmanager
+    def span(self, name: str):
+        """Misst die Dauer des with-Blocks."""
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.mark(name, time.perf_counter() - begin)
+
+    def has(self, name: str) -> bool:
+        """Prüft ob eine Phase bereits gemessen wurde."""
+        return name in self.phases
+
+    def report(self) -> str:
+        """Formatiert die gemessenen Phasen für die Konsole."""
+        lines: List[str] = ["⏱️  Startzeit-Profil:"]
+        for name, (since_start, duration) in sorted(self.phases.items(), key=lambda item: item[1][0]):
+            label = PHASE_LABELS.get(name, name)
+            if duration is None:
+                lines.append(f"  {label:<18} {since_start:7.3f} s seit Start")
+            else:
+                lines.append(f"  {label:<18} {duration:7.3f} s  (fertig {since_start:.3f} s seit Start)")
+        return "\n".join(lines)
+
+
+startup_profiler = StartupProfiler()
@@ -0,0 +1,78 @@
+"""Regeln für die Tag-Ausgabe (GUI-Anzeige, Kopieren/Export und Caption-Dateien)."""
+
+from typing import List, Optional, Tuple
+
+# Kaomoji-Liste (Tags die Unterstriche behalten sollen)
+# Basierend auf WD14 Tagger CSV
+KAOMOJIS = frozenset({
+    '0_0', '(o)_(o)', '+_+', '+_-', '._.', '<o>_<o>', '<|>_<|>',
+    '=_=', '>_<', '3_3', '6_9', '>_o', '@_@', '^_^', 'o_o',
+    'u_u', 'x_x', '|_|', '||_||'
+})
+
+# Standard-Ausschluss-Tags
+DEFAULT_EXCLUDE = ["monochrome", "greyscale", "dark", "simple background"]
+
+# Maximale Anzahl Tags für Anzeige, Kopieren, Export und Captions
+MAX_TAGS = 25
+
+
+def parse_tag_list(text: str) -> List[str]:
+    """
+    Zerlegt eine kommagetrennte Tag-Liste (z.B. aus dem Ausschluss-Feld).
+
+    Returns:
+        Tags in Kleinbuchstaben, leere Einträge entfernt
+    """
+    return [t.strip().lower() for t in text.split(',') if t.strip()]
+
+
+def process_tags(tags: List[Tuple[str, float]], exclude: Optional[List[str]] = None,
+                 use_spaces: bool = True, sort_alphabetical: bool = False,
+                 max_tags: Optional[int] = None) -> List[Tuple[str, float]]:
+    """
+    Verarbeitet Tags für die Ausgabe.
+
+    Args:
+        tags: Liste von (tag, confidence) Tupeln
+        exclude: Auszuschließende Tags in Kleinbuchstaben (mit Unterstrichen oder Leerzeichen)
+        use_spaces: Unterstriche durch Leerzeichen ersetzen (Kaomojis ausgenommen)
+        sort_alphabetical: Alphabetisch statt nach Konfidenz sortieren
+        max_tags: Maximale Anzahl Tags (None = alle)
+
+    Returns:
+        Verarbeitete Liste von (tag, confidence) Tupeln
+    """
+    processed_tags = list(tags)
+
+    # 1. Tags ausschließen (vor dem Ersetzen von Unterstrichen)
+    if exclude:  # Nur filtern, wenn tatsächlich Tags zum Ausschließen vorhanden sind
+        # Vergleiche sowohl mit Unterstrichen als auch ohne (für Flexibilität)
+        exclude_set = set(exclude)
+        processed_tags = [
+            (tag, conf) for tag, conf in processed_tags
+            if tag.lower() not in exclude_set and tag.lower().replace('_', ' ') not in exclude_set
+        ]
+
+    # 2. Unterstriche durch Leerzeichen ersetzen (wenn aktiviert)
+    # WICHTIG: Kaomojis behalten ihre Unterstriche!
+    if use_spaces:
+        processed_tags = [
+            (tag if tag in KAOMOJIS else tag.replace('_', ' '), conf)
+            for tag, conf in processed_tags
+        ]
+
+    # 3. Alphabetisch sortieren (wenn aktiviert), sonst nach Konfidenz
+    if sort_alphabetical:
+        processed_tags.sort(key=lambda x: x[0].lower())
+    else:
+        processed_tags.sort(key=lambda x: x[1], reverse=True)
+
+    if max_tags:
+        processed_tags = processed_tags[:max_tags]
+    return processed_tags
+
+
+def format_caption(tags: List[Tuple[str, float]]) -> str:
+    """Formatiert Tags als Prompt/Caption ("tag1, tag2, ...")."""
+    return ", ".join(tag for tag, _ in tags)